@@ -0,0 +1,105 @@
+"""Замер проверки по чёрному списку: BlocklistMatcher против перебора шаблонов"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+os.environ.setdefault("BOT_TOKEN", "1:bench")
+
+from src.blocklist import BlocklistMatcher, normalize, KIND_WORD, KIND_DOMAIN, KIND_REGEX
+
+SYLLABLES = ["ка", "ро", "ми", "ту", "ле", "на", "вер", "ско", "пра", "дом", "ли", "зе", "бу", "го"]
+LATIN = ["ab", "cor", "xi", "lum", "ten", "pro", "vex", "ra", "mo", "zen", "qu", "ix"]
+REGEXES = [r"\+7\d{10}", r"t\.me/joinchat/\w+", r"заработ\w+ от \d+", r"\$\d{3,}\s*в\s*день", r"crypto\s*x\d+"]
+
+
+def word(rnd: random.Random, alphabet: list[str], parts: int) -> str:
+    return "".join(rnd.choice(alphabet) for _ in range(parts))
+
+
+def make_blocklist(rnd: random.Random, words: int, domains: int, regexes: int):
+    word_list = {word(rnd, SYLLABLES, rnd.randint(3, 5)) for _ in range(words)}
+    word_list |= {f"{word(rnd, SYLLABLES, 2)} {word(rnd, SYLLABLES, 3)}" for _ in range(words // 10)}
+    domain_list = {f"{word(rnd, LATIN, rnd.randint(2, 4))}.{rnd.choice(['com', 'ru', 'xyz', 'top'])}"
+                   for _ in range(domains)}
+    regex_list = (REGEXES + [rf"акци\w* №{i}\b" for i in range(regexes)])[:regexes]
+    return sorted(word_list), sorted(domain_list), regex_list
+
+
+def make_messages(rnd: random.Random, n: int, words: list[str], domains: list[str]) -> list[str]:
+    messages = []
+    for i in range(n):
+        text = " ".join(word(rnd, SYLLABLES, rnd.randint(1, 2)) for _ in range(rnd.randint(5, 40)))
+        text += f" https://{word(rnd, LATIN, 3)}.org/page{i}"
+        roll = rnd.random()
+        if roll < 0.004:
+            text += " " + rnd.choice(words)
+        elif roll < 0.008:
+            text += f" заходи на https://{rnd.choice(domains)}/promo"
+        elif roll < 0.01:
+            text += " пиши +79991234567"
+        messages.append(text)
+    return messages
+
+
+def naive_patterns(words, domains, regexes) -> list[tuple[str, re.Pattern]]:
+    patterns = [(KIND_DOMAIN, re.compile(rf"(?<![\w-]){re.escape(d)}(?![\w-])", re.I)) for d in domains]
+    patterns += [(KIND_WORD, re.compile(r"(?<!\w)" + r"\s+".join(map(re.escape, w.split())) + r"(?!\w)", re.I))
+                 for w in words]
+    patterns += [(KIND_REGEX, re.compile(r, re.I)) for r in regexes]
+    return patterns
+
+
+def naive_match(patterns, text: str):
+    for kind, pattern in patterns:
+        if pattern.search(text):
+            return kind
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=5000)
+    parser.add_argument("--domains", type=int, default=2000)
+    parser.add_argument("--regexes", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    words, domains, regexes = make_blocklist(rnd, args.words, args.domains, args.regexes)
+    words = [normalize(KIND_WORD, w) for w in words]
+    messages = make_messages(rnd, args.messages, words, domains)
+    print(f"шаблонов: слов {len(words)}, доменов {len(domains)}, выражений {len(regexes)}; "
+          f"сообщений {len(messages)}, средняя длина {sum(map(len, messages)) // len(messages)} символов")
+
+    started = time.perf_counter()
+    matcher = BlocklistMatcher(words, domains, regexes)
+    build = time.perf_counter() - started
+    started = time.perf_counter()
+    BlocklistMatcher(words + ["новаяфраза"], domains, regexes)
+    rebuild = time.perf_counter() - started
+    print(f"сборка матчера: {build * 1000:.0f} мс, пересборка после добавления шаблона: {rebuild * 1000:.0f} мс")
+
+    started = time.perf_counter()
+    fast = [(hit[0] if (hit := matcher.match(text)) else None) for text in messages]
+    fast_time = time.perf_counter() - started
+
+    patterns = naive_patterns(words, domains, regexes)
+    sample = messages[:max(1, len(messages) // 20)]
+    started = time.perf_counter()
+    slow = [naive_match(patterns, text) for text in sample]
+    slow_time = (time.perf_counter() - started) * len(messages) / len(sample)
+
+    mismatches = sum(1 for a, b in zip(fast, slow) if (a is None) != (b is None))
+    print(f"совпадений: {sum(1 for h in fast if h)} из {len(messages)}, расхождений с перебором: {mismatches}")
+    print(f"перебор: {slow_time / len(messages) * 1e6:9.1f} мкс/сообщение (оценка по {len(sample)} сообщениям)")
+    print(f"матчер:  {fast_time / len(messages) * 1e6:9.1f} мкс/сообщение, "
+          f"{len(messages) / fast_time:,.0f} сообщений/с, ускорение {slow_time / fast_time:.0f}x")
+    if mismatches:
+        sys.exit("результаты матчера и перебора расходятся")
+
+
+if __name__ == "__main__":
+    main()
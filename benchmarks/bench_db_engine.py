@@ -0,0 +1,51 @@
+"""Замер накладных расходов БД на сообщение: новое соединение на вызов против общего"""
+import os
+import sys
+import tempfile
+import time
+
+from src.database import Database
+
+
+def per_message_fresh(path: str, uid: int):
+    Database(path).get_mute(-1, uid)
+    db = Database(path)
+    db.get_user(uid)
+    db.get_user(uid + 1)
+
+
+def per_message_shared(db: Database, uid: int):
+    db.get_mute(-1, uid)
+    db.get_user(uid)
+    db.get_user(uid + 1)
+
+
+def run(n: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed = Database(path)
+        seed.cursor.executemany(
+            "INSERT INTO users (id, username, full_name) VALUES (?, ?, ?)",
+            [(i, f"user{i}", f"User {i}") for i in range(1000)]
+        )
+        seed.conn.commit()
+
+        start = time.perf_counter()
+        for i in range(n):
+            per_message_fresh(path, i % 1000)
+        fresh = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(n):
+            per_message_shared(seed, i % 1000)
+        shared = time.perf_counter() - start
+        seed.close()
+
+    print(f"сообщений: {n}")
+    print(f"новое соединение на вызов: {fresh / n * 1e6:9.1f} мкс/сообщение")
+    print(f"общий экземпляр:           {shared / n * 1e6:9.1f} мкс/сообщение")
+    print(f"ускорение: x{fresh / shared:.1f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
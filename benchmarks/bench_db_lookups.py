@@ -0,0 +1,71 @@
+"""Замер запросов к базе на миллионе пользователей с индексами схемы v2 и без них"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+from src.database import Database
+
+CHATS = 10
+
+
+def seed(db: Database, users: int, mutes: int):
+    db.cursor.executemany(
+        "INSERT INTO users (id, username, full_name) VALUES (?, ?, ?)",
+        ((i, f"user{i}", f"User {i}") for i in range(users))
+    )
+    now = time.time()
+    db.cursor.executemany(
+        "INSERT INTO mutes (chat_id, user_id, until) VALUES (?, ?, ?)",
+        ((-(i % CHATS) - 1, i, now - 3600 + i * 0.1) for i in range(mutes))
+    )
+    db.conn.commit()
+
+
+def measure(label: str, fn, queries: int) -> float:
+    start = time.perf_counter()
+    for i in range(queries):
+        fn(i)
+    per_query = (time.perf_counter() - start) / queries * 1e6
+    print(f"  {label:32} {per_query:10.1f} мкс/запрос")
+    return per_query
+
+
+def run_queries(db: Database, users: int, queries: int, mutes: int) -> list[float]:
+    rnd = random.Random(1)
+    names = [f"USER{rnd.randrange(users)}" for _ in range(queries)]
+    ids = [rnd.randrange(mutes) for _ in range(queries)]
+    return [
+        measure("get_user_by_username", lambda i: db.get_user_by_username(names[i]), queries),
+        measure("get_mute", lambda i: db.get_mute(-(ids[i] % CHATS) - 1, ids[i]), queries),
+        measure("get_active_mutes_page", lambda i: db.get_active_mutes_page(-1, 0, 30),
+                max(1, queries // 10)),
+    ]
+
+
+def run(users: int, queries: int):
+    mutes = min(users, 100_000)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        started = time.perf_counter()
+        seed(db, users, mutes)
+        print(f"заполнение: {users} пользователей, {mutes} мутов за {time.perf_counter() - started:.1f} с")
+
+        print("схема v2 (с индексами):")
+        indexed = run_queries(db, users, queries, mutes)
+
+        db.conn.execute("DROP INDEX idx_users_username")
+        db.conn.execute("DROP INDEX idx_mutes_until")
+        db.conn.execute("DROP INDEX idx_mutes_chat_until")
+        print("без индексов username/until (как в v1):")
+        plain = run_queries(db, users, queries, mutes)
+        db.close()
+
+    print("ускорение: " + ", ".join(f"{p / i:.0f}x" for i, p in zip(indexed, plain)))
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    run(users, queries)
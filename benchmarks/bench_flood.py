@@ -0,0 +1,156 @@
+"""Замер пропускной способности и точности антифлуда"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from collections import Counter
+
+os.environ.setdefault("BOT_TOKEN", "1:bench")
+
+CHATS = 500
+USERS = 200_000
+FLOODERS = 20
+FLOOD_RATE = 5.0
+REPEATERS = 10
+REPEAT_INTERVAL = 3.0
+WAVE_ACCOUNTS = 30
+
+
+class SimClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_stream(messages: int, rate: float) -> list[tuple[float, int, int, str, str]]:
+    """(модельное время, chat_id, user_id, текст, вид отправителя)"""
+    rnd = random.Random(1)
+    stream = []
+    for i in range(messages):
+        user = rnd.randrange(USERS)
+        stream.append((i / rate, -1000 - user % CHATS, 100_000 + user,
+                       f"сообщение {i} про {rnd.randrange(10 ** 6)}", "normal"))
+    duration = messages / rate
+    for f in range(FLOODERS):
+        user, start = 10 + f, rnd.uniform(0, duration / 2)
+        for k in range(int((duration - start) * FLOOD_RATE)):
+            stream.append((start + k / FLOOD_RATE, -1000 - f, user, f"флуд {k}", "flood"))
+    for r in range(REPEATERS):
+        user, start = 50 + r, rnd.uniform(0, duration / 2)
+        for k in range(int((duration - start) / REPEAT_INTERVAL)):
+            stream.append((start + k * REPEAT_INTERVAL, -1000 - r, user, "Купи подписку  со СКИДКОЙ!", "duplicate"))
+    start = duration / 3
+    for a in range(WAVE_ACCOUNTS):
+        stream.append((start + a * 0.5, -1000, 500 + a, "Заработок от 1000$ в день, пиши в ЛС", "wave"))
+    stream.sort(key=lambda m: m[0])
+    return stream
+
+
+def report(name: str, stream, elapsed: float, muted: set, deleted: Counter):
+    kinds = {}
+    for _, _, user, _, kind in stream:
+        kinds.setdefault(kind, set()).add(user)
+    print(f"\n== {name}: {len(stream)} сообщений за {elapsed:.2f} с, "
+          f"{len(stream) / elapsed:,.0f} сообщений/с, {elapsed / len(stream) * 1e6:.1f} мкс/сообщение ==")
+    for kind, users in kinds.items():
+        print(f"  {kind:10} отправителей {len(users):6}, замучено {len(users & muted):6}, "
+              f"удалено сообщений {deleted[kind]:6}")
+
+
+def bench_detector(stream):
+    from src.flood import FloodDetector, REASON_WAVE
+
+    clock = SimClock()
+    detector = FloodDetector(clock=clock)
+    muted = set()
+    deleted = Counter()
+    started = time.perf_counter()
+    for now, chat_id, user_id, text, kind in stream:
+        clock.now = now
+        if user_id in muted:
+            continue
+        reason = detector.check(chat_id, user_id, text)
+        if reason is None:
+            continue
+        deleted[kind] += 1
+        if reason != REASON_WAVE:
+            muted.add(user_id)
+            detector.reset(chat_id, user_id)
+    report("детектор", stream, time.perf_counter() - started, muted, deleted)
+    print(f"  записей: пользователей {len(detector._users)}, чатов {len(detector._chats)}, "
+          f"текстов {len(detector._texts)}")
+
+
+async def bench_stage(stream, db_path: str):
+    import main  # noqa: F401 — регистрирует обработчики
+    from aiogram.types import Message
+    from benchmarks.fake_bot import FakeApi, FakeSession
+    from src.config import bot, outbound
+    from src.database import db
+    from src.pipeline import MessagePipeline, MessageContext
+    from src.handlers.mute_filter import enforce_mutes
+    import src.flood as flood
+
+    api = FakeApi()
+    bot.session = FakeSession(api)
+    bot.session.middleware(outbound)
+    outbound.set_global_limit(10 ** 6, 10 ** 6)
+    outbound.chat_rate = outbound.chat_burst = 10 ** 6
+    db.db_path = db_path
+    db.start()
+
+    clock = SimClock()
+    flood.flood_detector = flood.FloodDetector(clock=clock)
+    pipeline = MessagePipeline()
+    pipeline.add(enforce_mutes)
+    pipeline.add(flood.flood_control)
+
+    contexts = []
+    for i, (now, chat_id, user_id, text, kind) in enumerate(stream):
+        message = Message.model_validate({
+            "message_id": i, "date": 0, "text": text,
+            "chat": {"id": chat_id, "type": "supergroup", "title": "bench"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+        }).as_(bot)
+        contexts.append((now, message, kind))
+
+    deleted = Counter()
+    started = time.perf_counter()
+    for now, message, kind in contexts:
+        clock.now = now
+        if await pipeline.run(MessageContext(message)):
+            deleted[kind] += 1
+    elapsed = time.perf_counter() - started
+    await db.flush()
+
+    muted = {user_id for (chat_id, user_id) in db.mutes._mutes}
+    report("этап", stream, elapsed, muted, deleted)
+    print(f"  вызовов API: {dict(api.calls)}")
+    await db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--rate", type=float, default=10_000, help="сообщений в секунду модельного времени")
+    parser.add_argument("--stage-messages", type=int, default=50_000)
+    parser.add_argument("--stage-rate", type=float, default=1_000,
+                        help="частота для прогона этапа: 50 000 сообщений — 50 с модельного времени")
+    args = parser.parse_args()
+
+    stream = make_stream(args.messages, args.rate)
+    bench_detector(stream)
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(bench_stage(make_stream(args.stage_messages, args.stage_rate), os.path.join(tmp, "bench.db")))
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(getattr(logging, os.environ.get("BENCH_LOG", "CRITICAL")))
+    main()
+    sys.exit(0)
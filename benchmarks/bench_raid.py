@@ -0,0 +1,89 @@
+"""Нагрузочный тест режима рейда против поддельного Bot API"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+os.environ.setdefault("BOT_TOKEN", "1:bench")
+
+from aiogram.types import Update
+
+from benchmarks.fake_bot import FakeApi, FakeSession
+
+CHAT_ID = -100123
+
+
+def join_update(update_id: int, user_id: int) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": CHAT_ID, "type": "supergroup", "title": "bench"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "new_chat_members": [{"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}],
+        }
+    })
+
+
+async def run(joins: int, per_minute: int, speed: float, rate_limit: float, chat_rate: float, raid: bool):
+    from src.config import bot, dp, outbound
+    from src.database import db
+    import src.verification as verification
+
+    api = FakeApi(rate_limit=rate_limit)
+    bot.session = FakeSession(api, latency=0.02)
+    bot.session.middleware(outbound)
+    outbound.chat_rate = outbound.chat_burst = chat_rate
+    outbound._chats.clear()
+    verification.join_tracker.threshold = 15 if raid else 10 ** 9
+    verification.join_tracker._joins.clear()
+    verification.join_tracker._raid_until.clear()
+
+    interval = 60.0 / per_minute / speed
+    started = time.perf_counter()
+    tasks = []
+    for i in range(joins):
+        tasks.append(asyncio.create_task(dp.feed_update(bot, join_update(i + 1, 10_000 + i))))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*tasks)
+    await asyncio.sleep(verification.join_batcher.delay + 0.1)
+    await verification.restriction_pool.join()
+    elapsed = time.perf_counter() - started
+    await db.flush()
+
+    total = sum(api.calls.values())
+    print(f"\n== режим рейда {'включён' if raid else 'выключен'} ==")
+    print(f"вступлений: {joins}, время: {elapsed:.1f} с")
+    print(f"вызовов API: {total} ({total / joins:.2f} на вступление), ответов 429: {sum(api.throttled.values())}, "
+          f"не доставлено: {sum(outbound.failed.values())}")
+    for name, count in api.calls.most_common():
+        print(f"  {name:24} {count}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--joins", type=int, default=1000)
+    parser.add_argument("--per-minute", type=int, default=1000)
+    parser.add_argument("--speed", type=float, default=20.0)
+    parser.add_argument("--rate-limit", type=float, default=30.0)
+    parser.add_argument("--chat-rate", type=float, default=1000.0,
+                        help="лимит сообщений в чат в секунду для OutboundDispatcher")
+    args = parser.parse_args()
+
+    from src.database import db
+    with tempfile.TemporaryDirectory() as tmp:
+        db.db_path = os.path.join(tmp, "bench.db")
+        for raid in (False, True):
+            await run(args.joins, args.per_minute, args.speed, args.rate_limit, args.chat_rate, raid)
+        await db.close()
+
+
+if __name__ == "__main__":
+    logging_level = os.environ.get("BENCH_LOG", "CRITICAL")
+    import logging
+    logging.disable(getattr(logging, logging_level))
+    asyncio.run(main())
+    sys.exit(0)
@@ -0,0 +1,179 @@
+"""Воспроизведение потоков апдейтов против поддельного Bot API по HTTP"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+os.environ.setdefault("BOT_TOKEN", "1:bench")
+
+from benchmarks.fake_bot import FakeApi, FakeApiServer
+
+CHAT = {"id": -100123, "type": "supergroup", "title": "bench"}
+ADMIN_ID = 42
+USERS = 1000
+MUTED_SHARE = 0.1
+VERIFY_LAG = 100
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+
+def _message(update_id: int, user_id: int, **fields) -> dict:
+    return {"message_id": update_id, "date": int(time.time()), "chat": CHAT, "from": _user(user_id), **fields}
+
+
+def mute_filter_stream(n: int) -> list[dict]:
+    rnd = random.Random(1)
+    return [
+        {"update_id": i, "message": _message(i, 10_000 + rnd.randrange(USERS), text=f"сообщение {i}")}
+        for i in range(1, n + 1)
+    ]
+
+
+def moderation_stream(n: int) -> list[dict]:
+    commands = ("/warn спам", "/mute 10m флуд", "/ban")
+    updates = []
+    for i in range(1, n + 1):
+        target = _message(1_000_000 + i, 20_000 + i, text="нарушение")
+        updates.append({
+            "update_id": i,
+            "message": _message(i, ADMIN_ID, text=commands[i % len(commands)], reply_to_message=target)
+        })
+    return updates
+
+
+def verification_stream(n: int) -> list[dict]:
+    joins = n // 2
+    updates = []
+    for i in range(joins + VERIFY_LAG):
+        if i < joins:
+            user = _user(30_000 + i)
+            updates.append({"message": _message(0, user["id"], new_chat_members=[user])})
+        if i >= VERIFY_LAG:
+            user = _user(30_000 + i - VERIFY_LAG)
+            updates.append({"callback_query": {
+                "id": str(i), "from": user, "chat_instance": "1", "data": "verify",
+                "message": _message(0, 1, text="капча")
+            }})
+    for update_id, update in enumerate(updates, start=1):
+        update["update_id"] = update_id
+        if "message" in update:
+            update["message"]["message_id"] = update_id
+    return updates
+
+
+def load_replay(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def replay(name: str, updates: list[dict], args, db_path: str):
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from src.config import bot, dp, outbound
+    from src.database import db
+    from src.metrics import metrics
+    import src.verification as verification
+
+    api = FakeApi(admins=(ADMIN_ID,), error_rate=args.error_rate)
+    server = FakeApiServer(api, latency=args.latency, jitter=args.latency / 2)
+    url = await server.start()
+    bot.session = AiohttpSession(api=TelegramAPIServer.from_base(url))
+    bot.session.middleware(outbound)
+
+    db.db_path = db_path
+    db.start()
+    if name == "mute_filter":
+        for uid in range(10_000, 10_000 + int(USERS * MUTED_SHARE)):
+            await db.add_mute(CHAT["id"], uid, time.time() + 3600)
+    verification.join_tracker.threshold = 10 ** 9
+
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def feed(raw: dict):
+        try:
+            started = time.perf_counter()
+            await dp.feed_raw_update(bot, raw)
+            latencies.append(time.perf_counter() - started)
+        finally:
+            semaphore.release()
+
+    started = time.perf_counter()
+    tasks = []
+    for raw in updates:
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(feed(raw)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    await db.close()
+    await bot.session.close()
+    await server.stop()
+
+    latencies.sort()
+    total = sum(api.calls.values())
+    print(f"\n== {name}: {len(updates)} апдейтов за {elapsed:.2f} с, {len(updates) / elapsed:.0f} апдейтов/с ==")
+    print(f"время обработки: p50 {_percentile(latencies, 0.5) * 1000:.1f} мс, "
+          f"p99 {_percentile(latencies, 0.99) * 1000:.1f} мс")
+    print(f"вызовов API: {total} ({total / len(updates):.2f} на апдейт), "
+          f"ответов 429: {sum(api.throttled.values())}, не доставлено: {sum(outbound.failed.values())}")
+    for method, count in api.calls.most_common():
+        print(f"  {method:24} {count:6} ({count / len(updates):.2f} на апдейт)")
+    timings = [*metrics.stages.items(), *sorted(metrics.handlers.items(), key=lambda item: -item[1].count)]
+    for handler, histogram in timings:
+        print(f"  {handler:24} {histogram.count:6} вызовов, p50 {histogram.quantile(0.5) * 1000:.1f} мс, "
+              f"p99 {histogram.quantile(0.99) * 1000:.1f} мс")
+    outbound.failed.clear()
+    metrics.handlers.clear()
+    metrics.stages.clear()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.02, help="задержка ответа API, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля вызовов API с ответом 429")
+    parser.add_argument("--concurrency", type=int, default=50, help="апдейтов в обработке одновременно")
+    parser.add_argument("--scenario", nargs="*", default=["mute_filter", "moderation", "verification"],
+                        choices=["mute_filter", "moderation", "verification"])
+    parser.add_argument("--replay", help="JSONL-файл с записанными апдейтами")
+    args = parser.parse_args()
+
+    import main as bot_main  # noqa: F401 — регистрирует обработчики
+    from src.audit import start_audit, stop_audit
+    from src.config import outbound
+
+    # Лимиты Telegram в бенчмарке не нужны: измеряется сам бот
+    outbound.set_global_limit(10 ** 6, 10 ** 6)
+    outbound.chat_rate = outbound.chat_burst = 10 ** 6
+
+    streams = {
+        "mute_filter": mute_filter_stream,
+        "moderation": moderation_stream,
+        "verification": verification_stream,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        start_audit(os.path.join(tmp, "audit.jsonl"))
+        runs = [(name, streams[name](args.updates)) for name in args.scenario]
+        if args.replay:
+            runs = [("replay", load_replay(args.replay))]
+        for name, updates in runs:
+            await replay(name, updates, args, os.path.join(tmp, f"{name}.db"))
+        stop_audit()
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(getattr(logging, os.environ.get("BENCH_LOG", "CRITICAL")))
+    asyncio.run(main())
+    sys.exit(0)
@@ -0,0 +1,99 @@
+"""Замер пропускной способности режима супервизора по числу воркеров"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import functools
+
+os.environ.setdefault("BOT_TOKEN", "1:bench")
+
+CHATS = 64
+BATCH = 100
+
+
+def message_update(update_id: int) -> dict:
+    chat_id = -1_000_000 - update_id % CHATS
+    user_id = 10_000 + update_id % 5000
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": f"chat {chat_id}"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": f"сообщение <{update_id}> & ещё немного текста",
+        }
+    }
+
+
+def bench_worker(db_path: str, results, index: int, count: int, updates):
+    import logging
+    logging.disable(logging.CRITICAL)
+    import main
+    from benchmarks.fake_bot import FakeApi, FakeSession
+    from src.config import bot, dp, outbound
+    from src.database import db
+    from src.sharding import consume
+
+    bot.session = FakeSession(FakeApi())
+    bot.session.middleware(outbound)
+    db.db_path = db_path
+    db.shard = (index, count)
+
+    async def run():
+        db.start()
+        results.put(("ready", index, 0, 0.0))
+        started = time.process_time()
+        handled = await consume(updates, bot, dp)
+        await db.close()
+        results.put(("done", index, handled, time.process_time() - started))
+
+    asyncio.run(run())
+
+
+def run(workers: int, updates: list[dict], db_path: str) -> float:
+    from src.sharding import Supervisor
+    from multiprocessing import get_context
+
+    results = get_context("spawn").Queue()
+    supervisor = Supervisor(workers, functools.partial(bench_worker, db_path, results))
+    supervisor.start()
+    for _ in range(workers):
+        results.get()
+
+    started = time.perf_counter()
+    for i in range(0, len(updates), BATCH):
+        supervisor.dispatch(updates[i:i + BATCH])
+    for queue in supervisor.queues:
+        queue.put(None)
+    done = [results.get() for _ in range(workers)]
+    elapsed = time.perf_counter() - started
+    supervisor.stop()
+
+    handled = sum(d[2] for d in done)
+    assert handled == len(updates), f"обработано {handled} из {len(updates)}"
+    per_worker = ", ".join(f"{d[2]}" for d in sorted(done, key=lambda d: d[1]))
+    cpu = sum(d[3] for d in done) / handled * 1e6
+    print(f"воркеров: {workers:2}  {handled / elapsed:8.0f} апдейтов/с  "
+          f"за {elapsed:.2f} с, CPU {cpu:.0f} мкс/апдейт, по воркерам: {per_worker}")
+    return handled / elapsed
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 40_000
+    counts = [int(n) for n in sys.argv[2].split(",")] if len(sys.argv) > 2 else [1, 2, 4]
+    updates = [message_update(i) for i in range(1, total + 1)]
+    print(f"ядер: {os.cpu_count()}, апдейтов: {total}, чатов: {CHATS}")
+    with tempfile.TemporaryDirectory() as tmp:
+        base = None
+        for workers in counts:
+            rate = run(workers, updates, os.path.join(tmp, f"bench{workers}.db"))
+            base = base or rate
+            print(f"             ускорение относительно {counts[0]}: {rate / base:.2f}x")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(getattr(logging, os.environ.get("BENCH_LOG", "CRITICAL")))
+    main()
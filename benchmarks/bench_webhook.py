@@ -0,0 +1,108 @@
+"""Локальная проверка режима webhook: синтетические апдейты по HTTP"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import statistics
+
+os.environ.setdefault("BOT_TOKEN", "1:bench")
+
+from aiohttp import ClientSession, web
+
+from benchmarks.fake_bot import FakeApi, FakeSession
+
+SECRET = "bench-secret"
+PATH = "/webhook"
+
+
+def message_update(update_id: int) -> dict:
+    user_id = 10_000 + update_id % 500
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": -100123, "type": "supergroup", "title": "bench"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": f"сообщение {update_id}",
+        }
+    }
+
+
+async def run(updates: int, concurrency: int):
+    import main  # noqa: F401 — регистрирует обработчики
+    from src.config import bot, dp, outbound
+    from src.database import db
+    from src.webhook import build_app
+
+    bot.session = FakeSession(FakeApi())
+    bot.session.middleware(outbound)
+
+    handled = 0
+
+    async def count_updates(handler, event, data):
+        nonlocal handled
+        try:
+            return await handler(event, data)
+        finally:
+            handled += 1
+
+    dp.update.outer_middleware(count_updates)
+
+    runner = web.AppRunner(build_app(bot, dp, path=PATH, secret=SECRET))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}{PATH}"
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+
+    latencies = []
+    async with ClientSession() as http:
+        async with http.post(url, json=message_update(0), headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}) as r:
+            assert r.status == 401, f"неверный секрет принят: {r.status}"
+
+        queue = asyncio.Queue()
+        for i in range(1, updates + 1):
+            queue.put_nowait(i)
+
+        async def sender():
+            while not queue.empty():
+                update_id = queue.get_nowait()
+                started = time.perf_counter()
+                async with http.post(url, json=message_update(update_id), headers=headers) as r:
+                    assert r.status == 200, f"апдейт {update_id}: HTTP {r.status}"
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(sender() for _ in range(concurrency)))
+        while handled < updates and time.perf_counter() - started < 30:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+
+    await runner.cleanup()
+    await db.close()
+
+    latencies.sort()
+    print(f"апдейтов отправлено: {updates}, обработано: {handled}, за {elapsed:.2f} с "
+          f"({handled / elapsed:.0f} апдейтов/с)")
+    print(f"ответ вебхука: p50 {statistics.median(latencies) * 1000:.2f} мс, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} мс")
+    if handled != updates:
+        sys.exit(f"обработаны не все апдейты: {handled} из {updates}")
+
+
+async def main():
+    from src.database import db
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        db.db_path = os.path.join(tmp, "bench.db")
+        await run(updates, concurrency)
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(getattr(logging, os.environ.get("BENCH_LOG", "CRITICAL")))
+    asyncio.run(main())
@@ -0,0 +1,167 @@
+"""Поддельный Telegram Bot API для нагрузочных тестов"""
+import json
+import time
+import random
+import asyncio
+import itertools
+from collections import Counter, deque
+
+from aiohttp import web
+from aiogram.client.session.base import BaseSession
+from aiogram.types import ChatMemberAdministrator
+
+BOT_ID = 1
+_GIFT_TYPES = {
+    "unlimited_gifts": True, "limited_gifts": True, "unique_gifts": True,
+    "premium_subscription": True, "gifts_from_channels": True,
+}
+
+# Все обязательные права администратора: их набор растёт с версиями Bot API
+_ADMIN_RIGHTS = {
+    name: True for name, field in ChatMemberAdministrator.model_fields.items()
+    if name.startswith("can_") and field.is_required()
+}
+
+
+def _chat(chat_id) -> dict:
+    return {"id": chat_id, "type": "supergroup", "title": "bench"}
+
+
+def _user(user_id) -> dict:
+    return {"id": user_id, "is_bot": user_id == BOT_ID, "first_name": f"user{user_id}"}
+
+
+class FakeApi:
+    """Формирует ответы Bot API по имени метода и его параметрам"""
+
+    def __init__(self, rate_limit: float = None, admins: tuple = (), error_rate: float = 0.0,
+                 retry_after: int = 1, seed: int = 1):
+        self.rate_limit = rate_limit
+        self.admins = admins
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self.calls = Counter()
+        self.throttled = Counter()
+        self._message_ids = itertools.count(1000)
+        self._recent: deque[float] = deque()
+
+    def _limited(self) -> bool:
+        if self.error_rate and self._random.random() < self.error_rate:
+            return True
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        while self._recent and self._recent[0] <= now - 1:
+            self._recent.popleft()
+        if len(self._recent) >= self.rate_limit:
+            return True
+        self._recent.append(now)
+        return False
+
+    def respond(self, name: str, params: dict) -> dict:
+        if self._limited():
+            self.throttled[name] += 1
+            return {
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after}
+            }
+        self.calls[name] += 1
+        return {"ok": True, "result": self._result(name, params)}
+
+    def _result(self, name: str, params: dict):
+        chat_id = params.get("chat_id", 0)
+        if name in ("sendMessage", "sendPhoto", "forwardMessage", "copyMessage"):
+            return {"message_id": next(self._message_ids), "date": int(time.time()), "chat": _chat(chat_id)}
+        if name in ("forwardMessages", "copyMessages"):
+            return [{"message_id": next(self._message_ids)} for _ in params.get("message_ids", [])]
+        if name == "getChatAdministrators":
+            return [{**_ADMIN_RIGHTS, "status": "administrator", "user": _user(uid), "can_be_edited": False,
+                     "is_anonymous": False} for uid in self.admins]
+        if name == "getChat":
+            user_id = int(chat_id)
+            info = {"accent_color_id": 0, "max_reaction_count": 11, "accepted_gift_types": _GIFT_TYPES}
+            if user_id > 0:
+                return {"id": user_id, "type": "private", "first_name": f"user{user_id}", **info}
+            return {**_chat(chat_id), **info}
+        if name == "getChatMember":
+            return {"status": "member", "user": _user(params.get("user_id", 0))}
+        if name == "getMe":
+            return _user(BOT_ID)
+        return True
+
+
+class FakeSession(BaseSession):
+    """Сессия aiogram, отвечающая из FakeApi без сети"""
+
+    def __init__(self, api: FakeApi = None, latency: float = 0.0):
+        super().__init__()
+        self.api = api or FakeApi()
+        self.latency = latency
+
+    async def make_request(self, bot, method, timeout=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        params = {
+            key: value for key, value in method.model_dump(warnings=False).items()
+            if key in ("chat_id", "user_id", "message_ids")
+        }
+        content = json.dumps(self.api.respond(method.__api_method__, params))
+        return self.check_response(bot, method, 200, content).result
+
+    async def stream_content(self, url: str, headers: dict = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True):
+        """Скачивание файла: содержимое — сам адрес, отдаётся кусками по chunk_size"""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.api.calls["downloadFile"] += 1
+        content = url.encode()
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+    async def close(self):
+        pass
+
+
+class FakeApiServer:
+    """HTTP-сервер Bot API на localhost поверх FakeApi"""
+
+    def __init__(self, api: FakeApi = None, latency: float = 0.0, jitter: float = 0.0):
+        self.api = api or FakeApi()
+        self.latency = latency
+        self.jitter = jitter
+        self._runner = None
+        self.url = None
+
+    @staticmethod
+    def _param(value: str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        params = {key: self._param(form[key]) for key in ("chat_id", "user_id", "message_ids") if key in form}
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        response = self.api.respond(request.match_info["method"], params)
+        return web.json_response(response, status=200 if response["ok"] else response["error_code"])
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -1,28 +1,105 @@
 import asyncio
+import logging
 
-from src.config import dp
-from src.database import Database
+from src.config import (
+    bot, dp, outbound, BOT_MODE, BOT_WORKERS, WEBHOOK_PATH, WEBHOOK_SECRET, METRICS_HOST, METRICS_PORT
+)
+from src.database import db
 from src.background import clear_console_periodically, background_unmute
+from src.amnesty import resume_amnesty_jobs
+from src.audit import start_audit, stop_audit, AUDIT_FILE
+from src.dedup import commands_dedup
+from src.blocklist import blocklists
+from src.metrics import monitor_loop_lag, start_metrics_server
+from src.outbound import GLOBAL_RATE, GLOBAL_BURST
+from src.sharding import Supervisor, consume
+from src.webhook import run_webhook, set_webhook, serve
 
 import src.handlers.moderation  
+import src.handlers.bulk
+from src.handlers.bulk import prune_joins
 import src.handlers.lists       
 import src.verification         
+from src.verification import verification_timeouts
 import src.handlers.mute_filter 
 import src.handlers.other       
+from src.handlers.other import forward_buffer
+import src.handlers.chat_members
+import src.handlers.stats
+import src.handlers.blocklist
+import src.handlers.stages
 
-async def main():
+logger = logging.getLogger(__name__)
+
+async def start_services(audit_path: str = AUDIT_FILE, metrics_port: int = METRICS_PORT):
+    db.start()
+    start_audit(audit_path)
+    await commands_dedup.load()
+    await blocklists.load()
+    await prune_joins()
+    try:
+        await start_metrics_server(METRICS_HOST, metrics_port)
+    except OSError as e:
+        logger.error(f"Ошибка при запуске эндпоинта метрик: {e}")
+    asyncio.create_task(monitor_loop_lag())
     asyncio.create_task(clear_console_periodically())
     asyncio.create_task(background_unmute())
-    
-    from src.config import bot
-    
-    await dp.start_polling(bot, skip_updates=True)
+    asyncio.create_task(verification_timeouts())
+    await resume_amnesty_jobs()
+    if forward_buffer:
+        asyncio.create_task(forward_buffer.run())
 
-if __name__ == "__main__":
+async def stop_services():
+    stop_audit()
+    await db.close()
+
+async def main():
+    await start_services()
     try:
-        asyncio.run(main())
+        if BOT_MODE == "webhook":
+            await run_webhook(bot, dp)
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+    finally:
+        await stop_services()
+
+async def worker_main(index: int, count: int, updates):
+    """Воркер режима супервизора: обслуживает чаты своего шарда"""
+    db.shard = (index, count)
+    outbound.set_global_limit(GLOBAL_RATE / count, max(1.0, GLOBAL_BURST / count))
+    await start_services(
+        audit_path=f"audit.{index}.jsonl",
+        metrics_port=METRICS_PORT + 1 + index if METRICS_PORT else 0
+    )
+    try:
+        await consume(updates, bot, dp)
+    finally:
+        await stop_services()
+
+def run_worker(index: int, count: int, updates):
+    try:
+        asyncio.run(worker_main(index, count, updates))
     except KeyboardInterrupt:
         pass
+
+async def supervise(count: int):
+    """Супервизор получает апдейты и раздаёт их воркерам по chat_id"""
+    supervisor = Supervisor(count, run_worker)
+    supervisor.start()
+    try:
+        if BOT_MODE == "webhook":
+            await set_webhook(bot, dp)
+            await serve(supervisor.webhook_app(WEBHOOK_PATH, WEBHOOK_SECRET))
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            await supervisor.poll(bot, dp.resolve_used_update_types())
     finally:
-        db = Database()
-        db.close()
\ No newline at end of file
+        supervisor.stop()
+        await bot.session.close()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(supervise(BOT_WORKERS) if BOT_WORKERS > 1 else main())
+    except KeyboardInterrupt:
+        pass
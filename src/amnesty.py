@@ -0,0 +1,114 @@
+import time
+import asyncio
+import logging
+
+from .config import bot
+from .database import db
+from .utils import lift_restrictions, log_action
+
+logger = logging.getLogger(__name__)
+
+AMNESTY_BATCH = 20
+AMNESTY_PROGRESS_INTERVAL = 3.0
+
+_STAGES = ("mutes", "bans", "warns")
+_running: dict[int, asyncio.Task] = {}
+
+
+class AmnestyJob:
+    """Фоновая амнистия чата пачками; курсор в amnesty_jobs переживает перезапуск"""
+
+    def __init__(self, job: dict):
+        self.chat_id = job["chat_id"]
+        self.performer_id = job["performer_id"]
+        self.message_id = job["message_id"]
+        self.stage = job["stage"]
+        self.cursor = job["cursor"]
+        self.done = job["done"]
+        self.total = job["total"]
+        self._reported = 0.0
+
+    async def _unmute(self, user_id: int):
+        await lift_restrictions(self.chat_id, user_id)
+
+    async def _unban(self, user_id: int):
+        try:
+            await bot.unban_chat_member(self.chat_id, user_id)
+            await db.remove_ban(self.chat_id, user_id)
+        except Exception as e:
+            logger.error(f"Ошибка при разбане {user_id} во время амнистии: {e}")
+
+    async def _next_batch(self) -> list:
+        if self.stage == "mutes":
+            mutes = await db.get_mutes_after(self.chat_id, self.cursor, AMNESTY_BATCH)
+            await asyncio.gather(*(self._unmute(mute["user_id"]) for mute in mutes))
+            return [mute["user_id"] for mute in mutes]
+        bans = await db.get_bans_after(self.chat_id, self.cursor, AMNESTY_BATCH)
+        await asyncio.gather(*(self._unban(uid) for uid in bans))
+        return bans
+
+    async def _report(self, text: str, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._reported < AMNESTY_PROGRESS_INTERVAL:
+            return
+        self._reported = now
+        try:
+            await bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id)
+        except Exception as e:
+            logger.debug(f"Не удалось обновить прогресс амнистии: {e}")
+
+    async def run(self):
+        while self.stage != "warns":
+            processed = await self._next_batch()
+            if processed:
+                self.cursor = processed[-1]
+                self.done += len(processed)
+            else:
+                self.stage = _STAGES[_STAGES.index(self.stage) + 1]
+                self.cursor = 0
+            await db.update_amnesty_job(self.chat_id, self.stage, self.cursor, self.done)
+            await self._report(f"⏳ Амнистия: обработано {self.done} из {self.total}...")
+
+        await db.clear_all_warns(self.chat_id)
+        await db.delete_amnesty_job(self.chat_id)
+        await self._report("✅ Амнистия проведена! Все ограничения сняты, предупреждения обнулены.", force=True)
+        log_action("Amnesty", self.performer_id, chat_id=self.chat_id)
+
+
+async def _run_job(job: dict):
+    try:
+        await AmnestyJob(job).run()
+    except Exception as e:
+        logger.error(f"Ошибка в амнистии чата {job['chat_id']}: {e}")
+    finally:
+        _running.pop(job["chat_id"], None)
+
+
+def _spawn(job: dict):
+    _running[job["chat_id"]] = asyncio.create_task(_run_job(job))
+
+
+def is_running(chat_id: int) -> bool:
+    return chat_id in _running
+
+
+async def start_amnesty(chat_id: int, performer_id: int, message_id: int) -> bool:
+    """Ставит амнистию чата в очередь; False, если она уже идёт"""
+    if is_running(chat_id):
+        return False
+    total = await db.count_mutes(chat_id) + await db.count_bans(chat_id)
+    if not await db.create_amnesty_job(chat_id, performer_id, message_id, total):
+        return False
+    _spawn({
+        "chat_id": chat_id, "performer_id": performer_id, "message_id": message_id,
+        "stage": "mutes", "cursor": 0, "done": 0, "total": total
+    })
+    return True
+
+
+async def resume_amnesty_jobs():
+    """Продолжает амнистии, прерванные перезапуском"""
+    for job in await db.get_amnesty_jobs():
+        if not is_running(job["chat_id"]):
+            logger.info(f"Возобновление амнистии в чате {job['chat_id']} с этапа {job['stage']}")
+            _spawn(job)
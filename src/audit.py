@@ -0,0 +1,123 @@
+import json
+import time
+import queue
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from .database import db, AsyncDatabase
+from .profiles import profiles
+
+AUDIT_FILE = 'audit.jsonl'
+AUDIT_MAX_BYTES = 10 * 1024 * 1024
+AUDIT_BACKUPS = 5
+AUDIT_QUEUE_SIZE = 10000
+
+# Записи журнала, не попавшие в БД: "overflow" — очередь переполнена,
+# "closed" — база уже закрыта
+dropped = Counter()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler, который при переполнении очереди отбрасывает запись"""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped["overflow"] += 1
+
+
+class _AuditListener(QueueListener):
+    def enqueue_sentinel(self):
+        # Очередь может быть заполнена — ждём, пока поток освободит место
+        self.queue.put(self._sentinel)
+
+
+audit_logger = logging.getLogger("audit")
+_audit_queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+audit_logger.addHandler(DroppingQueueHandler(_audit_queue))
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Одна запись журнала — одна строка JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = dict(record.audit)
+        entry["time"] = datetime.fromtimestamp(entry["ts"], timezone.utc).isoformat()
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class AuditDbHandler(logging.Handler):
+    """Пишет записи журнала в audit_log через общую очередь писателя БД"""
+
+    def __init__(self, database: AsyncDatabase):
+        super().__init__()
+        self.database = database
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            a = record.audit
+            if not self.database.write_nowait(
+                "add_audit_record",
+                a["ts"], a["chat_id"], a["action"], a["performer_id"], a["target_id"], a["details"]
+            ):
+                dropped["closed"] += 1
+        except Exception:
+            self.handleError(record)
+
+
+_listener: Optional[QueueListener] = None
+
+
+def start_audit(path: str = AUDIT_FILE):
+    """Запускает поток, который пишет журнал в JSON-файл с ротацией и в SQLite"""
+    global _listener
+    if _listener is not None:
+        return
+    file_handler = RotatingFileHandler(path, maxBytes=AUDIT_MAX_BYTES, backupCount=AUDIT_BACKUPS, encoding='utf-8')
+    file_handler.setFormatter(JsonLinesFormatter())
+    _listener = _AuditListener(_audit_queue, file_handler, AuditDbHandler(db))
+    _listener.start()
+
+
+def queue_size() -> int:
+    return _audit_queue.qsize()
+
+
+def stop_audit():
+    """Дописывает очередь в файл и в очередь писателя БД; вызывается до db.close()"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+def _name(user_id: Optional[int]) -> str:
+    if not user_id:
+        return "System"
+    return profiles.peek(user_id) or f"ID {user_id}"
+
+
+def log_action(action: str, performer_id: int, target_id: int = None, details: str = None, chat_id: int = None):
+    """Записывает действие в журнал, не блокируя цикл событий"""
+    msg = f"Action: {action} | Performer: {_name(performer_id)}"
+    if target_id:
+        msg += f" | Target: {_name(target_id)}"
+    if chat_id:
+        msg += f" | Chat: {chat_id}"
+    if details:
+        msg += f" | Details: {details}"
+    audit_logger.info(msg, extra={"audit": {
+        "ts": time.time(),
+        "chat_id": chat_id,
+        "action": action,
+        "performer_id": performer_id or None,
+        "target_id": target_id,
+        "details": details,
+    }})
@@ -1,10 +1,10 @@
 import asyncio
 import os
 import logging
-from datetime import datetime
 
 from .config import bot
-from .database import Database
+from .database import db
+from .scheduler import DeadlineScheduler
 from .utils import lift_restrictions, get_user_mention, log_action
 
 logger = logging.getLogger(__name__)
@@ -14,24 +14,43 @@ async def clear_console_periodically():
         await asyncio.sleep(3600)
         os.system('cls' if os.name == 'nt' else 'clear')
 
-async def background_unmute():
-    while True:
+async def _unmute(user_id: int, chat_id: int, until: float):
+    if await lift_restrictions(chat_id, user_id, until):
+        mention = await get_user_mention(chat_id, user_id)
         try:
-            db = Database()
-            now = datetime.now().timestamp()
-            for mute in db.get_active_mutes():
-                if now >= mute["until"]:
-                    if await lift_restrictions(mute["chat_id"], mute["user_id"]):
-                        mention = await get_user_mention(mute["chat_id"], mute["user_id"])
-                        try:
-                            await bot.send_message(
-                                mute["chat_id"],
-                                f"{mention}, ограничения сняты, вы можете вновь общаться"
-                            )
-                        except:
-                            pass
-                        log_action("Auto-unmute", 0, mute["user_id"])
-        except Exception as e:
-            logger.error(f"Ошибка в background_unmute: {e}")
-        
-        await asyncio.sleep(10)
+            await bot.send_message(
+                chat_id,
+                f"{mention}, ограничения сняты, вы можете вновь общаться"
+            )
+        except:
+            pass
+        log_action("Auto-unmute", 0, user_id, chat_id=chat_id)
+
+async def _unmute_batch(due: list[tuple[tuple[int, int], float]]):
+    results = await asyncio.gather(
+        *(_unmute(user_id, chat_id, until) for (chat_id, user_id), until in due),
+        return_exceptions=True
+    )
+    for ((_, user_id), _), result in zip(due, results):
+        if isinstance(result, Exception):
+            logger.error(f"Ошибка при авто-размуте пользователя {user_id}: {result}")
+
+unmute_scheduler = DeadlineScheduler(_unmute_batch, name="background_unmute")
+
+def _on_mute_change(chat_id: int, user_id: int, until: float | None):
+    if until is None:
+        unmute_scheduler.cancel((chat_id, user_id))
+    else:
+        unmute_scheduler.schedule((chat_id, user_id), until, until)
+
+async def background_unmute():
+    """Снимает муты точно в срок: планировщик спит до ближайшего дедлайна"""
+    db.mutes.subscribe(_on_mute_change)
+    try:
+        for mute in await db.get_all_mutes():
+            key = (mute["chat_id"], mute["user_id"])
+            if key not in unmute_scheduler:
+                unmute_scheduler.schedule(key, mute["until"], mute["until"])
+    except Exception as e:
+        logger.error(f"Ошибка при загрузке мутов в background_unmute: {e}")
+    await unmute_scheduler.run()
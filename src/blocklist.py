@@ -0,0 +1,323 @@
+import re
+import time
+import asyncio
+import logging
+from typing import Iterable, Optional
+
+try:
+    from re import _parser as sre_parse, _compiler as sre_compile
+except ImportError:  # Python < 3.11
+    import sre_parse, sre_compile
+
+from aiogram import types
+
+from .database import db
+from .pipeline import MessageContext
+from .utils import log_action
+
+logger = logging.getLogger(__name__)
+
+KIND_WORD = "word"
+KIND_DOMAIN = "domain"
+KIND_REGEX = "regex"
+KINDS = (KIND_WORD, KIND_DOMAIN, KIND_REGEX)
+MAX_PATTERN_LENGTH = 200
+# Выражения модераторов проверяются не дальше этого символа текста: это
+# предел длины сообщения Telegram, дальше идут только адреса скрытых ссылок
+REGEX_SCAN_LIMIT = 4096
+
+_DOMAIN_RE = re.compile(r"^[\w-]+(\.[\w-]+)+$")
+_SCHEME_RE = re.compile(r"^[a-z][a-z0-9+.-]*://")
+
+
+def normalize(kind: str, pattern: str) -> str:
+    """Приводит шаблон к виду, в котором он хранится; ValueError — шаблон некорректен"""
+    pattern = pattern.strip()
+    if not pattern:
+        raise ValueError("пустой шаблон")
+    if len(pattern) > MAX_PATTERN_LENGTH:
+        raise ValueError(f"шаблон длиннее {MAX_PATTERN_LENGTH} символов")
+    if kind == KIND_WORD:
+        return " ".join(pattern.lower().split())
+    if kind == KIND_DOMAIN:
+        domain = _SCHEME_RE.sub("", pattern.lower()).split("/", 1)[0].split(":", 1)[0]
+        domain = domain.removeprefix("www.")
+        if not _DOMAIN_RE.match(domain):
+            raise ValueError("некорректный домен")
+        return domain
+    if kind == KIND_REGEX:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"ошибка в выражении: {e}")
+        check_regex(pattern)
+        return pattern
+    raise ValueError("неизвестный тип шаблона")
+
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)}
+_CHARS = {sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.ANY, sre_parse.IN}
+_ATOMIC = getattr(sre_parse, "ATOMIC_GROUP", None)
+# Символы, на которых сравниваются множества: латиница с диакритикой,
+# кириллица, цифры, пробелы, знаки и по одному символу из других блоков
+_ALPHABET = "".join(map(chr, [*range(0x300), *range(0x400, 0x530)])) + "\u2002\u2014\u3042\u4e2d\U0001f600"
+_charsets: dict = {}
+
+
+def _charset(state, item) -> frozenset:
+    """Символы _ALPHABET, которые совпадают с одиночным символом шаблона"""
+    key = (item[0], str(item[1]))
+    if key not in _charsets:
+        compiled = sre_compile.compile(sre_parse.SubPattern(state, [item]), re.IGNORECASE)
+        _charsets[key] = frozenset(c for c in _ALPHABET if compiled.fullmatch(c))
+    return _charsets[key]
+
+
+def _chars(state, items) -> frozenset:
+    """Все символы, которые может поглотить последовательность"""
+    chars = frozenset()
+    for op, av in items:
+        if op in _CHARS:
+            chars |= _charset(state, (op, av))
+        elif op in _REPEATS:
+            chars |= _chars(state, av[2])
+        elif op == sre_parse.SUBPATTERN:
+            chars |= _chars(state, av[-1])
+        elif op == _ATOMIC:
+            chars |= _chars(state, av)
+        elif op == sre_parse.BRANCH:
+            for branch in av[1]:
+                chars |= _chars(state, branch)
+        elif op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            return frozenset(_ALPHABET)
+    return chars
+
+
+def _first(state, items) -> tuple[frozenset, bool]:
+    """(символы, с которых может начаться совпадение; может ли оно быть пустым)"""
+    first = frozenset()
+    for op, av in items:
+        if op in _CHARS:
+            return first | _charset(state, (op, av)), False
+        if op in _REPEATS:
+            chars, empty = _first(state, av[2])
+            first |= chars
+            if av[0] and not empty:
+                return first, False
+        elif op in (sre_parse.SUBPATTERN, _ATOMIC):
+            chars, empty = _first(state, av[-1] if op == sre_parse.SUBPATTERN else av)
+            first |= chars
+            if not empty:
+                return first, False
+        elif op == sre_parse.BRANCH:
+            branches = [_first(state, branch) for branch in av[1]]
+            first = first.union(*(chars for chars, _ in branches))
+            if not any(empty for _, empty in branches):
+                return first, False
+        elif op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            first |= frozenset(_ALPHABET)
+    return first, True
+
+
+def _scan(state, items, open_repeats: list, in_repeat: bool) -> list:
+    """Проходит последовательность; open_repeats — символы ещё не закрытых повторов"""
+    for op, av in items:
+        if op in _CHARS:
+            chars = _charset(state, (op, av))
+            open_repeats = [r for r in open_repeats if r & chars]
+        elif op in _REPEATS:
+            low, high, body = av
+            if in_repeat and low != high:
+                raise ValueError("вложенные квантификаторы не поддерживаются")
+            if low == high:
+                for _ in range(min(low, 2)):
+                    open_repeats = _scan(state, body, open_repeats, in_repeat or high > 1)
+                continue
+            _scan(state, body, [], in_repeat or high > 1)
+            chars = _chars(state, body)
+            if any(r & chars for r in open_repeats):
+                raise ValueError("квантификаторы подряд по пересекающимся символам не поддерживаются")
+            open_repeats = open_repeats + [chars]
+        elif op == sre_parse.SUBPATTERN:
+            open_repeats = _scan(state, av[-1], open_repeats, in_repeat)
+        elif op == _ATOMIC:
+            open_repeats = _scan(state, av, open_repeats, in_repeat)
+        elif op == sre_parse.BRANCH:
+            branches = [_first(state, branch) for branch in av[1]]
+            empty = sum(1 for _, e in branches if e)
+            if empty > (0 if in_repeat else 1):
+                raise ValueError("пустой вариант в альтернативе не поддерживается")
+            for i, (chars, _) in enumerate(branches):
+                if any(chars & other for other, _ in branches[i + 1:]):
+                    raise ValueError("варианты альтернативы начинаются с одних и тех же символов")
+            after = [_scan(state, branch, open_repeats, in_repeat) for branch in av[1]]
+            open_repeats = list(dict.fromkeys(r for branch in after for r in branch))
+        elif op == sre_parse.GROUPREF_EXISTS:
+            after = [_scan(state, branch, open_repeats, in_repeat) for branch in av[1:] if branch is not None]
+            open_repeats = list(dict.fromkeys(r for branch in after for r in branch))
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            _scan(state, av[1], [], in_repeat)
+    return open_repeats
+
+
+def check_regex(pattern: str):
+    """ValueError, если на выражении re может уйти в перебор с возвратами"""
+    parsed = sre_parse.parse(pattern)
+    _scan(parsed.state, parsed, [], False)
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """Регулярное выражение из префиксного дерева слов"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: dict) -> str:
+        branches = [
+            (r"\s+" if ch == " " else re.escape(ch)) + build(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if "" in node else group
+
+    return build(trie)
+
+
+class BlocklistMatcher:
+    """Слова и домены чата в одном выражении, выражения модераторов — по отдельности"""
+
+    def __init__(self, words: Iterable[str] = (), domains: Iterable[str] = (), regexes: Iterable[str] = ()):
+        parts = []
+        words, domains, regexes = sorted(words), sorted(domains), sorted(regexes)
+        if domains:
+            parts.append(rf"(?P<{KIND_DOMAIN}>(?<![\w-])(?:{trie_pattern(domains)})(?![\w-]))")
+        if words:
+            parts.append(rf"(?P<{KIND_WORD}>(?<!\w)(?:{trie_pattern(words)})(?!\w))")
+        self.size = len(words) + len(domains) + len(regexes)
+        self._regex = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+        self._regexes = [re.compile(r, re.IGNORECASE) for r in regexes]
+
+    def match(self, text: str) -> Optional[tuple[str, str]]:
+        """(тип шаблона, совпавший фрагмент) или None"""
+        if not text:
+            return None
+        if self._regex is not None and (found := self._regex.search(text)):
+            return found.lastgroup, found.group()
+        text = text[:REGEX_SCAN_LIMIT]
+        for regex in self._regexes:
+            if found := regex.search(text):
+                return KIND_REGEX, found.group()
+        return None
+
+
+class Blocklists:
+    """Чёрные списки по чатам и собранный BlocklistMatcher для каждого чата"""
+
+    def __init__(self):
+        self._entries: dict[int, dict[str, set[str]]] = {}
+        self._matchers: dict[int, BlocklistMatcher] = {}
+
+    async def load(self):
+        self._entries.clear()
+        for chat_id, kind, pattern in await db.get_blocklist_entries():
+            if kind == KIND_REGEX:
+                try:
+                    normalize(kind, pattern)
+                except ValueError as e:
+                    # Сохранено до появления проверки на вложенные квантификаторы
+                    logger.error(f"Ошибка в выражении чёрного списка чата {chat_id}, пропущено {pattern!r}: {e}")
+                    continue
+            self._entries.setdefault(chat_id, {k: set() for k in KINDS})[kind].add(pattern)
+        self._matchers = {chat_id: await self._build_async(chat_id) for chat_id in self._entries}
+
+    async def _build_async(self, chat_id: int, entries: dict[str, set[str]] = None) -> BlocklistMatcher:
+        """Собирает матчер в потоке по снимку шаблонов"""
+        entries = entries or self._entries[chat_id]
+        return await asyncio.to_thread(
+            BlocklistMatcher, list(entries[KIND_WORD]), list(entries[KIND_DOMAIN]), list(entries[KIND_REGEX])
+        )
+
+    def matcher(self, chat_id: int) -> Optional[BlocklistMatcher]:
+        return self._matchers.get(chat_id)
+
+    def entries(self, chat_id: int) -> dict[str, list[str]]:
+        entries = self._entries.get(chat_id, {})
+        return {kind: sorted(entries.get(kind, ())) for kind in KINDS}
+
+    async def add(self, chat_id: int, kind: str, pattern: str, added_by: int) -> bool:
+        """Добавляет шаблон; ValueError — шаблон некорректен"""
+        pattern = normalize(kind, pattern)
+        candidate = {k: set(v) for k, v in self._entries.get(chat_id, {k: set() for k in KINDS}).items()}
+        if pattern in candidate[kind]:
+            return False
+        candidate[kind].add(pattern)
+        try:
+            matcher = await self._build_async(chat_id, candidate)
+        except re.error as e:
+            raise ValueError(f"ошибка в выражении: {e}")
+        if not await db.add_blocklist_entry(chat_id, kind, pattern, added_by, time.time()):
+            return False
+        entries = self._entries.setdefault(chat_id, {k: set() for k in KINDS})
+        entries[kind].add(pattern)
+        if entries != candidate:
+            # Пока шла сборка, список чата изменился ещё раз
+            matcher = await self._build_async(chat_id)
+        self._matchers[chat_id] = matcher
+        return True
+
+    async def remove(self, chat_id: int, kind: str, pattern: str) -> bool:
+        try:
+            pattern = normalize(kind, pattern)
+        except ValueError:
+            return False
+        if pattern not in self._entries.get(chat_id, {}).get(kind, ()):
+            return False
+        await db.remove_blocklist_entry(chat_id, kind, pattern)
+        entries = self._entries.get(chat_id)
+        if entries is None:
+            return True
+        entries[kind].discard(pattern)
+        if any(entries.values()):
+            self._matchers[chat_id] = await self._build_async(chat_id)
+        else:
+            self._entries.pop(chat_id, None)
+            self._matchers.pop(chat_id, None)
+        return True
+
+
+blocklists = Blocklists()
+
+
+def scan_text(message: types.Message, text: str) -> str:
+    """Текст сообщения вместе с адресами скрытых ссылок"""
+    entities = message.entities or message.caption_entities
+    if not entities:
+        return text
+    urls = [e.url for e in entities if e.url]
+    return " ".join([text, *urls]) if urls else text
+
+
+async def blocklist_filter(ctx: MessageContext) -> bool:
+    """Этап конвейера: удаляет сообщения, совпавшие с чёрным списком чата"""
+    if not ctx.is_group_message:
+        return False
+    matcher = blocklists.matcher(ctx.chat_id)
+    if matcher is None:
+        return False
+    hit = matcher.match(scan_text(ctx.message, ctx.text))
+    if hit is None or await ctx.is_moderator():
+        return False
+
+    try:
+        await ctx.message.delete()
+    except Exception as e:
+        logger.error(f"Ошибка при удалении сообщения: {e}")
+    log_action("Blocklist", 0, ctx.user_id, f"{hit[0]}: {hit[1]}", chat_id=ctx.chat_id)
+    return True
@@ -1,20 +1,32 @@
 import os
+import queue
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums.parse_mode import ParseMode
 
+from .outbound import OutboundDispatcher
+
 load_dotenv()
 
+# Запись в файл и консоль идёт в отдельном потоке: цикл событий только
+# кладёт запись в очередь и не ждёт диска.
+_log_queue = queue.SimpleQueue()
+log_listener = QueueListener(
+    _log_queue,
+    logging.FileHandler('bot_actions.log', encoding='utf-8'),
+    logging.StreamHandler()
+)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot_actions.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+    handlers=[QueueHandler(_log_queue)]
 )
+log_listener.start()
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
 logging.getLogger('aiogram.event').setLevel(logging.INFO)
 
@@ -22,5 +34,26 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 ADMINS = set(map(int, os.getenv("ADMINS", "").split(","))) if os.getenv("ADMINS") else set()
 LOG_CHANNEL = os.getenv("LOG_CHANNEL")
 
+# Режим получения апдейтов: polling (по умолчанию) или webhook. В режиме
+# webhook бот слушает обычный HTTP на WEBHOOK_HOST:WEBHOOK_PORT, а TLS
+# терминирует обратный прокси (nginx, caddy), доступный по WEBHOOK_URL.
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+
+# BOT_WORKERS > 1 включает режим супервизора: апдейты распределяются
+# по процессам-воркерам по chat_id.
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1"))
+
+# Метрики в формате Prometheus на http://METRICS_HOST:METRICS_PORT/metrics;
+# METRICS_PORT=0 отключает эндпоинт. Воркер i слушает METRICS_PORT + 1 + i.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
 bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+outbound = OutboundDispatcher()
+bot.session.middleware(outbound)
 dp = Dispatcher()
@@ -1,3 +1,6 @@
 from .database import Database
+from .async_database import AsyncDatabase
 
-__all__ = ['Database']
\ No newline at end of file
+db = AsyncDatabase()
+
+__all__ = ['Database', 'AsyncDatabase', 'db']
@@ -0,0 +1,261 @@
+import time
+import asyncio
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .database import Database, DEFAULT_DB_PATH
+from .mute_index import MuteIndex
+from ..metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_FLUSH = "flush"
+
+
+def _read_method(name: str):
+    async def method(self, *args, **kwargs):
+        return await self._read(name, *args, **kwargs)
+    method.__name__ = name
+    return method
+
+
+def _write_method(name: str, durable: bool = False):
+    async def method(self, *args):
+        return await self._write(name, args, durable)
+    method.__name__ = name
+    return method
+
+
+class AsyncDatabase:
+    """Асинхронный фасад над Database: один поток-писатель и пул читателей"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, readers: int = 4,
+                 batch_interval: float = 0.05, batch_size: int = 100,
+                 shard: Optional[tuple[int, int]] = None):
+        self.db_path = db_path
+        self.shard = shard
+        self.readers = readers
+        self.batch_interval = batch_interval
+        self.batch_size = batch_size
+        self._writer: Optional[Database] = None
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._read_conns: list[Database] = []
+        self._lock = threading.Lock()
+        self.mutes = MuteIndex()
+        self.lost_writes = 0
+
+    def start(self):
+        """Открывает соединение писателя (схема создаётся здесь, один раз) и запускает поток"""
+        if self._thread is not None:
+            return
+        # Транзакции писателя фиксирует только _flush, чтобы ошибка коммита
+        # всегда доходила до ждущих durable-записей
+        self._writer = Database(self.db_path, batch_size=float("inf"), shard=self.shard)
+        self.mutes.load(self._writer.get_active_mutes())
+        self._pool = ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix="db-reader")
+        self._thread = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+        self._thread.start()
+
+    async def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+        self._pool.shutdown(wait=True)
+        with self._lock:
+            for conn in self._read_conns:
+                conn.close()
+            self._read_conns.clear()
+        self._writer.close()
+        self._thread = None
+        self._pool = None
+        self._writer = None
+
+    def _writer_loop(self):
+        deadline = None
+        waiting = []
+        while True:
+            if waiting:
+                timeout = 0
+            elif self._writer.pending:
+                timeout = max(0.0, deadline - time.monotonic())
+            else:
+                timeout = None
+            try:
+                job = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._flush(waiting)
+                waiting = []
+                continue
+            if job is _STOP:
+                self._flush(waiting)
+                break
+
+            name, args, durable, future, loop = job
+            started = self._writer.pending
+            try:
+                result = None if name == _FLUSH else getattr(self._writer, name)(*args)
+            except Exception as e:
+                if future is None:
+                    logger.error(f"Ошибка записи {name}: {e}")
+                else:
+                    loop.call_soon_threadsafe(_set_exception, future, e)
+            else:
+                if durable:
+                    waiting.append((future, loop, result, name != _FLUSH))
+                elif future is not None:
+                    loop.call_soon_threadsafe(_set_result, future, result)
+            if self._writer.pending and not started:
+                deadline = time.monotonic() + self.batch_interval
+            if len(waiting) >= self.batch_size or self._writer.pending >= self.batch_size:
+                self._flush(waiting)
+                waiting = []
+
+    def _flush(self, waiting: list):
+        """Фиксирует транзакцию и отпускает ждущих; при ошибке откатывает её"""
+        pending = self._writer.pending
+        try:
+            self._writer.flush()
+        except Exception as e:
+            lost = pending - sum(1 for *_, is_write in waiting if is_write)
+            self.lost_writes += lost
+            logger.error(f"Ошибка при фиксации пакета записей, потеряно обычных записей: {lost}: {e}")
+            for future, loop, *_ in waiting:
+                loop.call_soon_threadsafe(_set_exception, future, e)
+            return
+        for future, loop, result, _ in waiting:
+            loop.call_soon_threadsafe(_set_result, future, result)
+
+    def _reader(self) -> Database:
+        conn = getattr(self._local, "db", None)
+        if conn is None:
+            conn = Database(self.db_path, read_only=True, shard=self.shard)
+            self._local.db = conn
+            with self._lock:
+                self._read_conns.append(conn)
+        return conn
+
+    def _run_read(self, name: str, args: tuple, kwargs: dict):
+        return getattr(self._reader(), name)(*args, **kwargs)
+
+    async def _read(self, name: str, *args, **kwargs):
+        self.start()
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, self._run_read, name, args, kwargs)
+        finally:
+            metrics.observe_db(name, time.perf_counter() - started)
+
+    async def _write(self, name: str, args: tuple, durable: bool):
+        self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        started = time.perf_counter()
+        self._queue.put((name, args, durable, future, loop))
+        try:
+            return await future
+        finally:
+            metrics.observe_db(name, time.perf_counter() - started)
+
+    def write_nowait(self, name: str, *args) -> bool:
+        """Ставит запись в очередь писателя из любого потока; False — база закрыта"""
+        if self._thread is None:
+            return False
+        self._queue.put((name, args, False, None, None))
+        return True
+
+    async def flush(self):
+        """Дожидается фиксации всех ранее поставленных в очередь записей"""
+        await self._write(_FLUSH, (), True)
+
+    @property
+    def write_queue_size(self) -> int:
+        return self._queue.qsize()
+
+    get_user = _read_method("get_user")
+    get_user_by_username = _read_method("get_user_by_username")
+    get_warns = _read_method("get_warns")
+    get_mute = _read_method("get_mute")
+    get_active_mutes = _read_method("get_active_mutes")
+    get_all_mutes = _read_method("get_all_mutes")
+    get_active_mutes_page = _read_method("get_active_mutes_page")
+    get_mutes_after = _read_method("get_mutes_after")
+    count_mutes = _read_method("count_mutes")
+    get_bans_after = _read_method("get_bans_after")
+    count_bans = _read_method("count_bans")
+    get_amnesty_jobs = _read_method("get_amnesty_jobs")
+    get_warns_page = _read_method("get_warns_page")
+    get_bans_page = _read_method("get_bans_page")
+    get_all_users_with_warns = _read_method("get_all_users_with_warns")
+    get_ban = _read_method("get_ban")
+    get_bans = _read_method("get_bans")
+    get_banned = _read_method("get_banned")
+    count_message_verifications = _read_method("count_message_verifications")
+    has_verification = _read_method("has_verification")
+    get_next_verification_deadline = _read_method("get_next_verification_deadline")
+    get_audit_log = _read_method("get_audit_log")
+    get_processed_commands = _read_method("get_processed_commands")
+    get_blocklist_entries = _read_method("get_blocklist_entries")
+    find_users = _read_method("find_users")
+    get_recent_joins = _read_method("get_recent_joins")
+
+    async def add_mute(self, chat_id: int, user_id: int, until: float):
+        self.start()
+        self.mutes.add(chat_id, user_id, until)
+        await self._write("add_mute", (chat_id, user_id, until), False)
+
+    async def remove_mute(self, chat_id: int, user_id: int, until: Optional[float] = None) -> bool:
+        """until — снять, только если срок мута не менялся; False — мут уже выдан заново"""
+        self.start()
+        if until is not None and self.mutes.until(chat_id, user_id) not in (None, until):
+            return False
+        self.mutes.remove(chat_id, user_id)
+        await self._write("remove_mute", (chat_id, user_id, until), False)
+        return True
+
+    async def add_mutes(self, chat_id: int, user_ids: list[int], until: float):
+        self.start()
+        for uid in user_ids:
+            self.mutes.add(chat_id, uid, until)
+        await self._write("add_mutes", (chat_id, user_ids, until), False)
+
+    update_user = _write_method("update_user")
+    update_users = _write_method("update_users")
+    add_warn = _write_method("add_warn", durable=True)
+    add_warns = _write_method("add_warns", durable=True)
+    clear_warns = _write_method("clear_warns", durable=True)
+    clear_all_warns = _write_method("clear_all_warns", durable=True)
+    add_ban = _write_method("add_ban", durable=True)
+    add_bans = _write_method("add_bans", durable=True)
+    remove_ban = _write_method("remove_ban", durable=True)
+    clear_bans = _write_method("clear_bans", durable=True)
+    create_amnesty_job = _write_method("create_amnesty_job", durable=True)
+    update_amnesty_job = _write_method("update_amnesty_job", durable=True)
+    delete_amnesty_job = _write_method("delete_amnesty_job", durable=True)
+    add_verification = _write_method("add_verification", durable=True)
+    add_verifications = _write_method("add_verifications", durable=True)
+    pop_verification = _write_method("pop_verification", durable=True)
+    pop_expired_verifications = _write_method("pop_expired_verifications", durable=True)
+    add_processed_command = _write_method("add_processed_command")
+    prune_processed_commands = _write_method("prune_processed_commands")
+    add_blocklist_entry = _write_method("add_blocklist_entry", durable=True)
+    remove_blocklist_entry = _write_method("remove_blocklist_entry", durable=True)
+    add_joins = _write_method("add_joins")
+    prune_joins = _write_method("prune_joins")
+
+
+def _set_result(future: asyncio.Future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, exc: Exception):
+    if not future.done():
+        future.set_exception(exc)
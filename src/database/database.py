@@ -1,53 +1,72 @@
+import time
 import sqlite3
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from aiogram import types
 
+from .migrations import migrate
+
+DEFAULT_DB_PATH = 'src/database/bot_data.db'
+
 
 class Database:
-    def __init__(self, db_path='src/database/bot_data.db'):
-        self.db_path = db_path
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.cursor = self.conn.cursor()
-        self._create_tables()
+    """Синхронный доступ к SQLite; shard = (index, count) ограничивает выборки чатами шарда"""
 
-    def _create_tables(self):
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                username TEXT,
-                full_name TEXT,
-                first_name TEXT,
-                last_name TEXT
-            )
-        ''')
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS warns (
-                user_id INTEGER PRIMARY KEY,
-                count INTEGER DEFAULT 0
-            )
-        ''')
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS mutes (
-                user_id INTEGER PRIMARY KEY,
-                chat_id INTEGER,
-                until REAL
+    def __init__(self, db_path=DEFAULT_DB_PATH, read_only: bool = False, batch_size: int = 1,
+                 shard: Optional[Tuple[int, int]] = None):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.pending = 0
+        self.shard_index, self.shard_count = shard or (0, 1)
+        if read_only:
+            self.conn = sqlite3.connect(
+                f'file:{db_path}?mode=ro', uri=True, check_same_thread=False, cached_statements=256
             )
-        ''')
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bans (
-                chat_id INTEGER,
-                user_id INTEGER,
-                PRIMARY KEY (chat_id, user_id)
+        else:
+            self.conn = sqlite3.connect(
+                db_path, check_same_thread=False, cached_statements=256, isolation_level='IMMEDIATE'
             )
-        ''')
-        self.conn.commit()
+        self.conn.execute('PRAGMA busy_timeout = 5000')
+        self.cursor = self.conn.cursor()
+        if not read_only:
+            self.conn.execute('PRAGMA journal_mode = WAL')
+            self.conn.execute('PRAGMA synchronous = NORMAL')
+            migrate(self.conn)
+
+    def _commit(self):
+        """Фиксирует запись сразу или, в пакетном режиме, раз в batch_size операций"""
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Фиксирует транзакцию; при ошибке откатывает её"""
+        if self.pending:
+            try:
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            finally:
+                self.pending = 0
+
+    @staticmethod
+    def _user_row(user: types.User) -> tuple:
+        username = user.username.lower() if user.username else None
+        return user.id, username, user.full_name, user.first_name, user.last_name, time.time()
 
     def update_user(self, user: types.User):
         self.cursor.execute('''
-            INSERT OR REPLACE INTO users (id, username, full_name, first_name, last_name)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user.id, user.username, user.full_name, user.first_name, user.last_name))
-        self.conn.commit()
+            INSERT OR REPLACE INTO users (id, username, full_name, first_name, last_name, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', self._user_row(user))
+        self._commit()
+
+    def update_users(self, users: List[types.User]):
+        self.cursor.executemany('''
+            INSERT OR REPLACE INTO users (id, username, full_name, first_name, last_name, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [self._user_row(u) for u in users])
+        self._commit()
 
     def get_user(self, user_id: int) -> Dict:
         self.cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
@@ -58,7 +77,8 @@ class Database:
                 'username': row[1],
                 'full_name': row[2],
                 'first_name': row[3],
-                'last_name': row[4]
+                'last_name': row[4],
+                'updated_at': row[5]
             }
         return {}
 
@@ -69,75 +89,143 @@ class Database:
         row = self.cursor.fetchone()
         return row[0] if row else None
 
-    def add_warn(self, user_id: int) -> int:
+    def add_warn(self, chat_id: int, user_id: int) -> int:
         self.cursor.execute('''
-            INSERT INTO warns (user_id, count) VALUES (?, 1)
-            ON CONFLICT(user_id) DO UPDATE SET count = count + 1
+            INSERT INTO warns (chat_id, user_id, count) VALUES (?, ?, 1)
+            ON CONFLICT(chat_id, user_id) DO UPDATE SET count = count + 1
             RETURNING count
-        ''', (user_id,))
+        ''', (chat_id, user_id))
         result = self.cursor.fetchone()
-        self.conn.commit()
+        self._commit()
         return result[0] if result else 1
 
-    def get_warns(self, user_id: int) -> int:
-        self.cursor.execute('SELECT count FROM warns WHERE user_id = ?', (user_id,))
+    def get_warns(self, chat_id: int, user_id: int) -> int:
+        self.cursor.execute('''
+            SELECT count FROM warns WHERE chat_id = ? AND user_id = ?
+        ''', (chat_id, user_id))
         row = self.cursor.fetchone()
         return row[0] if row else 0
 
-    def clear_warns(self, user_id: int) -> int:
-        self.cursor.execute('SELECT count FROM warns WHERE user_id = ?', (user_id,))
+    def clear_warns(self, chat_id: int, user_id: int) -> int:
+        self.cursor.execute('''
+            DELETE FROM warns WHERE chat_id = ? AND user_id = ?
+            RETURNING count
+        ''', (chat_id, user_id))
         row = self.cursor.fetchone()
-        count = row[0] if row else 0
-        self.cursor.execute('DELETE FROM warns WHERE user_id = ?', (user_id,))
-        self.conn.commit()
-        return count
+        self._commit()
+        return row[0] if row else 0
 
-    def clear_all_warns(self):
-        self.cursor.execute('DELETE FROM warns')
-        self.conn.commit()
+    def clear_all_warns(self, chat_id: int):
+        self.cursor.execute('DELETE FROM warns WHERE chat_id = ?', (chat_id,))
+        self._commit()
 
-    def add_mute(self, user_id: int, chat_id: int, until: float):
+    def add_mute(self, chat_id: int, user_id: int, until: float):
         self.cursor.execute('''
-            INSERT OR REPLACE INTO mutes (user_id, chat_id, until)
+            INSERT OR REPLACE INTO mutes (chat_id, user_id, until)
             VALUES (?, ?, ?)
-        ''', (user_id, chat_id, until))
-        self.conn.commit()
+        ''', (chat_id, user_id, until))
+        self._commit()
 
-    def remove_mute(self, user_id: int):
-        self.cursor.execute('DELETE FROM mutes WHERE user_id = ?', (user_id,))
-        self.conn.commit()
+    def remove_mute(self, chat_id: int, user_id: int, until: Optional[float] = None):
+        """until — удалить, только если срок мута не менялся"""
+        if until is None:
+            self.cursor.execute('''
+                DELETE FROM mutes WHERE chat_id = ? AND user_id = ?
+            ''', (chat_id, user_id))
+        else:
+            self.cursor.execute('''
+                DELETE FROM mutes WHERE chat_id = ? AND user_id = ? AND until = ?
+            ''', (chat_id, user_id, until))
+        self._commit()
 
-    def get_mute(self, user_id: int) -> Optional[Dict]:
-        self.cursor.execute('SELECT * FROM mutes WHERE user_id = ?', (user_id,))
+    def get_mute(self, chat_id: int, user_id: int) -> Optional[Dict]:
+        self.cursor.execute('''
+            SELECT chat_id, user_id, until FROM mutes WHERE chat_id = ? AND user_id = ?
+        ''', (chat_id, user_id))
         row = self.cursor.fetchone()
-        if row:
-            return {'user_id': row[0], 'chat_id': row[1], 'until': row[2]}
-        return None
+        return self._mute(row) if row else None
 
     def get_active_mutes(self) -> List[Dict]:
-        from datetime import datetime
-        now = datetime.now().timestamp()
-        self.cursor.execute('SELECT * FROM mutes WHERE until > ?', (now,))
+        self.cursor.execute('''
+            SELECT chat_id, user_id, until FROM mutes WHERE until > ? AND abs(chat_id) % ? = ?
+        ''', (time.time(), self.shard_count, self.shard_index))
+        return [self._mute(row) for row in self.cursor.fetchall()]
+    
+    def get_all_mutes(self) -> List[Dict]:
+        self.cursor.execute('''
+            SELECT chat_id, user_id, until FROM mutes WHERE abs(chat_id) % ? = ?
+        ''', (self.shard_count, self.shard_index))
+        return [self._mute(row) for row in self.cursor.fetchall()]
+
+    def get_mutes_after(self, chat_id: int, user_id: int, limit: int) -> List[Dict]:
+        self.cursor.execute('''
+            SELECT chat_id, user_id, until FROM mutes
+            WHERE chat_id = ? AND user_id > ? ORDER BY user_id LIMIT ?
+        ''', (chat_id, user_id, limit))
+        return [self._mute(row) for row in self.cursor.fetchall()]
+
+    def count_mutes(self, chat_id: int) -> int:
+        self.cursor.execute('SELECT COUNT(*) FROM mutes WHERE chat_id = ?', (chat_id,))
+        return self.cursor.fetchone()[0]
+
+    def get_active_mutes_page(self, chat_id: int, offset: int, limit: int) -> Tuple[List[Dict], int]:
+        now = time.time()
+        self.cursor.execute('''
+            SELECT COUNT(*) FROM mutes WHERE chat_id = ? AND until > ?
+        ''', (chat_id, now))
+        total = self.cursor.fetchone()[0]
+        self.cursor.execute('''
+            SELECT m.user_id, m.chat_id, m.until, u.full_name
+            FROM mutes m LEFT JOIN users u ON u.id = m.user_id
+            WHERE m.chat_id = ? AND m.until > ?
+            ORDER BY m.until
+            LIMIT ? OFFSET ?
+        ''', (chat_id, now, limit, offset))
         return [
-            {'user_id': row[0], 'chat_id': row[1], 'until': row[2]}
+            {'user_id': row[0], 'chat_id': row[1], 'until': row[2], 'full_name': row[3]}
             for row in self.cursor.fetchall()
-        ]
-    
-    def get_all_users_with_warns(self) -> List[int]:
-        self.cursor.execute('SELECT user_id FROM warns WHERE count > 0')
+        ], total
+
+    def get_warns_page(self, chat_id: int, offset: int, limit: int) -> Tuple[List[Dict], int]:
+        self.cursor.execute('''
+            SELECT COUNT(*) FROM warns WHERE chat_id = ? AND count > 0
+        ''', (chat_id,))
+        total = self.cursor.fetchone()[0]
+        self.cursor.execute('''
+            SELECT w.user_id, w.count, u.full_name
+            FROM warns w LEFT JOIN users u ON u.id = w.user_id
+            WHERE w.chat_id = ? AND w.count > 0
+            ORDER BY w.count DESC, w.user_id
+            LIMIT ? OFFSET ?
+        ''', (chat_id, limit, offset))
+        return [
+            {'user_id': row[0], 'count': row[1], 'full_name': row[2]}
+            for row in self.cursor.fetchall()
+        ], total
+
+    def get_all_users_with_warns(self, chat_id: int) -> List[int]:
+        self.cursor.execute('''
+            SELECT user_id FROM warns WHERE chat_id = ? AND count > 0
+        ''', (chat_id,))
         return [row[0] for row in self.cursor.fetchall()]
 
     def add_ban(self, chat_id: int, user_id: int):
         self.cursor.execute('''
             INSERT OR IGNORE INTO bans (chat_id, user_id) VALUES (?, ?)
         ''', (chat_id, user_id))
-        self.conn.commit()
+        self._commit()
+
+    def add_bans(self, chat_id: int, user_ids: List[int]):
+        self.cursor.executemany('''
+            INSERT OR IGNORE INTO bans (chat_id, user_id) VALUES (?, ?)
+        ''', [(chat_id, uid) for uid in user_ids])
+        self._commit()
 
     def remove_ban(self, chat_id: int, user_id: int):
         self.cursor.execute('''
             DELETE FROM bans WHERE chat_id = ? AND user_id = ?
         ''', (chat_id, user_id))
-        self.conn.commit()
+        self._commit()
 
     def get_ban(self, chat_id: int, user_id: int) -> bool:
         self.cursor.execute('''
@@ -145,13 +233,291 @@ class Database:
         ''', (chat_id, user_id))
         return self.cursor.fetchone() is not None
 
+    def get_banned(self, chat_id: int, user_ids: List[int]) -> set:
+        if not user_ids:
+            return set()
+        placeholders = ','.join('?' * len(user_ids))
+        self.cursor.execute(
+            f'SELECT user_id FROM bans WHERE chat_id = ? AND user_id IN ({placeholders})',
+            (chat_id, *user_ids)
+        )
+        return {row[0] for row in self.cursor.fetchall()}
+
     def get_bans(self, chat_id: int) -> List[int]:
         self.cursor.execute('SELECT user_id FROM bans WHERE chat_id = ?', (chat_id,))
         return [row[0] for row in self.cursor.fetchall()]
 
+    def get_bans_after(self, chat_id: int, user_id: int, limit: int) -> List[int]:
+        self.cursor.execute('''
+            SELECT user_id FROM bans WHERE chat_id = ? AND user_id > ? ORDER BY user_id LIMIT ?
+        ''', (chat_id, user_id, limit))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def count_bans(self, chat_id: int) -> int:
+        self.cursor.execute('SELECT COUNT(*) FROM bans WHERE chat_id = ?', (chat_id,))
+        return self.cursor.fetchone()[0]
+
+    def get_bans_page(self, chat_id: int, offset: int, limit: int) -> Tuple[List[Dict], int]:
+        self.cursor.execute('SELECT COUNT(*) FROM bans WHERE chat_id = ?', (chat_id,))
+        total = self.cursor.fetchone()[0]
+        self.cursor.execute('''
+            SELECT b.user_id, u.full_name
+            FROM bans b LEFT JOIN users u ON u.id = b.user_id
+            WHERE b.chat_id = ?
+            ORDER BY b.user_id
+            LIMIT ? OFFSET ?
+        ''', (chat_id, limit, offset))
+        return [
+            {'user_id': row[0], 'full_name': row[1]}
+            for row in self.cursor.fetchall()
+        ], total
+
     def clear_bans(self, chat_id: int):
         self.cursor.execute('DELETE FROM bans WHERE chat_id = ?', (chat_id,))
-        self.conn.commit()
+        self._commit()
+
+    def add_verification(self, chat_id: int, user_id: int, message_id: int, full_name: str, deadline: float):
+        self.cursor.execute('''
+            INSERT OR REPLACE INTO verifications (chat_id, user_id, message_id, full_name, deadline)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (chat_id, user_id, message_id, full_name, deadline))
+        self._commit()
+
+    def add_verifications(self, chat_id: int, message_id: int, users: List[types.User], deadline: float):
+        self.cursor.executemany('''
+            INSERT OR REPLACE INTO verifications (chat_id, user_id, message_id, full_name, deadline)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(chat_id, u.id, message_id, u.full_name, deadline) for u in users])
+        self._commit()
+
+    def count_message_verifications(self, chat_id: int, message_id: int) -> int:
+        self.cursor.execute('''
+            SELECT COUNT(*) FROM verifications WHERE chat_id = ? AND message_id = ?
+        ''', (chat_id, message_id))
+        return self.cursor.fetchone()[0]
+
+    def has_verification(self, chat_id: int, user_id: int) -> bool:
+        self.cursor.execute('''
+            SELECT 1 FROM verifications WHERE chat_id = ? AND user_id = ?
+        ''', (chat_id, user_id))
+        return self.cursor.fetchone() is not None
+
+    def pop_verification(self, chat_id: int, user_id: int) -> Optional[Dict]:
+        self.cursor.execute('''
+            DELETE FROM verifications WHERE chat_id = ? AND user_id = ?
+            RETURNING chat_id, user_id, message_id, full_name, deadline
+        ''', (chat_id, user_id))
+        row = self.cursor.fetchone()
+        self._commit()
+        return self._verification(row) if row else None
+
+    def pop_expired_verifications(self, now: float, limit: int) -> List[Dict]:
+        self.cursor.execute('''
+            DELETE FROM verifications WHERE rowid IN (
+                SELECT rowid FROM verifications
+                WHERE deadline <= ? AND abs(chat_id) % ? = ?
+                ORDER BY deadline LIMIT ?
+            )
+            RETURNING chat_id, user_id, message_id, full_name, deadline
+        ''', (now, self.shard_count, self.shard_index, limit))
+        rows = self.cursor.fetchall()
+        self._commit()
+        return [self._verification(row) for row in rows]
+
+    def get_next_verification_deadline(self) -> Optional[float]:
+        self.cursor.execute('''
+            SELECT MIN(deadline) FROM verifications WHERE abs(chat_id) % ? = ?
+        ''', (self.shard_count, self.shard_index))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    def create_amnesty_job(self, chat_id: int, performer_id: int, message_id: int, total: int) -> bool:
+        self.cursor.execute('''
+            INSERT OR IGNORE INTO amnesty_jobs (chat_id, performer_id, message_id, stage, cursor, done, total)
+            VALUES (?, ?, ?, 'mutes', 0, 0, ?)
+        ''', (chat_id, performer_id, message_id, total))
+        created = self.cursor.rowcount > 0
+        self._commit()
+        return created
+
+    def update_amnesty_job(self, chat_id: int, stage: str, cursor: int, done: int):
+        self.cursor.execute('''
+            UPDATE amnesty_jobs SET stage = ?, cursor = ?, done = ? WHERE chat_id = ?
+        ''', (stage, cursor, done, chat_id))
+        self._commit()
+
+    def delete_amnesty_job(self, chat_id: int):
+        self.cursor.execute('DELETE FROM amnesty_jobs WHERE chat_id = ?', (chat_id,))
+        self._commit()
+
+    def get_amnesty_jobs(self) -> List[Dict]:
+        self.cursor.execute('''
+            SELECT chat_id, performer_id, message_id, stage, cursor, done, total FROM amnesty_jobs
+            WHERE abs(chat_id) % ? = ?
+        ''', (self.shard_count, self.shard_index))
+        return [
+            {
+                'chat_id': row[0],
+                'performer_id': row[1],
+                'message_id': row[2],
+                'stage': row[3],
+                'cursor': row[4],
+                'done': row[5],
+                'total': row[6]
+            }
+            for row in self.cursor.fetchall()
+        ]
+
+    def add_audit_record(self, ts: float, chat_id: Optional[int], action: str,
+                         performer_id: Optional[int], target_id: Optional[int], details: Optional[str]):
+        self.cursor.execute('''
+            INSERT INTO audit_log (ts, chat_id, action, performer_id, target_id, details)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (ts, chat_id, action, performer_id, target_id, details))
+        self._commit()
+
+    def get_audit_log(self, chat_id: int = None, user_id: int = None, action: str = None,
+                      limit: int = 50) -> List[Dict]:
+        """Последние записи журнала с фильтрами по чату, пользователю и действию"""
+        conditions, params = [], []
+        if chat_id is not None:
+            conditions.append('a.chat_id = ?')
+            params.append(chat_id)
+        if user_id is not None:
+            conditions.append('(a.performer_id = ? OR a.target_id = ?)')
+            params.extend((user_id, user_id))
+        if action is not None:
+            conditions.append('a.action = ?')
+            params.append(action)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        self.cursor.execute(f'''
+            SELECT a.ts, a.chat_id, a.action, a.performer_id, p.full_name, a.target_id, t.full_name, a.details
+            FROM audit_log a
+            LEFT JOIN users p ON p.id = a.performer_id
+            LEFT JOIN users t ON t.id = a.target_id
+            {where}
+            ORDER BY a.ts DESC
+            LIMIT ?
+        ''', (*params, limit))
+        return [
+            {
+                'ts': row[0],
+                'chat_id': row[1],
+                'action': row[2],
+                'performer_id': row[3],
+                'performer_name': row[4],
+                'target_id': row[5],
+                'target_name': row[6],
+                'details': row[7]
+            }
+            for row in self.cursor.fetchall()
+        ]
+
+    def add_processed_command(self, chat_id: int, message_id: int, ts: float):
+        self.cursor.execute('''
+            INSERT OR IGNORE INTO processed_commands (chat_id, message_id, ts) VALUES (?, ?, ?)
+        ''', (chat_id, message_id, ts))
+        self._commit()
+
+    def get_processed_commands(self, since: float) -> List[Tuple[int, int, float]]:
+        self.cursor.execute('''
+            SELECT chat_id, message_id, ts FROM processed_commands
+            WHERE ts >= ? AND abs(chat_id) % ? = ?
+            ORDER BY ts
+        ''', (since, self.shard_count, self.shard_index))
+        return self.cursor.fetchall()
+
+    def prune_processed_commands(self, before: float):
+        self.cursor.execute('DELETE FROM processed_commands WHERE ts < ?', (before,))
+        self._commit()
+
+    def add_blocklist_entry(self, chat_id: int, kind: str, pattern: str, added_by: int, added_at: float) -> bool:
+        self.cursor.execute('''
+            INSERT OR IGNORE INTO blocklist (chat_id, kind, pattern, added_by, added_at) VALUES (?, ?, ?, ?, ?)
+        ''', (chat_id, kind, pattern, added_by, added_at))
+        added = self.cursor.rowcount > 0
+        self._commit()
+        return added
+
+    def remove_blocklist_entry(self, chat_id: int, kind: str, pattern: str) -> bool:
+        self.cursor.execute('''
+            DELETE FROM blocklist WHERE chat_id = ? AND kind = ? AND pattern = ?
+        ''', (chat_id, kind, pattern))
+        removed = self.cursor.rowcount > 0
+        self._commit()
+        return removed
+
+    def get_blocklist_entries(self) -> List[Tuple[int, str, str]]:
+        self.cursor.execute('''
+            SELECT chat_id, kind, pattern FROM blocklist WHERE abs(chat_id) % ? = ?
+        ''', (self.shard_count, self.shard_index))
+        return self.cursor.fetchall()
+
+    def find_users(self, user_ids: List[int], usernames: List[str]) -> List[Tuple[int, Optional[str], Optional[str]]]:
+        """(id, username, full_name) известных пользователей по ID и юзернеймам одним запросом"""
+        if not user_ids and not usernames:
+            return []
+        self.cursor.execute(f'''
+            SELECT id, username, full_name FROM users
+            WHERE id IN ({','.join('?' * len(user_ids))}) OR username IN ({','.join('?' * len(usernames))})
+        ''', (*user_ids, *(u.lower() for u in usernames)))
+        return self.cursor.fetchall()
+
+    def add_joins(self, chat_id: int, user_ids: List[int], ts: float):
+        self.cursor.executemany('''
+            INSERT OR REPLACE INTO joins (chat_id, user_id, ts) VALUES (?, ?, ?)
+        ''', [(chat_id, uid, ts) for uid in user_ids])
+        self._commit()
+
+    def get_recent_joins(self, chat_id: int, since: float, limit: int = -1) -> List[int]:
+        """Вступившие с момента since, сначала новые"""
+        self.cursor.execute('''
+            SELECT user_id FROM joins WHERE chat_id = ? AND ts >= ? ORDER BY ts DESC LIMIT ?
+        ''', (chat_id, since, limit))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def prune_joins(self, before: float):
+        self.cursor.execute('DELETE FROM joins WHERE ts < ?', (before,))
+        self._commit()
+
+    def add_mutes(self, chat_id: int, user_ids: List[int], until: float):
+        self.cursor.executemany('''
+            INSERT OR REPLACE INTO mutes (chat_id, user_id, until)
+            VALUES (?, ?, ?)
+        ''', [(chat_id, uid, until) for uid in user_ids])
+        self._commit()
+
+    def add_warns(self, chat_id: int, user_ids: List[int], ban_at: int) -> Dict[int, int]:
+        """Выдаёт по предупреждению и банит набравших ban_at; возвращает новые счётчики"""
+        counts = {}
+        for uid in user_ids:
+            self.cursor.execute('''
+                INSERT INTO warns (chat_id, user_id, count) VALUES (?, ?, 1)
+                ON CONFLICT(chat_id, user_id) DO UPDATE SET count = count + 1
+                RETURNING count
+            ''', (chat_id, uid))
+            counts[uid] = self.cursor.fetchone()[0]
+        self.cursor.executemany('''
+            INSERT OR IGNORE INTO bans (chat_id, user_id) VALUES (?, ?)
+        ''', [(chat_id, uid) for uid, count in counts.items() if count >= ban_at])
+        self._commit()
+        return counts
+
+    @staticmethod
+    def _mute(row) -> Dict:
+        return {'chat_id': row[0], 'user_id': row[1], 'until': row[2]}
+
+    @staticmethod
+    def _verification(row) -> Dict:
+        return {
+            'chat_id': row[0],
+            'user_id': row[1],
+            'message_id': row[2],
+            'full_name': row[3],
+            'deadline': row[4]
+        }
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        self.flush()
+        self.conn.close()
+
@@ -0,0 +1,205 @@
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def _v1_initial(conn: sqlite3.Connection):
+    """Исходная схема (до версионирования базы)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT,
+            full_name TEXT,
+            first_name TEXT,
+            last_name TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS warns (
+            user_id INTEGER PRIMARY KEY,
+            count INTEGER DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS mutes (
+            user_id INTEGER PRIMARY KEY,
+            chat_id INTEGER,
+            until REAL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bans (
+            chat_id INTEGER,
+            user_id INTEGER,
+            PRIMARY KEY (chat_id, user_id)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS verifications (
+            chat_id INTEGER,
+            user_id INTEGER,
+            message_id INTEGER,
+            full_name TEXT,
+            deadline REAL,
+            PRIMARY KEY (chat_id, user_id)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_verifications_deadline ON verifications (deadline)
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS amnesty_jobs (
+            chat_id INTEGER PRIMARY KEY,
+            performer_id INTEGER,
+            message_id INTEGER,
+            stage TEXT,
+            cursor INTEGER DEFAULT 0,
+            done INTEGER DEFAULT 0,
+            total INTEGER DEFAULT 0
+        )
+    ''')
+
+
+def _legacy_warns_chat(conn: sqlite3.Connection) -> int:
+    """Чат для предупреждений v1: единственный чат из мутов и банов, иначе 0"""
+    chats = conn.execute('''
+        SELECT chat_id FROM mutes WHERE chat_id IS NOT NULL
+        UNION SELECT chat_id FROM bans
+    ''').fetchall()
+    return chats[0][0] if len(chats) == 1 else 0
+
+
+def _v2_chat_scoped(conn: sqlite3.Connection):
+    """Ключи (chat_id, user_id) у mutes и warns, индексы и username в нижнем регистре"""
+    conn.execute('UPDATE users SET username = lower(username) WHERE username <> lower(username)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)')
+
+    conn.execute('''
+        CREATE TABLE mutes_v2 (
+            chat_id INTEGER,
+            user_id INTEGER,
+            until REAL,
+            PRIMARY KEY (chat_id, user_id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO mutes_v2 (chat_id, user_id, until)
+        SELECT chat_id, user_id, until FROM mutes WHERE chat_id IS NOT NULL
+    ''')
+
+    conn.execute('''
+        CREATE TABLE warns_v2 (
+            chat_id INTEGER,
+            user_id INTEGER,
+            count INTEGER DEFAULT 0,
+            PRIMARY KEY (chat_id, user_id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO warns_v2 (chat_id, user_id, count)
+        SELECT ?, user_id, count FROM warns WHERE count > 0
+    ''', (_legacy_warns_chat(conn),))
+
+    conn.execute('DROP TABLE mutes')
+    conn.execute('ALTER TABLE mutes_v2 RENAME TO mutes')
+    conn.execute('CREATE INDEX idx_mutes_until ON mutes (until)')
+    conn.execute('CREATE INDEX idx_mutes_chat_until ON mutes (chat_id, until)')
+    conn.execute('DROP TABLE warns')
+    conn.execute('ALTER TABLE warns_v2 RENAME TO warns')
+
+
+def _v3_audit_log(conn: sqlite3.Connection):
+    """Журнал действий audit_log с индексами для выборок по чату, пользователю и действию"""
+    conn.execute('''
+        CREATE TABLE audit_log (
+            id INTEGER PRIMARY KEY,
+            ts REAL,
+            chat_id INTEGER,
+            action TEXT,
+            performer_id INTEGER,
+            target_id INTEGER,
+            details TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_audit_chat ON audit_log (chat_id, ts)')
+    conn.execute('CREATE INDEX idx_audit_performer ON audit_log (performer_id, ts)')
+    conn.execute('CREATE INDEX idx_audit_target ON audit_log (target_id, ts)')
+    conn.execute('CREATE INDEX idx_audit_action ON audit_log (action, ts)')
+
+
+def _v4_processed_commands(conn: sqlite3.Connection):
+    """Обработанные команды модерации для защиты от повторной доставки апдейтов"""
+    conn.execute('''
+        CREATE TABLE processed_commands (
+            chat_id INTEGER,
+            message_id INTEGER,
+            ts REAL,
+            PRIMARY KEY (chat_id, message_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX idx_processed_commands_ts ON processed_commands (ts)')
+
+
+def _v5_blocklist(conn: sqlite3.Connection):
+    """Чёрные списки чатов: слова и фразы, регулярные выражения, домены"""
+    conn.execute('''
+        CREATE TABLE blocklist (
+            chat_id INTEGER,
+            kind TEXT,
+            pattern TEXT,
+            added_by INTEGER,
+            added_at REAL,
+            PRIMARY KEY (chat_id, kind, pattern)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _v6_joins(conn: sqlite3.Connection):
+    """Вступления в чаты для массовых команд"""
+    conn.execute('''
+        CREATE TABLE joins (
+            chat_id INTEGER,
+            user_id INTEGER,
+            ts REAL,
+            PRIMARY KEY (chat_id, user_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX idx_joins_chat_ts ON joins (chat_id, ts)')
+
+
+def _v7_users_updated_at(conn: sqlite3.Connection):
+    """Время последнего подтверждения профиля"""
+    conn.execute('ALTER TABLE users ADD COLUMN updated_at REAL')
+
+
+MIGRATIONS = [
+    _v1_initial,
+    _v2_chat_scoped,
+    _v3_audit_log,
+    _v4_processed_commands,
+    _v5_blocklist,
+    _v6_joins,
+    _v7_users_updated_at,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Применяет недостающие миграции по PRAGMA user_version, каждую в своей транзакции"""
+    while True:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version > SCHEMA_VERSION:
+                raise RuntimeError(f"Версия схемы БД {version} новее поддерживаемой {SCHEMA_VERSION}")
+            if version == SCHEMA_VERSION:
+                conn.rollback()
+                return version
+            MIGRATIONS[version](conn)
+            conn.execute(f'PRAGMA user_version = {version + 1}')
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        logger.info(f"Схема БД обновлена до версии {version + 1}")
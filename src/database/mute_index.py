@@ -0,0 +1,63 @@
+import time
+import heapq
+from typing import Callable, Optional, Dict, Iterable
+
+
+class MuteIndex:
+    """Индекс мутов в памяти: словарь для проверки и куча для вытеснения истёкших"""
+
+    def __init__(self):
+        self._mutes: dict[tuple[int, int], float] = {}
+        self._heap: list[tuple[float, int, int]] = []
+        self._listeners: list[Callable[[int, int, Optional[float]], None]] = []
+
+    def subscribe(self, listener: Callable[[int, int, Optional[float]], None]):
+        self._listeners.append(listener)
+
+    def load(self, mutes: Iterable[Dict]):
+        self._mutes = {(m["chat_id"], m["user_id"]): m["until"] for m in mutes}
+        self._compact()
+
+    def add(self, chat_id: int, user_id: int, until: float):
+        self._mutes[chat_id, user_id] = until
+        heapq.heappush(self._heap, (until, chat_id, user_id))
+        if len(self._heap) > 2 * len(self._mutes) + 64:
+            self._compact()
+        for listener in self._listeners:
+            listener(chat_id, user_id, until)
+
+    def remove(self, chat_id: int, user_id: int):
+        self._mutes.pop((chat_id, user_id), None)
+        for listener in self._listeners:
+            listener(chat_id, user_id, None)
+
+    def until(self, chat_id: int, user_id: int) -> Optional[float]:
+        """Срок мута в индексе, в том числе уже истёкший"""
+        return self._mutes.get((chat_id, user_id))
+
+    def get(self, chat_id: int, user_id: int, now: float = None) -> Optional[Dict]:
+        self._evict(time.time() if now is None else now)
+        until = self._mutes.get((chat_id, user_id))
+        if until is None:
+            return None
+        return {'chat_id': chat_id, 'user_id': user_id, 'until': until}
+
+    def is_muted(self, chat_id: int, user_id: int, now: float = None) -> bool:
+        now = time.time() if now is None else now
+        self._evict(now)
+        until = self._mutes.get((chat_id, user_id))
+        return until is not None and until > now
+
+    def _evict(self, now: float):
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            until, chat_id, user_id = heapq.heappop(heap)
+            if self._mutes.get((chat_id, user_id)) == until:
+                del self._mutes[chat_id, user_id]
+
+    def _compact(self):
+        self._heap = [(until, chat_id, user_id) for (chat_id, user_id), until in self._mutes.items()]
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._mutes)
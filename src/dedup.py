@@ -0,0 +1,78 @@
+import time
+import logging
+from collections import OrderedDict
+from typing import Hashable
+
+from aiogram import types
+
+from .database import db
+
+logger = logging.getLogger(__name__)
+
+# Telegram хранит недоставленные апдейты сутки: за это время команда может
+# прийти повторно после перезапуска.
+DEDUP_WINDOW = 24 * 3600
+DEDUP_MAX = 20000
+DEDUP_PRUNE_EVERY = 1000
+
+
+class DedupStore:
+    """Окно обработанных сообщений с ограничением по времени и размеру"""
+
+    def __init__(self, window: float = DEDUP_WINDOW, maxsize: int = DEDUP_MAX, persist: bool = True):
+        self.window = window
+        self.maxsize = maxsize
+        self.persist = persist
+        self._seen: OrderedDict[Hashable, float] = OrderedDict()
+        self._added = 0
+
+    def _evict(self, now: float):
+        while self._seen:
+            key, ts = next(iter(self._seen.items()))
+            if ts >= now - self.window and len(self._seen) <= self.maxsize:
+                break
+            del self._seen[key]
+
+    def seen(self, key: Hashable, now: float = None) -> bool:
+        """Проверяет ключ и запоминает его; True — ключ уже встречался в окне"""
+        now = time.time() if now is None else now
+        self._evict(now)
+        if key in self._seen:
+            return True
+        self._seen[key] = now
+        if len(self._seen) > self.maxsize:
+            self._seen.popitem(last=False)
+        return False
+
+    async def check(self, message: types.Message) -> bool:
+        """True, если сообщение с командой уже обрабатывалось"""
+        key = (message.chat.id, message.message_id)
+        now = time.time()
+        if self.seen(key, now):
+            logger.info(f"Повторная команда {key} пропущена")
+            return True
+        if self.persist:
+            try:
+                await db.add_processed_command(key[0], key[1], now)
+                self._added += 1
+                if self._added % DEDUP_PRUNE_EVERY == 0:
+                    await db.prune_processed_commands(now - self.window)
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении обработанной команды: {e}")
+        return False
+
+    async def load(self):
+        """Восстанавливает окно из БД и удаляет устаревшие записи"""
+        if not self.persist:
+            return
+        since = time.time() - self.window
+        await db.prune_processed_commands(since)
+        for chat_id, message_id, ts in await db.get_processed_commands(since):
+            self._seen[(chat_id, message_id)] = ts
+        self._evict(time.time())
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+commands_dedup = DedupStore()
@@ -0,0 +1,178 @@
+import time
+import logging
+from datetime import timedelta
+from typing import Callable, Optional
+
+from .cache import TTLCache
+from .database import db
+from .pipeline import MessageContext
+from .utils import restrict_user, log_action, get_user_mention, get_duration_display
+
+logger = logging.getLogger(__name__)
+
+FLOOD_WINDOW = 10.0
+FLOOD_USER_LIMIT = 8
+FLOOD_CHAT_LIMIT = 300
+FLOOD_DUP_WINDOW = 60.0
+FLOOD_DUP_LIMIT = 3
+FLOOD_WAVE_LIMIT = 5
+FLOOD_DUP_MIN_LENGTH = 8
+FLOOD_MUTE = 600
+FLOOD_MAX_USERS = 100_000
+FLOOD_MAX_TEXTS = 50_000
+
+REASON_FLOOD = "flood"
+REASON_DUPLICATE = "duplicate"
+REASON_WAVE = "wave"
+REASONS = {
+    REASON_FLOOD: "слишком много сообщений",
+    REASON_DUPLICATE: "повтор одинаковых сообщений",
+    REASON_WAVE: "рассылка одинаковых сообщений",
+}
+
+
+class SlidingCounter:
+    """Счётчик скользящего окна из двух соседних интервалов"""
+
+    __slots__ = ("start", "previous", "current")
+
+    def __init__(self, now: float):
+        self.start = now
+        self.previous = 0
+        self.current = 0
+
+    def add(self, now: float, window: float) -> float:
+        elapsed = now - self.start
+        if elapsed >= window:
+            self.previous = self.current if elapsed < 2 * window else 0
+            self.current = 0
+            self.start += window * (elapsed // window)
+            elapsed = now - self.start
+        self.current += 1
+        return self.previous * (1 - elapsed / window) + self.current
+
+
+class _UserState(SlidingCounter):
+    __slots__ = ("text_hash", "repeats", "repeat_start")
+
+    def __init__(self, now: float):
+        super().__init__(now)
+        self.text_hash = 0
+        self.repeats = 0
+        self.repeat_start = now
+
+
+def text_hash(text: str) -> int:
+    """Хэш текста без учёта регистра и пробелов"""
+    return hash(" ".join(text.lower().split()))
+
+
+class FloodDetector:
+    """Находит флуд по частоте сообщений и повторам текста"""
+
+    def __init__(self, window: float = FLOOD_WINDOW, user_limit: int = FLOOD_USER_LIMIT,
+                 chat_limit: int = FLOOD_CHAT_LIMIT, dup_window: float = FLOOD_DUP_WINDOW,
+                 dup_limit: int = FLOOD_DUP_LIMIT, wave_limit: int = FLOOD_WAVE_LIMIT,
+                 max_users: int = FLOOD_MAX_USERS, max_texts: int = FLOOD_MAX_TEXTS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.user_limit = user_limit
+        self.chat_limit = chat_limit
+        self.dup_window = dup_window
+        self.dup_limit = dup_limit
+        self.wave_limit = wave_limit
+        self.clock = clock
+        # Запись живёт, пока к ней обращаются; без обращений за ttl её окна пусты
+        ttl = 2 * max(window, dup_window)
+        self._users = TTLCache(maxsize=max_users, ttl=ttl, sliding=True)
+        self._chats = TTLCache(maxsize=max_users // 10, ttl=ttl, sliding=True)
+        self._texts = TTLCache(maxsize=max_texts, ttl=ttl, sliding=True)
+
+    def check(self, chat_id: int, user_id: int, text: str = "") -> Optional[str]:
+        """Учитывает сообщение; возвращает причину срабатывания или None"""
+        now = self.clock()
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = SlidingCounter(now)
+            self._chats.set(chat_id, chat)
+        limit = self.user_limit if chat.add(now, self.window) <= self.chat_limit else self.user_limit // 2
+
+        key = (chat_id, user_id)
+        user = self._users.get(key)
+        if user is None:
+            user = _UserState(now)
+            self._users.set(key, user)
+        if user.add(now, self.window) > limit:
+            return REASON_FLOOD
+
+        if len(text) < FLOOD_DUP_MIN_LENGTH:
+            return None
+        digest = text_hash(text)
+        if digest == user.text_hash and now - user.repeat_start <= self.dup_window:
+            user.repeats += 1
+            if user.repeats >= self.dup_limit:
+                return REASON_DUPLICATE
+        else:
+            user.text_hash, user.repeats, user.repeat_start = digest, 1, now
+
+        wave_key = (chat_id, digest)
+        wave = self._texts.get(wave_key)
+        if wave is None:
+            wave = SlidingCounter(now)
+            self._texts.set(wave_key, wave)
+        if wave.add(now, self.dup_window) > self.wave_limit:
+            return REASON_WAVE
+        return None
+
+    def reset(self, chat_id: int, user_id: int):
+        self._users.pop((chat_id, user_id))
+
+
+flood_detector = FloodDetector()
+_muting: set[tuple[int, int]] = set()
+
+
+async def _delete(ctx: MessageContext):
+    try:
+        await ctx.message.delete()
+    except Exception as e:
+        logger.error(f"Ошибка при удалении сообщения: {e}")
+
+
+async def flood_control(ctx: MessageContext) -> bool:
+    """Этап конвейера: удаляет флуд и мутит; рассылку с разных аккаунтов только удаляет"""
+    if not ctx.is_group_message or not ctx.user_id:
+        return False
+    reason = flood_detector.check(ctx.chat_id, ctx.user_id, ctx.text)
+    if reason is None:
+        return False
+    if reason == REASON_WAVE:
+        if await ctx.is_moderator():
+            return False
+        await _delete(ctx)
+        log_action("Flood wave", 0, ctx.user_id, REASONS[reason], chat_id=ctx.chat_id)
+        return True
+    key = (ctx.chat_id, ctx.user_id)
+    if key not in _muting and await ctx.is_moderator():
+        return False
+    if key in _muting:
+        await _delete(ctx)
+        return True
+
+    _muting.add(key)
+    try:
+        until = time.time() + FLOOD_MUTE
+        await db.add_mute(ctx.chat_id, ctx.user_id, until)
+        await _delete(ctx)
+        await restrict_user(ctx.chat_id, ctx.user_id, until, check_admin=False)
+        flood_detector.reset(ctx.chat_id, ctx.user_id)
+        duration = get_duration_display(timedelta(seconds=FLOOD_MUTE))
+        log_action("Auto-mute", 0, ctx.user_id, f"{REASONS[reason]}, {duration}", chat_id=ctx.chat_id)
+        await ctx.message.answer(
+            f"🔇 {await get_user_mention(ctx.chat_id, ctx.user_id)} замучен на {duration}: {REASONS[reason]}."
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при автоматическом муте {ctx.user_id}: {e}")
+    finally:
+        _muting.discard(key)
+    return True
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+
+from aiogram import Bot
+
+from .pipeline import MessageContext
+
+logger = logging.getLogger(__name__)
+
+FORWARD_CHUNK = 100
+FORWARD_INTERVAL = 2.0
+FORWARD_MAX_PENDING_PER_CHAT = 500
+FORWARD_MAX_PENDING = 5000
+
+
+class ForwardBuffer:
+    """Копит ID сообщений по чатам и пересылает пачками до 100 штук"""
+
+    def __init__(self, bot: Bot, target, interval: float = FORWARD_INTERVAL, chunk: int = FORWARD_CHUNK,
+                 max_per_chat: int = FORWARD_MAX_PENDING_PER_CHAT, max_total: int = FORWARD_MAX_PENDING):
+        self.bot = bot
+        self.target = target
+        self.interval = interval
+        self.chunk = chunk
+        self.max_per_chat = max_per_chat
+        self.max_total = max_total
+        self._pending: dict[int, list[int]] = {}
+        self._total = 0
+        self._ready = asyncio.Event()
+        self.forwarded = 0
+        self.dropped = 0
+
+    async def stage(self, ctx: MessageContext):
+        """Этап конвейера: ставит сообщение группы в очередь пересылки"""
+        if ctx.is_group_content:
+            self.add(ctx.chat_id, ctx.message.message_id)
+
+    def add(self, chat_id: int, message_id: int) -> bool:
+        ids = self._pending.setdefault(chat_id, [])
+        if len(ids) >= self.max_per_chat or self._total >= self.max_total:
+            self.dropped += 1
+            return False
+        ids.append(message_id)
+        self._total += 1
+        if len(ids) >= self.chunk:
+            self._ready.set()
+        return True
+
+    @property
+    def pending(self) -> int:
+        return self._total
+
+    async def flush(self):
+        pending, self._pending, self._total = self._pending, {}, 0
+        for chat_id, ids in pending.items():
+            ids.sort()
+            for i in range(0, len(ids), self.chunk):
+                chunk = ids[i:i + self.chunk]
+                try:
+                    await self.bot.forward_messages(chat_id=self.target, from_chat_id=chat_id, message_ids=chunk)
+                    self.forwarded += len(chunk)
+                except Exception as e:
+                    logger.error(f"Ошибка при пересылке сообщений из чата {chat_id}: {e}")
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._ready.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._ready.clear()
+            if self._total:
+                await self.flush()
+
@@ -0,0 +1,81 @@
+import html
+import logging
+from aiogram import types
+from aiogram.filters import Command
+
+from ..config import dp
+from ..blocklist import blocklists, KINDS, KIND_WORD, KIND_DOMAIN, KIND_REGEX
+from ..dedup import commands_dedup
+from ..utils import is_moderator, log_action
+
+logger = logging.getLogger(__name__)
+
+KIND_NAMES = {
+    KIND_WORD: "Слова и фразы",
+    KIND_DOMAIN: "Домены",
+    KIND_REGEX: "Регулярные выражения",
+}
+LIST_LIMIT = 50
+USAGE = (
+    "ℹ️ Использование:\n"
+    "/block word|domain|regex &lt;шаблон&gt; — добавить в чёрный список\n"
+    "/unblock word|domain|regex &lt;шаблон&gt; — убрать из чёрного списка\n"
+    "/blocklist — показать чёрный список чата"
+)
+
+@dp.message(Command(commands=["block", "unblock", "blocklist"]))
+async def blocklist_commands(message: types.Message):
+    """Управление чёрным списком чата"""
+    try:
+        if await commands_dedup.check(message):
+            return
+
+        if not await is_moderator(message.chat.id, message.from_user.id):
+            await message.reply("❌ У вас недостаточно прав.")
+            return
+
+        parts = message.text.split(maxsplit=2)
+        cmd = parts[0][1:].split("@")[0].lower()
+        if cmd == "blocklist":
+            await message.reply(render_blocklist(message.chat.id))
+            return
+
+        if len(parts) < 3 or parts[1].lower() not in KINDS:
+            await message.reply(USAGE)
+            return
+        kind, pattern = parts[1].lower(), parts[2]
+
+        if cmd == "block":
+            try:
+                added = await blocklists.add(message.chat.id, kind, pattern, message.from_user.id)
+            except ValueError as e:
+                await message.reply(f"❌ Шаблон не добавлен: {html.escape(str(e))}")
+                return
+            if not added:
+                await message.reply("ℹ️ Такой шаблон уже есть в чёрном списке.")
+                return
+            await message.reply(f"✅ Добавлено в чёрный список: <code>{html.escape(pattern)}</code>")
+            log_action("Block", message.from_user.id, details=f"{kind}: {pattern}", chat_id=message.chat.id)
+        else:
+            if not await blocklists.remove(message.chat.id, kind, pattern):
+                await message.reply("ℹ️ Такого шаблона нет в чёрном списке.")
+                return
+            await message.reply(f"✅ Убрано из чёрного списка: <code>{html.escape(pattern)}</code>")
+            log_action("Unblock", message.from_user.id, details=f"{kind}: {pattern}", chat_id=message.chat.id)
+    except Exception as e:
+        logger.error(f"Ошибка в blocklist_commands: {e}")
+        await message.reply("❌ Произошла ошибка при выполнении команды.")
+
+def render_blocklist(chat_id: int) -> str:
+    entries = blocklists.entries(chat_id)
+    if not any(entries.values()):
+        return "Чёрный список пуст."
+    lines = []
+    for kind, patterns in entries.items():
+        if not patterns:
+            continue
+        lines.append(f"\n<b>{KIND_NAMES[kind]}</b> ({len(patterns)}):")
+        lines += [f"• <code>{html.escape(p)}</code>" for p in patterns[:LIST_LIMIT]]
+        if len(patterns) > LIST_LIMIT:
+            lines.append(f"… и ещё {len(patterns) - LIST_LIMIT}")
+    return "🚫 <b>Чёрный список</b>" + "\n".join(lines)
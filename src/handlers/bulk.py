@@ -0,0 +1,266 @@
+import html
+import time
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional
+from aiogram import types
+from aiogram.filters import Command
+
+from ..config import bot, dp, ADMINS
+from ..database import db
+from ..dedup import commands_dedup
+from ..utils import (
+    is_moderator, get_chat_admins, log_action, mention_html, pluralize,
+    parse_duration, get_duration_display, MUTE_PERMISSIONS
+)
+
+logger = logging.getLogger(__name__)
+
+BULK_MAX_TARGETS = 1000
+BULK_CONCURRENCY = 20
+BULK_MENTIONS = 30
+BULK_DEFAULT_MUTE = timedelta(hours=3)
+WARN_BAN_LIMIT = 5
+JOINS_KEEP = timedelta(days=7)
+JOINED = "joined"
+USAGE = (
+    "ℹ️ Использование:\n"
+    "/massban &lt;цели&gt; [причина]\n"
+    "/massmute [длительность] &lt;цели&gt; [причина]\n"
+    "/masswarn &lt;цели&gt; [причина]\n\n"
+    "Цели — ID и @юзернеймы через пробел и/или <code>joined 30m</code> "
+    "(все, кто вступил за последние 30 минут)."
+)
+
+
+class BulkTargets:
+    """Цели массовой команды, разобранные из текста"""
+
+    __slots__ = ("user_ids", "usernames", "joined", "reason")
+
+    def __init__(self):
+        self.user_ids: list[int] = []
+        self.usernames: list[str] = []
+        self.joined: Optional[timedelta] = None
+        self.reason: Optional[str] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.user_ids or self.usernames or self.joined)
+
+
+def parse_targets(args: list[str]) -> BulkTargets:
+    """Цели идут подряд до первого слова, которое не похоже на цель; остаток — причина"""
+    targets = BulkTargets()
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg.lower() == JOINED and i + 1 < len(args):
+            window = parse_duration(args[i + 1]) or (
+                timedelta(minutes=int(args[i + 1])) if args[i + 1].isdigit() else None
+            )
+            if window is None:
+                break
+            targets.joined = window
+            i += 2
+            continue
+        if arg.isdigit():
+            targets.user_ids.append(int(arg))
+        elif arg.startswith("tg://user?id=") and arg[13:].isdigit():
+            targets.user_ids.append(int(arg[13:]))
+        elif arg.startswith("@") and len(arg) > 1:
+            targets.usernames.append(arg[1:].lower())
+        else:
+            break
+        i += 1
+    targets.reason = " ".join(args[i:]) or None
+    return targets
+
+
+async def prune_joins():
+    """Удаляет записи о вступлениях старше JOINS_KEEP; вызывается при запуске"""
+    await db.prune_joins(time.time() - JOINS_KEEP.total_seconds())
+
+
+async def resolve_targets(chat_id: int, targets: BulkTargets) -> tuple[dict[int, str], list[str]]:
+    """({user_id: имя}, ненайденные юзернеймы); ValueError — целей больше BULK_MAX_TARGETS"""
+    user_ids = list(targets.user_ids)
+    if targets.joined:
+        since = time.time() - targets.joined.total_seconds()
+        user_ids += await db.get_recent_joins(chat_id, since, BULK_MAX_TARGETS + 1)
+    user_ids = list(dict.fromkeys(user_ids))
+    usernames = list(dict.fromkeys(targets.usernames))
+    if len(user_ids) + len(usernames) > BULK_MAX_TARGETS:
+        raise ValueError(f"целей больше {BULK_MAX_TARGETS}, сузьте список или окно joined")
+
+    names, by_username = {}, {}
+    for user_id, username, full_name in await db.find_users(user_ids, usernames):
+        names[user_id] = full_name or str(user_id)
+        if username:
+            by_username[username] = user_id
+    missing = [u for u in usernames if u not in by_username]
+    user_ids += [by_username[u] for u in usernames if u in by_username]
+    user_ids = list(dict.fromkeys(user_ids))
+    return {uid: names.get(uid, str(uid)) for uid in user_ids}, missing
+
+
+async def run_bulk(action: Callable[[int], Awaitable], user_ids: list[int]) -> list[int]:
+    """Выполняет action для всех параллельно; возвращает ID, для которых вызов не удался"""
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+    async def run_one(user_id: int) -> Optional[int]:
+        async with semaphore:
+            try:
+                await action(user_id)
+                return None
+            except Exception as e:
+                logger.error(f"Ошибка массовой команды для пользователя {user_id}: {e}")
+                return user_id
+
+    return [uid for uid in await asyncio.gather(*map(run_one, user_ids)) if uid is not None]
+
+
+def mention_list(names: dict[int, str], user_ids: list[int]) -> str:
+    mentions = ", ".join(mention_html(uid, names[uid]) for uid in user_ids[:BULK_MENTIONS])
+    if len(user_ids) > BULK_MENTIONS:
+        mentions += f" и ещё {len(user_ids) - BULK_MENTIONS}"
+    return mentions
+
+
+def count_line(label: str, user_ids: list[int]) -> str:
+    n = len(user_ids)
+    return f"{label}: {n} {pluralize(n, 'пользователь', 'пользователя', 'пользователей')}"
+
+
+@dp.message(Command(commands=["massban", "massmute", "masswarn"]))
+async def bulk_commands(message: types.Message):
+    """Массовые бан, мут и предупреждение по списку целей"""
+    try:
+        if await commands_dedup.check(message):
+            return
+
+        if not await is_moderator(message.chat.id, message.from_user.id):
+            await message.reply("❌ У вас недостаточно прав.")
+            return
+
+        parts = message.text.split()
+        cmd = parts[0][1:].split("@")[0].lower()
+        args = parts[1:]
+        duration = None
+        if cmd == "massmute":
+            duration = parse_duration(args[0]) if args else None
+            if duration:
+                args = args[1:]
+            duration = duration or BULK_DEFAULT_MUTE
+
+        targets = parse_targets(args)
+        if not targets:
+            await message.reply(USAGE)
+            return
+
+        chat_id = message.chat.id
+        try:
+            names, missing = await resolve_targets(chat_id, targets)
+        except ValueError as e:
+            await message.reply(f"❌ Команда не выполнена: {e}.")
+            return
+        protected = ADMINS | await get_chat_admins(chat_id) | {bot.id, message.from_user.id}
+        skipped = [uid for uid in names if uid in protected]
+        user_ids = [uid for uid in names if uid not in protected]
+
+        if cmd == "massban":
+            lines = await bulk_ban(message, names, user_ids, targets.reason)
+        elif cmd == "massmute":
+            lines = await bulk_mute(message, names, user_ids, duration)
+        else:
+            lines = await bulk_warn(message, names, user_ids, targets.reason)
+
+        if skipped:
+            lines.append(count_line("🛡 Пропущены администраторы", skipped))
+        if missing:
+            lines.append("❓ Не найдены: " + ", ".join(html.escape("@" + u) for u in missing[:BULK_MENTIONS]))
+        if targets.reason:
+            lines.append(f"\nПричина: {html.escape(targets.reason)}")
+        await message.reply("\n".join(lines))
+
+        try:
+            await message.delete()
+        except Exception:
+            pass
+    except Exception as e:
+        logger.error(f"Ошибка в bulk_commands: {e}", exc_info=True)
+        await message.reply("❌ Произошла ошибка при выполнении команды.")
+
+
+async def bulk_ban(message: types.Message, names: dict[int, str], user_ids: list[int],
+                   reason: Optional[str]) -> list[str]:
+    chat_id = message.chat.id
+    already = await db.get_banned(chat_id, user_ids)
+    user_ids = [uid for uid in user_ids if uid not in already]
+
+    failed = await run_bulk(
+        lambda uid: bot.ban_chat_member(chat_id, uid, until_date=0, revoke_messages=True), user_ids
+    )
+    await db.add_bans(chat_id, user_ids)
+    for uid in user_ids:
+        log_action("Ban", message.from_user.id, uid, reason, chat_id=chat_id)
+
+    lines = ["🚫 <b>Массовый бан</b>", count_line("Забанены", user_ids)]
+    if user_ids:
+        lines.append(mention_list(names, user_ids))
+    if failed:
+        lines.append(count_line("⚠️ Не исключены из чата, но добавлены в черный список", failed))
+    if already:
+        lines.append(count_line("ℹ️ Уже были забанены", list(already)))
+    return lines
+
+
+async def bulk_mute(message: types.Message, names: dict[int, str], user_ids: list[int],
+                    duration: timedelta) -> list[str]:
+    chat_id = message.chat.id
+    now = time.time()
+    already = [uid for uid in user_ids if (m := db.mutes.get(chat_id, uid)) and m["until"] > now]
+    user_ids = [uid for uid in user_ids if uid not in already]
+    until = now + duration.total_seconds()
+
+    failed = await run_bulk(
+        lambda uid: bot.restrict_chat_member(chat_id, uid, permissions=MUTE_PERMISSIONS, until_date=int(until)),
+        user_ids
+    )
+    await db.add_mutes(chat_id, user_ids, until)
+    display = get_duration_display(duration)
+    for uid in user_ids:
+        log_action("Mute", message.from_user.id, uid, display, chat_id=chat_id)
+
+    lines = [f"🔇 <b>Массовый мут на {display}</b>", count_line("Замучены", user_ids)]
+    if user_ids:
+        lines.append(mention_list(names, user_ids))
+    if failed:
+        lines.append(count_line("⚠️ Не ограничены в Telegram, сообщения будут удаляться", failed))
+    if already:
+        lines.append(count_line("ℹ️ Уже были в муте", already))
+    return lines
+
+
+async def bulk_warn(message: types.Message, names: dict[int, str], user_ids: list[int],
+                    reason: Optional[str]) -> list[str]:
+    chat_id = message.chat.id
+    counts = await db.add_warns(chat_id, user_ids, WARN_BAN_LIMIT)
+    banned = [uid for uid, count in counts.items() if count >= WARN_BAN_LIMIT]
+    failed = await run_bulk(
+        lambda uid: bot.ban_chat_member(chat_id, uid, until_date=0, revoke_messages=True), banned
+    )
+    for uid, count in counts.items():
+        log_action("Warn", message.from_user.id, uid, f"Total: {count}", chat_id=chat_id)
+    for uid in banned:
+        log_action("Auto-ban 5 warns", 0, uid, chat_id=chat_id)
+
+    lines = ["⚠️ <b>Массовое предупреждение</b>", count_line("Предупреждены", user_ids)]
+    if user_ids:
+        lines.append(mention_list(names, user_ids))
+    if banned:
+        lines.append(count_line(f"🚫 Авто-бан за {WARN_BAN_LIMIT} предупреждений", banned))
+        lines.append(mention_list(names, banned))
+    if failed:
+        lines.append(count_line("⚠️ Не исключены из чата, но добавлены в черный список", failed))
+    return lines
@@ -0,0 +1,33 @@
+import logging
+from aiogram import F, types
+from aiogram.enums.chat_member_status import ChatMemberStatus
+
+from ..config import dp
+from ..utils import invalidate_chat_admins, invalidate_chat_info, update_chat_type
+
+logger = logging.getLogger(__name__)
+
+_ADMIN_STATUSES = (ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR)
+
+@dp.chat_member()
+async def on_chat_member(update: types.ChatMemberUpdated):
+    """Сбрасывает кэш администраторов при назначении или снятии админа"""
+    update_chat_type(update.chat.id, update.chat.type)
+    if update.old_chat_member.status in _ADMIN_STATUSES or update.new_chat_member.status in _ADMIN_STATUSES:
+        invalidate_chat_admins(update.chat.id)
+        logger.info(f"Состав администраторов чата {update.chat.id} изменился, кэш сброшен")
+
+@dp.my_chat_member()
+async def on_my_chat_member(update: types.ChatMemberUpdated):
+    """Сбрасывает кэши чата при изменении прав самого бота"""
+    invalidate_chat_admins(update.chat.id)
+    invalidate_chat_info(update.chat.id)
+
+@dp.message(F.migrate_to_chat_id | F.migrate_from_chat_id)
+async def on_chat_migrated(message: types.Message):
+    """Сбрасывает кэши обоих чатов при преобразовании группы в супергруппу"""
+    for chat_id in (message.chat.id, message.migrate_to_chat_id, message.migrate_from_chat_id):
+        if chat_id:
+            invalidate_chat_admins(chat_id)
+            invalidate_chat_info(chat_id)
+    logger.info(f"Чат {message.chat.id} мигрировал, кэш сброшен")
@@ -1,11 +1,15 @@
+import asyncio
 import logging
 from datetime import datetime
 from aiogram import F, types
 from aiogram.filters import Command
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
-from ..config import bot, dp
-from ..database import Database
-from ..utils import is_moderator, get_user_mention, lift_restrictions, log_action
+from ..config import dp
+from ..database import db
+from ..amnesty import start_amnesty
+from ..dedup import commands_dedup
+from ..utils import is_moderator, get_user_mention, mention_html
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +17,9 @@ logger = logging.getLogger(__name__)
 async def list_commands(message: types.Message):
     """Обработчик команд списков и амнистии"""
     try:
+        if await commands_dedup.check(message):
+            return
+
         if not await is_moderator(message.chat.id, message.from_user.id):
             await message.reply("❌ У вас недостаточно прав.")
             return
@@ -36,90 +43,110 @@ async def list_commands(message: types.Message):
     except Exception as e:
         logger.error(f"Ошибка в list_commands: {e}")
 
+PAGE_SIZE = 30
+RESOLVE_CONCURRENCY = 5
+
+async def _mentions(chat_id: int, rows: list[dict]) -> list[str]:
+    """Упоминания пользователей; недостающие имена запрашиваются параллельно"""
+    semaphore = asyncio.Semaphore(RESOLVE_CONCURRENCY)
+
+    async def resolve(row: dict) -> str:
+        if row["full_name"]:
+            return mention_html(row["user_id"], row["full_name"])
+        async with semaphore:
+            return await get_user_mention(chat_id, row["user_id"])
+
+    return await asyncio.gather(*(resolve(row) for row in rows))
+
+def _pager(kind: str, page: int, total: int) -> InlineKeyboardMarkup | None:
+    pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
+    if pages <= 1:
+        return None
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton(text="◀️ Назад", callback_data=f"list:{kind}:{page - 1}"))
+    buttons.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="list:noop"))
+    if page < pages - 1:
+        buttons.append(InlineKeyboardButton(text="Далее ▶️", callback_data=f"list:{kind}:{page + 1}"))
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
+async def render_mutes(chat_id: int, page: int) -> tuple[str, InlineKeyboardMarkup | None]:
+    mutes, total = await db.get_active_mutes_page(chat_id, page * PAGE_SIZE, PAGE_SIZE)
+    if not mutes:
+        return "Нет активных мутов.", None
+    mentions = await _mentions(chat_id, mutes)
+    lines = [
+        f"✅ {mention} до {datetime.fromtimestamp(mute['until']).strftime('%d.%m.%Y %H:%M')}"
+        for mute, mention in zip(mutes, mentions)
+    ]
+    return "\n".join(lines), _pager("mutes", page, total)
+
+async def render_warns(chat_id: int, page: int) -> tuple[str, InlineKeyboardMarkup | None]:
+    warns, total = await db.get_warns_page(chat_id, page * PAGE_SIZE, PAGE_SIZE)
+    if not warns:
+        return "Нет пользователей с предупреждениями.", None
+    mentions = await _mentions(chat_id, warns)
+    lines = [f"⚠️ {mention}: {warn['count']}" for warn, mention in zip(warns, mentions)]
+    return "\n".join(lines), _pager("warns", page, total)
+
+async def render_bans(chat_id: int, page: int) -> tuple[str, InlineKeyboardMarkup | None]:
+    bans, total = await db.get_bans_page(chat_id, page * PAGE_SIZE, PAGE_SIZE)
+    if not bans:
+        return "Нет забаненных пользователей.", None
+    mentions = await _mentions(chat_id, bans)
+    return "\n".join(f"🚫 {mention}" for mention in mentions), _pager("bans", page, total)
+
+RENDERERS = {
+    "mutes": render_mutes,
+    "warns": render_warns,
+    "bans": render_bans
+}
+
 async def cmd_mutes(message: types.Message):
     """Показывает список активных мутов"""
-    try:
-        db = Database()
-        now = datetime.now().timestamp()
-        mutes = db.get_active_mutes()
-        
-        if not mutes:
-            await message.reply("Нет активных мутов.")
-            return
-        
-        lines = []
-        for mute in mutes:
-            if mute["until"] > now:
-                mention = await get_user_mention(mute["chat_id"], mute["user_id"])
-                until_dt = datetime.fromtimestamp(mute["until"])
-                until_str = until_dt.strftime("%d.%m.%Y %H:%M")
-                lines.append(f"✅ {mention} до {until_str}")
-        
-        await message.reply("\n".join(lines))
-    except Exception as e:
-        logger.error(f"Ошибка в cmd_mutes: {e}")
-        await message.reply("❌ Произошла ошибка при выполнении команды.")
+    await _reply_list(message, "mutes")
 
 async def cmd_warns_list(message: types.Message):
     """Показывает список пользователей с предупреждениями"""
+    await _reply_list(message, "warns")
+
+async def cmd_bans_list(message: types.Message):
+    """Показывает список забаненных пользователей"""
+    await _reply_list(message, "bans")
+
+async def _reply_list(message: types.Message, kind: str):
     try:
-        db = Database()
-        uids = db.get_all_users_with_warns()
-        if not uids:
-            await message.reply("Нет пользователей с предупреждениями.")
-            return
-        
-        lines = []
-        for uid in uids:
-            count = db.get_warns(uid)
-            if count > 0:
-                mention = await get_user_mention(message.chat.id, uid)
-                lines.append(f"⚠️ {mention}: {count}")
-        
-        await message.reply("\n".join(lines))
+        text, markup = await RENDERERS[kind](message.chat.id, 0)
+        await message.reply(text, reply_markup=markup)
     except Exception as e:
-        logger.error(f"Ошибка в cmd_warns_list: {e}")
+        logger.error(f"Ошибка в списке {kind}: {e}")
         await message.reply("❌ Произошла ошибка при выполнении команды.")
 
-async def cmd_bans_list(message: types.Message):
-    """Показывает список забаненных пользователей"""
+@dp.callback_query(F.data.startswith("list:"))
+async def on_list_page(callback: types.CallbackQuery):
+    """Листает список: загружается и отрисовывается только запрошенная страница"""
     try:
-        db = Database()
-        bans = db.get_bans(message.chat.id)
-        if not bans:
-            await message.reply("Нет забаненных пользователей.")
+        parts = callback.data.split(":")
+        if len(parts) != 3 or parts[1] not in RENDERERS or not callback.message:
+            await callback.answer()
             return
-        
-        lines = []
-        for uid in bans:
-            mention = await get_user_mention(message.chat.id, uid)
-            lines.append(f"🚫 {mention}")
-        
-        await message.reply("\n".join(lines))
+        chat_id = callback.message.chat.id
+        if not await is_moderator(chat_id, callback.from_user.id):
+            await callback.answer("❌ У вас недостаточно прав.", show_alert=True)
+            return
+        text, markup = await RENDERERS[parts[1]](chat_id, max(0, int(parts[2])))
+        await callback.message.edit_text(text, reply_markup=markup)
+        await callback.answer()
     except Exception as e:
-        logger.error(f"Ошибка в cmd_bans_list: {e}")
-        await message.reply("❌ Произошла ошибка при выполнении команды.")
+        logger.error(f"Ошибка при перелистывании списка: {e}")
+        await callback.answer("Произошла ошибка. Пожалуйста, попробуйте снова.", show_alert=True)
 
 async def cmd_amnesty(message: types.Message):
-    """Проводит амнистию - снимает все ограничения"""
+    """Запускает амнистию в фоне - снимает все ограничения"""
     try:
-        db = Database()
-        
-        for mute in db.get_active_mutes():
-            await lift_restrictions(mute["chat_id"], mute["user_id"])
-        
-        bans = db.get_bans(message.chat.id)
-        for uid in bans:
-            try:
-                await bot.unban_chat_member(message.chat.id, uid)
-                db.remove_ban(message.chat.id, uid)
-            except:
-                pass
-        
-        db.clear_all_warns()
-        
-        await message.reply("✅ Амнистия проведена! Все ограничения сняты, предупреждения обнулены.")
-        log_action("Amnesty", message.from_user.id)
+        progress = await message.reply("⏳ Амнистия запущена...")
+        if not await start_amnesty(message.chat.id, message.from_user.id, progress.message_id):
+            await progress.edit_text("ℹ️ Амнистия в этом чате уже выполняется.")
     except Exception as e:
         logger.error(f"Ошибка в cmd_amnesty: {e}")
         await message.reply("❌ Произошла ошибка при выполнении команды.")
\ No newline at end of file
@@ -5,7 +5,8 @@ from aiogram.filters import Command
 from aiogram.enums.chat_member_status import ChatMemberStatus
 
 from ..config import bot, dp
-from ..database import Database
+from ..database import db
+from ..dedup import commands_dedup
 from ..utils import (
     is_moderator, get_user_id, get_user_mention, restrict_user, 
     lift_restrictions, log_action, pluralize, parse_duration, get_duration_display
@@ -13,19 +14,12 @@ from ..utils import (
 
 logger = logging.getLogger(__name__)
 
-_processed_messages = set()
-
 @dp.message(Command(commands=["ban", "mute", "warn", "unban", "unmute", "warns", "clearwarns"]))
 async def moderation_commands(message: types.Message):
     try:
-        msg_key = f"{message.chat.id}:{message.message_id}:{message.from_user.id}"
-        if msg_key in _processed_messages:
+        if await commands_dedup.check(message):
             return
-        _processed_messages.add(msg_key)
-        
-        if len(_processed_messages) > 100:
-            _processed_messages.clear()
-        
+
         if not await is_moderator(message.chat.id, message.from_user.id):
             await message.reply("❌ У вас недостаточно прав.")
             return
@@ -55,7 +49,6 @@ async def moderation_commands(message: types.Message):
 async def cmd_ban(message: types.Message):
     try:
         parts = message.text.split(maxsplit=2)
-        db = Database()
         
         if message.reply_to_message:
             tgt = message.reply_to_message.from_user
@@ -87,7 +80,7 @@ async def cmd_ban(message: types.Message):
             logger.error(f"Ошибка при кике пользователя: {kick_error}")
             ban_status = "добавлен в черный список"
         
-        db.add_ban(message.chat.id, uid)
+        await db.add_ban(message.chat.id, uid)
         
         if message.reply_to_message:
             try:
@@ -99,7 +92,7 @@ async def cmd_ban(message: types.Message):
             f"🚫 {await get_user_mention(message.chat.id, uid)} {ban_status}.\n\n"
             f"Причина: {reason or 'не указана'}"
         )
-        log_action("Ban", message.from_user.id, uid, reason)
+        log_action("Ban", message.from_user.id, uid, reason, chat_id=message.chat.id)
     except Exception as e:
         logger.error(f"Ошибка в cmd_ban: {e}", exc_info=True)
         await message.reply(f"❌ Произошла ошибка при выполнении команды: {str(e)}")
@@ -108,7 +101,6 @@ async def cmd_mute(message: types.Message):
     """Команда мута пользователя"""
     try:
         parts = message.text.split(maxsplit=3)
-        db = Database()
         
         if message.reply_to_message:
             tgt = message.reply_to_message.from_user
@@ -127,7 +119,7 @@ async def cmd_mute(message: types.Message):
             await message.reply("❌ Пользователь не найден.")
             return
         
-        mute = db.get_mute(uid)
+        mute = db.mutes.get(message.chat.id, uid)
         now = datetime.now().timestamp()
         if mute and mute["until"] > now:
             until_dt = datetime.fromtimestamp(mute["until"])
@@ -142,7 +134,7 @@ async def cmd_mute(message: types.Message):
         until_ts = until.timestamp()
         
         await restrict_user(message.chat.id, uid, until_ts)
-        db.add_mute(uid, message.chat.id, until_ts)
+        await db.add_mute(message.chat.id, uid, until_ts)
         
         if message.reply_to_message:
             try:
@@ -167,7 +159,7 @@ async def cmd_mute(message: types.Message):
             reply_text += f"\n\nПричина: {reason}"
             
         await message.reply(reply_text)
-        log_action("Mute", message.from_user.id, uid, get_duration_display(duration))
+        log_action("Mute", message.from_user.id, uid, get_duration_display(duration), chat_id=message.chat.id)
     except Exception as e:
         logger.error(f"Ошибка в cmd_mute: {e}")
         await message.reply("❌ Произошла ошибка при выполнении команды.")
@@ -175,7 +167,6 @@ async def cmd_mute(message: types.Message):
 async def cmd_warn(message: types.Message):
     try:
         parts = message.text.split(maxsplit=2)
-        db = Database()
         
         if message.reply_to_message:
             tgt = message.reply_to_message.from_user
@@ -192,7 +183,7 @@ async def cmd_warn(message: types.Message):
             await message.reply("❌ Пользователь не найден.")
             return
         
-        count = db.add_warn(uid)
+        count = await db.add_warn(message.chat.id, uid)
         form = pluralize(count, "предупреждение", "предупреждения", "предупреждений")
         
         if message.reply_to_message:
@@ -207,12 +198,12 @@ async def cmd_warn(message: types.Message):
         
         if count >= 5:
             await bot.ban_chat_member(message.chat.id, uid, until_date=0, revoke_messages=True)
-            db.add_ban(message.chat.id, uid)
+            await db.add_ban(message.chat.id, uid)
             text += "\n\n🚫 Авто-бан за 5 предупреждений."
-            log_action("Auto-ban 5 warns", 0, uid)
+            log_action("Auto-ban 5 warns", 0, uid, chat_id=message.chat.id)
         
         await message.reply(text)
-        log_action("Warn", message.from_user.id, uid, f"Total: {count}")
+        log_action("Warn", message.from_user.id, uid, f"Total: {count}", chat_id=message.chat.id)
     except Exception as e:
         logger.error(f"Ошибка в cmd_warn: {e}")
         await message.reply("❌ Произошла ошибка при выполнении команды.")
@@ -221,7 +212,6 @@ async def cmd_unban(message: types.Message):
     """Команда разбана пользователя"""
     try:
         parts = message.text.split(maxsplit=1)
-        db = Database()
         
         if message.reply_to_message:
             tgt = message.reply_to_message.from_user
@@ -236,12 +226,12 @@ async def cmd_unban(message: types.Message):
             await message.reply("❌ Пользователь не найден.")
             return
         
-        ban = db.get_ban(message.chat.id, uid)
+        ban = await db.get_ban(message.chat.id, uid)
         if not ban:
             await message.reply(f"ℹ️ {await get_user_mention(message.chat.id, uid)} не забанен.")
             return
         
-        db.remove_ban(message.chat.id, uid)
+        await db.remove_ban(message.chat.id, uid)
         
         try:
             await bot.unban_chat_member(message.chat.id, uid, only_if_banned=True)
@@ -253,7 +243,7 @@ async def cmd_unban(message: types.Message):
                 status_text = "✅ Бан снят из базы данных"
         
         await message.reply(f"{status_text}. {await get_user_mention(message.chat.id, uid)} больше не забанен.")
-        log_action("Unban", message.from_user.id, uid)
+        log_action("Unban", message.from_user.id, uid, chat_id=message.chat.id)
     except Exception as e:
         logger.error(f"Ошибка в cmd_unban: {e}", exc_info=True)
         await message.reply(f"❌ Произошла ошибка при выполнении команды: {str(e)}")
@@ -275,8 +265,7 @@ async def cmd_unmute(message: types.Message):
             await message.reply("❌ Пользователь не найден.")
             return
         
-        db = Database()
-        mute = db.get_mute(uid)
+        mute = db.mutes.get(message.chat.id, uid)
         if not mute:
             await message.reply(f"ℹ️ {await get_user_mention(message.chat.id, uid)} не находится в муте.")
             return
@@ -293,7 +282,7 @@ async def cmd_unmute(message: types.Message):
             status_text = "✅ Мут снят из базы данных"
             
         await message.reply(f"{status_text}. {await get_user_mention(message.chat.id, uid)} больше не в муте.")
-        log_action("Unmute", message.from_user.id, uid)
+        log_action("Unmute", message.from_user.id, uid, chat_id=message.chat.id)
     except Exception as e:
         logger.error(f"Ошибка в cmd_unmute: {e}")
         await message.reply("❌ Произошла ошибка при выполнении команды.")
@@ -301,7 +290,6 @@ async def cmd_unmute(message: types.Message):
 async def cmd_warns(message: types.Message):
     try:
         parts = message.text.split(maxsplit=1)
-        db = Database()
         
         if message.reply_to_message:
             tgt = message.reply_to_message.from_user
@@ -313,7 +301,7 @@ async def cmd_warns(message: types.Message):
             await message.reply("❌ Пользователь не найден.")
             return
         
-        count = db.get_warns(uid)
+        count = await db.get_warns(message.chat.id, uid)
         form = pluralize(count, "предупреждение", "предупреждения", "предупреждений")
         await message.reply(f"ℹ️ {await get_user_mention(message.chat.id, uid)} имеет {count} {form}.")
     except Exception as e:
@@ -324,7 +312,6 @@ async def cmd_clearwarns(message: types.Message):
     """Команда сброса предупреждений"""
     try:
         parts = message.text.split(maxsplit=1)
-        db = Database()
         
         if message.reply_to_message:
             tgt = message.reply_to_message.from_user
@@ -339,12 +326,12 @@ async def cmd_clearwarns(message: types.Message):
             await message.reply("❌ Пользователь не найден.")
             return
         
-        old_count = db.clear_warns(uid)
+        old_count = await db.clear_warns(message.chat.id, uid)
         await message.reply(
             f"✅ Предупреждения сброшены ({old_count} → 0) для "
             f"{await get_user_mention(message.chat.id, uid)}."
         )
-        log_action("Clear warns", message.from_user.id, uid)
+        log_action("Clear warns", message.from_user.id, uid, chat_id=message.chat.id)
     except Exception as e:
         logger.error(f"Ошибка в cmd_clearwarns: {e}")
         await message.reply("❌ Произошла ошибка при выполнении команды.")
\ No newline at end of file
@@ -1,33 +1,23 @@
 import logging
-from datetime import datetime
-from aiogram import F, types
 
-from ..config import dp
-from ..database import Database
-from ..utils import is_moderator
+from ..database import db
+from ..pipeline import MessageContext
 
 logger = logging.getLogger(__name__)
 
-@dp.message(F.chat.type.in_({"group", "supergroup"}) & ~F.service & ~F.text.startswith('/'))
-async def check_muted_users(message: types.Message):
+async def enforce_mutes(ctx: MessageContext) -> bool:
+    """Этап конвейера: удаляет сообщения замученных пользователей"""
+    if not ctx.is_group_message or not ctx.user_id:
+        return False
+    if not db.mutes.is_muted(ctx.chat_id, ctx.user_id):
+        return False
+
+    if await ctx.is_moderator():
+        return False
+
     try:
-        if await is_moderator(message.chat.id, message.from_user.id):
-            return
-            
-        db = Database()
-        mute = db.get_mute(message.from_user.id)
-        
-        if mute:
-            now = datetime.now().timestamp()
-            if mute["until"] > now:
-                try:
-                    await message.delete()
-                    logger.info(f"Удалено сообщение от замученного пользователя {message.from_user.id}")
-                except Exception as e:
-                    logger.error(f"Ошибка при удалении сообщения: {e}")
-                return
-            else:
-                db.remove_mute(message.from_user.id)
-                
+        await ctx.message.delete()
+        logger.info(f"Удалено сообщение от замученного пользователя {ctx.user_id}")
     except Exception as e:
-        logger.error(f"Ошибка в check_muted_users: {e}")
\ No newline at end of file
+        logger.error(f"Ошибка при удалении сообщения: {e}")
+    return True
@@ -3,9 +3,12 @@ import logging
 from aiogram import F, types
 
 from ..config import bot, dp, LOG_CHANNEL
+from ..forwarding import ForwardBuffer
 
 logger = logging.getLogger(__name__)
 
+forward_buffer = ForwardBuffer(bot, LOG_CHANNEL) if LOG_CHANNEL else None
+
 @dp.message(F.left_chat_member)
 async def on_user_left(message: types.Message):
     try:
@@ -14,16 +17,3 @@ async def on_user_left(message: types.Message):
         await message.answer(f"👋 Всего хорошего, {mention}!")
     except:
         pass
-
-@dp.message(F.chat.type.in_({"group", "supergroup"}) & ~F.service & ~F.text.startswith('/'))
-async def forward_to_channel(message: types.Message):
-    """Пересылает все сообщения чата в указанный канал"""
-    try:
-        if LOG_CHANNEL:
-            await bot.forward_message(
-                chat_id=LOG_CHANNEL,
-                from_chat_id=message.chat.id,
-                message_id=message.message_id
-            )
-    except Exception as e:
-        logger.error(f"Ошибка при пересылке сообщения: {e}")
@@ -0,0 +1,20 @@
+from ..blocklist import blocklist_filter
+from ..config import dp
+from ..flood import flood_control
+from ..pipeline import MessagePipeline
+from ..profiles import capture_profile
+from .mute_filter import enforce_mutes
+from .other import forward_buffer
+
+# Порядок этапов: каждое сообщение проходит их сверху вниз до того, как
+# aiogram начнёт подбирать обработчик — запомнить отправителя, применить мут,
+# проверить содержимое, поставить в очередь пересылки.
+pipeline = MessagePipeline()
+pipeline.add(capture_profile)
+pipeline.add(enforce_mutes)
+pipeline.add(flood_control)
+pipeline.add(blocklist_filter)
+if forward_buffer:
+    pipeline.add(forward_buffer.stage, "forward")
+
+dp.message.outer_middleware(pipeline)
@@ -0,0 +1,99 @@
+import time
+import logging
+from aiogram import types
+from aiogram.filters import Command
+
+from .. import audit
+from ..config import dp, outbound
+from ..database import db
+from ..metrics import metrics, HandlerTimingMiddleware, UpdateTimingMiddleware
+from ..utils import is_moderator
+from .other import forward_buffer
+
+logger = logging.getLogger(__name__)
+
+dp.update.outer_middleware(UpdateTimingMiddleware())
+for observer in (dp.message, dp.callback_query, dp.chat_member, dp.my_chat_member):
+    observer.middleware(HandlerTimingMiddleware())
+
+metrics.counter("bot_api_calls_total", "Вызовы Bot API по методу и исходу", ("method", "outcome"), outbound.outcomes)
+metrics.gauge("bot_api_queue_depth", "Запросы в очереди исходящих вызовов", outbound.queue_depth, "priority")
+metrics.gauge("bot_db_write_queue", "Записи в очереди писателя БД", lambda: db.write_queue_size)
+metrics.counter("bot_db_lost_writes_total", "Обычные записи, потерянные при неудачном коммите", (),
+                lambda: {(): db.lost_writes})
+metrics.counter("bot_audit_dropped_total", "Записи журнала, не попавшие в БД", ("reason",),
+                lambda: {(reason,): n for reason, n in audit.dropped.items()})
+metrics.gauge("bot_audit_queue", "Записи журнала в очереди", audit.queue_size)
+metrics.gauge("bot_active_mutes", "Активные муты в индексе", lambda: len(db.mutes))
+if forward_buffer:
+    metrics.gauge("bot_forward_pending", "Сообщения, ожидающие пересылки", lambda: forward_buffer.pending)
+
+TOP_HANDLERS = 10
+TOP_DB = 5
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.2f} мс"
+
+
+def _uptime(seconds: float) -> str:
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours} ч {rest // 60} мин"
+
+
+def render_stats() -> str:
+    lines = [
+        "📊 <b>Статистика бота</b>",
+        f"Аптайм: {_uptime(time.time() - metrics.started)}",
+        f"Апдейтов: {metrics.updates.count}, p50 {_ms(metrics.updates.quantile(0.5))}, "
+        f"p99 {_ms(metrics.updates.quantile(0.99))}",
+        f"Задержка цикла событий: p99 {_ms(metrics.loop_lag.quantile(0.99))}, "
+        f"макс. {_ms(metrics.loop_lag.max)}",
+    ]
+
+    stages = list(metrics.stages.items())
+    if stages:
+        lines.append("\n<b>Этапы конвейера</b> (сообщений, p50 / p99):")
+        lines += [
+            f"• {name}: {h.count}, {_ms(h.quantile(0.5))} / {_ms(h.quantile(0.99))}"
+            for name, h in stages
+        ]
+
+    handlers = sorted(metrics.handlers.items(), key=lambda item: item[1].count, reverse=True)
+    if handlers:
+        lines.append("\n<b>Обработчики</b> (вызовов, p50 / p99):")
+        lines += [
+            f"• {name}: {h.count}, {_ms(h.quantile(0.5))} / {_ms(h.quantile(0.99))}"
+            for name, h in handlers[:TOP_HANDLERS]
+        ]
+
+    totals = {"ok": 0, "retry_after": 0, "failed": 0, "error": 0}
+    for (_, outcome), count in outbound.outcomes().items():
+        totals[outcome] += count
+    depth = " / ".join(f"{name} {n}" for name, n in outbound.queue_depth().items())
+    lines += [
+        "\n<b>Bot API</b>",
+        f"Успешно: {totals['ok']}, ответов 429: {totals['retry_after']}, "
+        f"не доставлено: {totals['failed']}, ошибок: {totals['error']}",
+        f"Очередь: {depth}",
+    ]
+
+    slowest = sorted(metrics.db.items(), key=lambda item: item[1].quantile(0.99), reverse=True)
+    lines += ["\n<b>База данных</b>", f"Очередь записи: {db.write_queue_size}, активных мутов: {len(db.mutes)}"]
+    lines += [
+        f"• {name}: {h.count}, p99 {_ms(h.quantile(0.99))}"
+        for name, h in slowest[:TOP_DB]
+    ]
+    return "\n".join(lines)
+
+
+@dp.message(Command("stats"))
+async def cmd_stats(message: types.Message):
+    """Показывает метрики бота: время обработки, вызовы API, задержки БД"""
+    try:
+        if not await is_moderator(message.chat.id, message.from_user.id):
+            await message.reply("❌ У вас недостаточно прав.")
+            return
+        await message.reply(render_stats())
+    except Exception as e:
+        logger.error(f"Ошибка в cmd_stats: {e}")
@@ -0,0 +1,170 @@
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_LAG_INTERVAL = 0.5
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами и окном последних значений"""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS, window: int = 1024):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class Metrics:
+    """Метрики процесса бота"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.updates = Histogram()
+        self.handlers: dict[str, Histogram] = {}
+        self.stages: dict[str, Histogram] = {}
+        self.db: dict[str, Histogram] = {}
+        self.loop_lag = Histogram()
+        self._gauges: dict[str, tuple[str, str, Callable[[], Any]]] = {}
+        self._counters: dict[str, tuple[str, tuple[str, ...], Callable[[], Dict[tuple, float]]]] = {}
+
+    @staticmethod
+    def _observe(group: dict[str, Histogram], label: str, value: float):
+        histogram = group.get(label)
+        if histogram is None:
+            histogram = group[label] = Histogram()
+        histogram.observe(value)
+
+    def observe_handler(self, name: str, seconds: float):
+        self._observe(self.handlers, name, seconds)
+
+    def observe_stage(self, name: str, seconds: float):
+        self._observe(self.stages, name, seconds)
+
+    def observe_db(self, name: str, seconds: float):
+        self._observe(self.db, name, seconds)
+
+    def gauge(self, name: str, help_text: str, fn: Callable[[], Any], label: str = ""):
+        self._gauges[name] = (help_text, label, fn)
+
+    def counter(self, name: str, help_text: str, labels: tuple[str, ...], fn: Callable[[], Dict[tuple, float]]):
+        self._counters[name] = (help_text, labels, fn)
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus"""
+        lines: list[str] = []
+        _histogram(lines, "bot_update_seconds", "Время обработки апдейта", {"": self.updates})
+        _histogram(lines, "bot_pipeline_stage_seconds", "Время этапа конвейера сообщений", self.stages, "stage")
+        _histogram(lines, "bot_handler_seconds", "Время работы обработчика", self.handlers, "handler")
+        _histogram(lines, "bot_db_seconds", "Время запроса к БД с ожиданием очереди", self.db, "op")
+        _histogram(lines, "bot_event_loop_lag_seconds", "Задержка цикла событий", {"": self.loop_lag})
+        for name, (help_text, labels, fn) in self._counters.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for values, count in sorted(fn().items()):
+                pairs = ",".join(f'{k}="{v}"' for k, v in zip(labels, values))
+                lines.append(f"{name}{{{pairs}}} {count}" if pairs else f"{name} {count}")
+        for name, (help_text, label, fn) in self._gauges.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            try:
+                value = fn()
+            except Exception as e:
+                logger.error(f"Ошибка при чтении метрики {name}: {e}")
+                continue
+            if isinstance(value, dict):
+                lines += [f'{name}{{{label}="{k}"}} {v}' for k, v in value.items()]
+            else:
+                lines.append(f"{name} {value}")
+        lines.append(f"bot_uptime_seconds {time.time() - self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+
+def _histogram(lines: list[str], name: str, help_text: str, group: dict[str, Histogram], label: str = ""):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, histogram in sorted(group.items()):
+        prefix = f'{label}="{key}",' if label else ""
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+        suffix = f"{{{label}=\"{key}\"}}" if label else ""
+        lines.append(f"{name}_sum{suffix} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {histogram.count}")
+
+
+class HandlerTimingMiddleware(BaseMiddleware):
+    """Внутренний middleware: замеряет время выбранного обработчика"""
+
+    async def __call__(self, handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]],
+                       event: Any, data: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            name = data["handler"].callback.__name__ if "handler" in data else "unknown"
+            metrics.observe_handler(name, time.perf_counter() - started)
+
+
+class UpdateTimingMiddleware(BaseMiddleware):
+    """Внешний middleware апдейтов: полное время обработки, включая фильтры"""
+
+    async def __call__(self, handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]],
+                       event: Any, data: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            metrics.updates.observe(time.perf_counter() - started)
+
+
+async def monitor_loop_lag(interval: float = LOOP_LAG_INTERVAL):
+    """Засыпает на interval и считает, насколько позже цикл событий вернул управление"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        metrics.loop_lag.observe(max(0.0, loop.time() - expected))
+
+
+metrics = Metrics()
+
+
+async def start_metrics_server(host: str, port: int) -> Optional[object]:
+    """Поднимает HTTP-эндпоинт /metrics; порт 0 отключает его"""
+    if not port:
+        return None
+    from aiohttp import web
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,238 @@
+import time
+import heapq
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    TelegramMethod, BanChatMember, UnbanChatMember, RestrictChatMember, DeleteMessage, DeleteMessages,
+    SendMessage, SendPhoto, ForwardMessage, ForwardMessages, CopyMessage, CopyMessages,
+    GetUpdates, SetWebhook, DeleteWebhook, GetWebhookInfo, GetMe, LogOut, Close
+)
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_MODERATION = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_COSMETIC = 2
+PRIORITY_NAMES = {PRIORITY_MODERATION: "moderation", PRIORITY_DEFAULT: "default", PRIORITY_COSMETIC: "cosmetic"}
+
+GLOBAL_RATE = 30.0
+GLOBAL_BURST = 30
+CHAT_RATE = 20 / 60
+CHAT_BURST = 10
+MAX_RETRIES = 3
+
+_MODERATION_METHODS = (BanChatMember, UnbanChatMember, RestrictChatMember, DeleteMessage, DeleteMessages)
+_SEND_METHODS = (SendMessage, SendPhoto, ForwardMessage, ForwardMessages, CopyMessage, CopyMessages)
+# Получение обновлений и настройка вебхука идут мимо очереди и лимитов:
+# 429 на модерации не должен останавливать приём обновлений
+_TRANSPORT_METHODS = (GetUpdates, SetWebhook, DeleteWebhook, GetWebhookInfo, GetMe, LogOut, Close)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def delay(self, now: float) -> float:
+        """Сколько секунд ждать до появления токена (0 — токен есть)"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class _Lane:
+    """Очередь запросов одного приоритета в один чат (или без чата) с бакетом чата"""
+
+    __slots__ = ("key", "bucket", "waiters", "active")
+
+    def __init__(self, key: Optional[int], bucket: Optional[TokenBucket]):
+        self.key = key
+        self.bucket = bucket
+        self.waiters: deque[asyncio.Future] = deque()
+        self.active = False
+
+
+class _Priority:
+    """Дорожки одного приоритета: готовые обходятся по кругу, пустые спят в куче"""
+
+    __slots__ = ("lanes", "ready", "sleeping", "seq")
+
+    def __init__(self):
+        self.lanes: dict[Optional[int], _Lane] = {}
+        self.ready: deque[_Lane] = deque()
+        self.sleeping: list[tuple[float, int, _Lane]] = []
+        self.seq = 0
+
+    def add(self, future: asyncio.Future, key: Optional[int], bucket: Optional[TokenBucket]):
+        lane = self.lanes.get(key)
+        if lane is None:
+            lane = self.lanes[key] = _Lane(key, bucket)
+        lane.bucket = bucket
+        lane.waiters.append(future)
+        if not lane.active:
+            lane.active = True
+            self.ready.append(lane)
+
+    def pick(self, now: float) -> tuple[Optional[_Lane], Optional[float]]:
+        """Следующая дорожка с токеном или время до пробуждения спящей"""
+        while self.sleeping and self.sleeping[0][0] <= now:
+            self.ready.append(heapq.heappop(self.sleeping)[2])
+        while self.ready:
+            lane = self.ready.popleft()
+            while lane.waiters and lane.waiters[0].done():
+                lane.waiters.popleft()
+            if not lane.waiters:
+                lane.active = False
+                del self.lanes[lane.key]
+                continue
+            wait = lane.bucket.delay(now) if lane.bucket else 0.0
+            if wait > 0:
+                self.seq += 1
+                heapq.heappush(self.sleeping, (now + wait, self.seq, lane))
+                continue
+            self.ready.append(lane)
+            return lane, None
+        return None, (self.sleeping[0][0] - now) if self.sleeping else None
+
+    def __len__(self) -> int:
+        return sum(len(lane.waiters) for lane in self.lanes.values())
+
+
+class OutboundDispatcher(BaseRequestMiddleware):
+    """Лимиты частоты, приоритеты и повторы на 429 для вызовов Bot API"""
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, global_burst: float = GLOBAL_BURST,
+                 chat_rate: float = CHAT_RATE, chat_burst: float = CHAT_BURST,
+                 max_retries: int = MAX_RETRIES):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_burst)
+        self._chats = TTLCache(maxsize=10000, ttl=600, sliding=True)
+        self._queues: dict[int, _Priority] = {p: _Priority() for p in PRIORITY_NAMES}
+        self._event = asyncio.Event()
+        self._pump_task: Optional[asyncio.Task] = None
+        self.sent = Counter()
+        self.retries = Counter()
+        self.failed = Counter()
+        self.errors = Counter()
+
+    @staticmethod
+    def priority(method: TelegramMethod) -> int:
+        if isinstance(method, _MODERATION_METHODS):
+            return PRIORITY_MODERATION
+        if isinstance(method, _SEND_METHODS):
+            return PRIORITY_COSMETIC
+        return PRIORITY_DEFAULT
+
+    def _chat_bucket(self, chat_id: Optional[int]) -> Optional[TokenBucket]:
+        if chat_id is None:
+            return None
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chats.set(chat_id, bucket)
+        return bucket
+
+    def set_global_limit(self, rate: float, burst: float):
+        """Меняет общий лимит бота; при нескольких процессах каждый получает свою долю"""
+        self._global = TokenBucket(rate, burst)
+
+    def queue_depth(self) -> dict[str, int]:
+        return {PRIORITY_NAMES[p]: len(q) for p, q in self._queues.items()}
+
+    def outcomes(self) -> dict[tuple[str, str], int]:
+        """Вызовы API по методу и исходу: ok, retry_after, failed, error"""
+        result = {}
+        for outcome, counter in (("ok", self.sent), ("retry_after", self.retries),
+                                 ("failed", self.failed), ("error", self.errors)):
+            for name, count in counter.items():
+                result[(name, outcome)] = count
+        return result
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod):
+        if isinstance(method, _TRANSPORT_METHODS):
+            return await make_request(bot, method)
+        name = type(method).__name__
+        priority = self.priority(method)
+        chat_id = getattr(method, "chat_id", None) if priority == PRIORITY_COSMETIC else None
+        for attempt in range(self.max_retries + 1):
+            bucket = self._chat_bucket(chat_id)
+            await self._acquire(priority, chat_id, bucket)
+            try:
+                result = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.retries[name] += 1
+                (bucket or self._global).block(e.retry_after)
+                if attempt == self.max_retries:
+                    self.failed[name] += 1
+                    raise
+                logger.warning(f"Лимит Telegram на {name}, повтор через {e.retry_after} с")
+                continue
+            except Exception:
+                self.errors[name] += 1
+                raise
+            self.sent[name] += 1
+            return result
+
+    async def _acquire(self, priority: int, chat_id: Optional[int], bucket: Optional[TokenBucket]):
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].add(future, chat_id, bucket)
+        self._event.set()
+        await future
+
+    def _pick(self, now: float) -> tuple[Optional[_Lane], Optional[float]]:
+        """Дорожка, из головы которой уходит следующий запрос, или время ожидания"""
+        soonest = None
+        for queue in self._queues.values():
+            lane, wait = queue.pick(now)
+            if lane is not None:
+                return lane, None
+            if wait is not None:
+                soonest = wait if soonest is None else min(soonest, wait)
+        return None, soonest
+
+    async def _wait(self, timeout: Optional[float]):
+        self._event.clear()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _pump(self):
+        while True:
+            now = time.monotonic()
+            wait = self._global.delay(now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            lane, wait = self._pick(now)
+            if lane is None:
+                await self._wait(wait)
+                continue
+            self._global.consume()
+            if lane.bucket:
+                lane.bucket.consume()
+            lane.waiters.popleft().set_result(None)
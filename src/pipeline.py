@@ -0,0 +1,110 @@
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.enums import ContentType
+from aiogram.types import Message
+
+from .metrics import metrics
+from .utils import is_moderator
+
+logger = logging.getLogger(__name__)
+
+USER_CONTENT_TYPES = frozenset({
+    ContentType.TEXT, ContentType.ANIMATION, ContentType.AUDIO, ContentType.DOCUMENT,
+    ContentType.PHOTO, ContentType.STICKER, ContentType.STORY, ContentType.VIDEO,
+    ContentType.VIDEO_NOTE, ContentType.VOICE, ContentType.CONTACT, ContentType.DICE,
+    ContentType.POLL, ContentType.VENUE, ContentType.LOCATION,
+})
+
+# Служебные сообщения о событиях чата. Перечислены именами, потому что
+# набор ContentType зависит от версии aiogram; всё, чего здесь нет,
+# считается сообщением участника — новый тип контента не обойдёт мут.
+SERVICE_CONTENT_TYPES = frozenset(getattr(ContentType, name) for name in (
+    "NEW_CHAT_MEMBERS", "LEFT_CHAT_MEMBER", "CHAT_OWNER_LEFT", "CHAT_OWNER_CHANGED",
+    "NEW_CHAT_TITLE", "NEW_CHAT_PHOTO", "DELETE_CHAT_PHOTO", "GROUP_CHAT_CREATED",
+    "SUPERGROUP_CHAT_CREATED", "CHANNEL_CHAT_CREATED", "MESSAGE_AUTO_DELETE_TIMER_CHANGED",
+    "MIGRATE_TO_CHAT_ID", "MIGRATE_FROM_CHAT_ID", "PINNED_MESSAGE", "SUCCESSFUL_PAYMENT",
+    "REFUNDED_PAYMENT", "USERS_SHARED", "USER_SHARED", "CHAT_SHARED", "CONNECTED_WEBSITE",
+    "WRITE_ACCESS_ALLOWED", "PROXIMITY_ALERT_TRIGGERED", "BOOST_ADDED", "CHAT_BACKGROUND_SET",
+    "CHECKLIST_TASKS_DONE", "CHECKLIST_TASKS_ADDED", "DIRECT_MESSAGE_PRICE_CHANGED",
+    "FORUM_TOPIC_CREATED", "FORUM_TOPIC_EDITED", "FORUM_TOPIC_CLOSED", "FORUM_TOPIC_REOPENED",
+    "GENERAL_FORUM_TOPIC_HIDDEN", "GENERAL_FORUM_TOPIC_UNHIDDEN", "GIVEAWAY_CREATED",
+    "GIVEAWAY_WINNERS", "GIVEAWAY_COMPLETED", "MANAGED_BOT_CREATED", "PAID_MESSAGE_PRICE_CHANGED",
+    "POLL_OPTION_ADDED", "POLL_OPTION_DELETED", "SUGGESTED_POST_APPROVED",
+    "SUGGESTED_POST_APPROVAL_FAILED", "SUGGESTED_POST_DECLINED", "SUGGESTED_POST_PAID",
+    "SUGGESTED_POST_REFUNDED", "VIDEO_CHAT_SCHEDULED", "VIDEO_CHAT_STARTED", "VIDEO_CHAT_ENDED",
+    "VIDEO_CHAT_PARTICIPANTS_INVITED", "GIFT", "UNIQUE_GIFT", "GIFT_UPGRADE_SENT",
+    "COMMUNITY_CHAT_ADDED", "COMMUNITY_CHAT_REMOVED", "COMMUNITY_CHAT_JOINED",
+) if hasattr(ContentType, name))
+
+
+class MessageContext:
+    """Разобранное один раз сообщение, общее для всех этапов конвейера"""
+
+    __slots__ = ("message", "chat_id", "user_id", "is_group", "is_command", "is_service",
+                 "is_user_content", "text", "stopped_by", "_moderator")
+
+    def __init__(self, message: Message):
+        user = message.from_user
+        self.message = message
+        self.chat_id = message.chat.id
+        self.user_id = user.id if user else None
+        self.is_group = message.chat.type in ("group", "supergroup")
+        self.is_command = (message.text or "").startswith("/")
+        self.is_service = message.content_type in SERVICE_CONTENT_TYPES
+        self.is_user_content = message.content_type in USER_CONTENT_TYPES
+        self.text = message.text or message.caption or ""
+        self.stopped_by: Optional[str] = None
+        self._moderator: Optional[bool] = None
+
+    @property
+    def is_group_message(self) -> bool:
+        """Неслужебное сообщение группы: на него действуют муты, антифлуд и чёрный список"""
+        return self.is_group and not self.is_service
+
+    @property
+    def is_group_content(self) -> bool:
+        """Обычное сообщение участника группы, не команда: то, что пересылается"""
+        return self.is_group and self.is_user_content and not self.is_command
+
+    async def is_moderator(self) -> bool:
+        if self._moderator is None:
+            self._moderator = self.user_id is not None and await is_moderator(self.chat_id, self.user_id)
+        return self._moderator
+
+
+Stage = Callable[[MessageContext], Awaitable[Optional[bool]]]
+
+
+class MessagePipeline(BaseMiddleware):
+    """Внешний middleware сообщений с упорядоченными этапами"""
+
+    def __init__(self):
+        self.stages: list[tuple[str, Stage]] = []
+
+    def add(self, stage: Stage, name: Optional[str] = None):
+        self.stages.append((name or stage.__name__, stage))
+
+    async def run(self, ctx: MessageContext) -> bool:
+        for name, stage in self.stages:
+            started = time.perf_counter()
+            try:
+                stop = await stage(ctx)
+            except Exception as e:
+                logger.error(f"Ошибка на этапе {name}: {e}")
+                stop = False
+            metrics.observe_stage(name, time.perf_counter() - started)
+            if stop:
+                ctx.stopped_by = name
+                return True
+        return False
+
+    async def __call__(self, handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+                       event: Message, data: Dict[str, Any]) -> Any:
+        ctx = MessageContext(event)
+        if await self.run(ctx):
+            return None
+        data["ctx"] = ctx
+        return await handler(event, data)
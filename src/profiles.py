@@ -0,0 +1,119 @@
+import time
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware, types
+
+from .cache import TTLCache
+from .config import bot, dp
+from .database import db
+
+if TYPE_CHECKING:
+    from .pipeline import MessageContext
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CACHE_SIZE = 50000
+PROFILE_TTL = 7 * 86400
+PROFILE_REFRESH_AFTER = 86400
+PROFILE_MISSING_TTL = 600
+
+
+class ProfileResolver:
+    """Имена пользователей: кэш в памяти, затем таблица users, затем bot.get_chat"""
+
+    def __init__(self, maxsize: int = PROFILE_CACHE_SIZE, ttl: float = PROFILE_TTL,
+                 refresh_after: float = PROFILE_REFRESH_AFTER, missing_ttl: float = PROFILE_MISSING_TTL):
+        self.refresh_after = refresh_after
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._missing = TTLCache(maxsize=maxsize // 10, ttl=missing_ttl)
+        self._refreshing: set[int] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    async def learn(self, user: types.User):
+        """Запоминает имя пользователя; в БД пишет изменения и раз в refresh_after подтверждение"""
+        cached = self._cache.get(user.id)
+        now = time.monotonic()
+        self._cache.set(user.id, (user.full_name, user.username, now))
+        self._missing.pop(user.id)
+        if (cached is None or cached[0] != user.full_name or cached[1] != user.username
+                or now - cached[2] > self.refresh_after):
+            await db.update_user(user)
+
+    def peek(self, user_id: int) -> Optional[str]:
+        """Имя из кэша без обращения к БД и API"""
+        cached = self._cache.get(user_id)
+        return cached[0] if cached is not None else None
+
+    async def get_name(self, user_id: int) -> Optional[str]:
+        cached = self._cache.get(user_id)
+        if cached is not None:
+            if time.monotonic() - cached[2] > self.refresh_after:
+                self._refresh_later(user_id)
+            return cached[0]
+
+        row = await db.get_user(user_id)
+        if row.get('full_name'):
+            age = time.time() - row['updated_at'] if row['updated_at'] else self.refresh_after
+            self._cache.set(user_id, (row['full_name'], row['username'], time.monotonic() - age))
+            if age >= self.refresh_after:
+                self._refresh_later(user_id)
+            return row['full_name']
+
+        if user_id in self._missing:
+            return None
+        return await self._fetch(user_id)
+
+    async def _fetch(self, user_id: int) -> Optional[str]:
+        try:
+            chat = await bot.get_chat(user_id)
+        except Exception as e:
+            logger.debug(f"Не удалось получить профиль {user_id}: {e}")
+            self._missing.set(user_id, True)
+            return None
+        self._cache.set(user_id, (chat.full_name, chat.username, time.monotonic()))
+        await db.update_user(chat)
+        return chat.full_name
+
+    def _refresh_later(self, user_id: int):
+        if user_id in self._refreshing or user_id in self._missing:
+            return
+        self._refreshing.add(user_id)
+        task = asyncio.create_task(self._fetch(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda t: self._refreshed(user_id, t))
+
+    def _refreshed(self, user_id: int, task: asyncio.Task):
+        self._refreshing.discard(user_id)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Ошибка при обновлении профиля {user_id}: {task.exception()}")
+
+
+async def capture_profile(ctx: "MessageContext") -> None:
+    """Этап конвейера сообщений: запоминает отправителя"""
+    user = ctx.message.from_user
+    if user is not None and not user.is_bot:
+        await profiles.learn(user)
+
+
+class ProfileMiddleware(BaseMiddleware):
+    """Запоминает from_user нажатий кнопок"""
+
+    def __init__(self, resolver: ProfileResolver):
+        self.resolver = resolver
+
+    async def __call__(self, handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]],
+                       event: Any, data: Dict[str, Any]) -> Any:
+        user = getattr(event, "from_user", None)
+        if user is not None and not user.is_bot:
+            try:
+                await self.resolver.learn(user)
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении профиля {user.id}: {e}")
+        return await handler(event, data)
+
+
+profiles = ProfileResolver()
+dp.callback_query.outer_middleware(ProfileMiddleware(profiles))
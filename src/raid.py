@@ -0,0 +1,137 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from aiogram import types
+
+logger = logging.getLogger(__name__)
+
+RAID_JOIN_THRESHOLD = 15
+RAID_JOIN_WINDOW = 60.0
+RAID_COOLDOWN = 300.0
+RAID_BATCH_DELAY = 3.0
+RAID_BATCH_SIZE = 50
+
+
+class JoinRateTracker:
+    """Считает вступления в скользящем окне и включает режим рейда"""
+
+    def __init__(self, threshold: int = RAID_JOIN_THRESHOLD, window: float = RAID_JOIN_WINDOW,
+                 cooldown: float = RAID_COOLDOWN):
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self._joins: dict[int, deque[float]] = {}
+        self._raid_until: dict[int, float] = {}
+
+    def register(self, chat_id: int, count: int = 1, now: float = None) -> bool:
+        now = time.monotonic() if now is None else now
+        joins = self._joins.get(chat_id)
+        if joins is None:
+            joins = self._joins[chat_id] = deque(maxlen=self.threshold)
+        joins.extend([now] * min(count, self.threshold))
+        if len(joins) == self.threshold and joins[0] > now - self.window:
+            if not self.is_raid(chat_id, now):
+                logger.warning(f"Режим рейда включён в чате {chat_id}")
+            self._raid_until[chat_id] = now + self.cooldown
+        return self.is_raid(chat_id, now)
+
+    def is_raid(self, chat_id: int, now: float = None) -> bool:
+        now = time.monotonic() if now is None else now
+        until = self._raid_until.get(chat_id)
+        if until is None:
+            return False
+        if until <= now:
+            del self._raid_until[chat_id]
+            return False
+        return True
+
+
+class JoinBatcher:
+    """Копит вступивших по чатам и отдаёт обработчику пачками"""
+
+    def __init__(self, flush: Callable[[int, list[types.User]], Awaitable[None]],
+                 delay: float = RAID_BATCH_DELAY, max_batch: int = RAID_BATCH_SIZE):
+        self.flush = flush
+        self.delay = delay
+        self.max_batch = max_batch
+        self._pending: dict[int, list[types.User]] = {}
+        self._timers: dict[int, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def add(self, chat_id: int, users: list[types.User]):
+        pending = self._pending.setdefault(chat_id, [])
+        pending.extend(users)
+        while len(pending) >= self.max_batch:
+            batch, pending[:] = pending[:self.max_batch], pending[self.max_batch:]
+            self._spawn(self._run(chat_id, batch))
+        if pending and chat_id not in self._timers:
+            self._timers[chat_id] = self._spawn(self._delayed(chat_id))
+
+    def _spawn(self, coro: Awaitable[None]) -> asyncio.Task:
+        """Задача живёт в self._tasks до завершения, иначе её может собрать GC"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(self._log_error)
+        return task
+
+    @staticmethod
+    def _log_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Ошибка в задаче пачки вступлений: {task.exception()}")
+
+    async def _delayed(self, chat_id: int):
+        await asyncio.sleep(self.delay)
+        self._timers.pop(chat_id, None)
+        batch = self._pending.pop(chat_id, [])
+        if batch:
+            await self._run(chat_id, batch)
+
+    async def _run(self, chat_id: int, batch: list[types.User]):
+        try:
+            await self.flush(chat_id, batch)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке пачки вступлений в чате {chat_id}: {e}")
+
+
+class RateLimitedPool:
+    """Пул воркеров, выполняющий задачи не чаще rate раз в секунду"""
+
+    def __init__(self, workers: int = 4, rate: float = 20.0, maxsize: int = 10000):
+        self.workers = workers
+        self.interval = 1.0 / rate
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._tasks: list[asyncio.Task] = []
+        self._next_slot = 0.0
+
+    async def submit(self, func: Callable[..., Awaitable[Any]], *args, **kwargs):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        await self._queue.put((func, args, kwargs))
+
+    async def join(self):
+        await self._queue.join()
+
+    async def _throttle(self):
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _worker(self):
+        while True:
+            func, args, kwargs = await self._queue.get()
+            try:
+                await self._throttle()
+                await func(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Ошибка в задаче пула: {e}")
+            finally:
+                self._queue.task_done()
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
@@ -0,0 +1,126 @@
+import abc
+import time
+import heapq
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BaseScheduler(abc.ABC):
+    """Общий цикл планировщиков: спит до ближайшего срока и отдаёт наступившие задачи"""
+
+    def __init__(self, handler: Callable[[list], Awaitable[None]], batch_size: int = 50,
+                 name: str = "scheduler"):
+        self.handler = handler
+        self.batch_size = batch_size
+        self.name = name
+        self._target: Optional[float] = None
+        self._wakeup = asyncio.Event()
+
+    def poke(self, deadline: float):
+        if self._target is None or deadline < self._target:
+            self._wakeup.set()
+
+    @abc.abstractmethod
+    async def _next_deadline(self) -> Optional[float]:
+        """Ближайший срок или None, если задач нет"""
+
+    @abc.abstractmethod
+    async def _pop_due(self, now: float) -> list:
+        """Снимает до batch_size задач со сроком не позже now"""
+
+    async def run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                due = await self._pop_due(time.time())
+                if due:
+                    await self.handler(due)
+                    continue
+                self._target = await self._next_deadline()
+            except Exception as e:
+                logger.error(f"Ошибка в планировщике {self.name}: {e}")
+                self._target = time.time() + 1
+
+            timeout = None if self._target is None else max(0.0, self._target - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._target = None
+
+
+class DeadlineScheduler(BaseScheduler):
+    """Планировщик сроков на min-куче в памяти"""
+
+    def __init__(self, handler: Callable[[list[tuple[Hashable, Any]]], Awaitable[None]],
+                 batch_size: int = 50, name: str = "scheduler"):
+        super().__init__(handler, batch_size, name)
+        self._jobs: dict[Hashable, tuple[float, Any]] = {}
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._seq = 0
+
+    def schedule(self, key: Hashable, deadline: float, data: Any = None):
+        self._jobs[key] = (deadline, data)
+        self._seq += 1
+        heapq.heappush(self._heap, (deadline, self._seq, key))
+        self.poke(deadline)
+
+    def cancel(self, key: Hashable):
+        self._jobs.pop(key, None)
+        if len(self._heap) > 2 * len(self._jobs) + 64:
+            self._heap = [(d, i, k) for i, (k, (d, _)) in enumerate(self._jobs.items())]
+            heapq.heapify(self._heap)
+
+    def next_deadline(self) -> Optional[float]:
+        heap = self._heap
+        while heap:
+            deadline, _, key = heap[0]
+            job = self._jobs.get(key)
+            if job is not None and job[0] == deadline:
+                return deadline
+            heapq.heappop(heap)
+        return None
+
+    def pop_due(self, now: float) -> list[tuple[Hashable, Any]]:
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now and len(due) < self.batch_size:
+            deadline, _, key = heapq.heappop(heap)
+            job = self._jobs.get(key)
+            if job is not None and job[0] == deadline:
+                del self._jobs[key]
+                due.append((key, job[1]))
+        return due
+
+    async def _next_deadline(self) -> Optional[float]:
+        return self.next_deadline()
+
+    async def _pop_due(self, now: float) -> list[tuple[Hashable, Any]]:
+        return self.pop_due(now)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._jobs
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+class StoredDeadlineScheduler(BaseScheduler):
+    """Планировщик, задачи которого хранятся в SQLite"""
+
+    def __init__(self, handler: Callable[[list], Awaitable[None]],
+                 next_deadline: Callable[[], Awaitable[Optional[float]]],
+                 pop_due: Callable[[float, int], Awaitable[list]],
+                 batch_size: int = 50, name: str = "scheduler"):
+        super().__init__(handler, batch_size, name)
+        self._fetch_next = next_deadline
+        self._fetch_due = pop_due
+
+    async def _next_deadline(self) -> Optional[float]:
+        return await self._fetch_next()
+
+    async def _pop_due(self, now: float) -> list:
+        return await self._fetch_due(now, self.batch_size)
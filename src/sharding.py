@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import multiprocessing
+from collections import Counter
+from typing import Callable, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+
+logger = logging.getLogger(__name__)
+
+WORKER_CHECK_INTERVAL = 5.0
+# Пачек апдейтов в очереди воркера; при полной очереди супервизор ждёт
+# и не забирает новые апдейты из Telegram
+WORKER_QUEUE_SIZE = 100
+# Апдейтов в обработке у воркера; дальше он не читает свою очередь
+WORKER_MAX_PENDING = 1000
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def shard_of(chat_id: int, count: int) -> int:
+    """Номер воркера для чата; та же формула используется в SQL-фильтрах Database"""
+    return abs(chat_id) % count
+
+
+def update_chat_id(raw: dict) -> int:
+    """chat_id сырого апдейта; для апдейтов без чата — ID пользователя"""
+    for value in raw.values():
+        if not isinstance(value, dict):
+            continue
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        user = value.get("from") or value.get("user")
+        if user:
+            return user["id"]
+    return 0
+
+
+class Supervisor:
+    """Запускает процессы-воркеры и раздаёт им апдейты по chat_id"""
+
+    def __init__(self, count: int, target: Callable):
+        self.count = count
+        self.target = target
+        self._ctx = multiprocessing.get_context("spawn")
+        self.queues = [self._ctx.Queue(WORKER_QUEUE_SIZE) for _ in range(count)]
+        self.processes: list[Optional[multiprocessing.Process]] = [None] * count
+        self.routed = Counter()
+
+    def start(self):
+        for index in range(self.count):
+            self._spawn(index)
+
+    def _spawn(self, index: int):
+        process = self._ctx.Process(
+            target=self.target, args=(index, self.count, self.queues[index]), name=f"bot-worker-{index}"
+        )
+        process.start()
+        self.processes[index] = process
+        logger.info(f"Воркер {index} запущен (pid {process.pid})")
+
+    def check(self):
+        """Перезапускает упавшие воркеры"""
+        for index, process in enumerate(self.processes):
+            if process is not None and not process.is_alive():
+                logger.error(f"Воркер {index} завершился с кодом {process.exitcode}, перезапуск")
+                self._spawn(index)
+
+    def dispatch(self, updates: list[dict]):
+        """Раскладывает апдейты по очередям воркеров; блокируется, пока очередь полна"""
+        batches: list[list[dict]] = [[] for _ in range(self.count)]
+        for raw in updates:
+            batches[shard_of(update_chat_id(raw), self.count)].append(raw)
+        for index, batch in enumerate(batches):
+            if batch:
+                self.queues[index].put(batch)
+                self.routed[index] += len(batch)
+
+    def stop(self, timeout: float = 30.0):
+        """Просит воркеры доработать очередь и ждёт их завершения"""
+        for queue in self.queues:
+            queue.put(None)
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                logger.error(f"Воркер {index} не завершился за {timeout} с, принудительная остановка")
+                process.terminate()
+
+    async def poll(self, bot: Bot, allowed_updates: list[str]):
+        """Long polling в супервизоре"""
+        offset = None
+        while True:
+            self.check()
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=30, allowed_updates=allowed_updates)
+            except Exception as e:
+                logger.error(f"Ошибка при получении апдейтов: {e}")
+                await asyncio.sleep(1)
+                continue
+            if updates:
+                offset = updates[-1].update_id + 1
+                await asyncio.to_thread(self.dispatch, [
+                    u.model_dump(mode="json", by_alias=True, exclude_unset=True) for u in updates
+                ])
+
+    def webhook_app(self, path: str, secret: Optional[str]) -> web.Application:
+        """aiohttp-приложение, которое только маршрутизирует апдейты вебхука"""
+        async def handle(request: web.Request) -> web.Response:
+            if secret and request.headers.get(SECRET_HEADER) != secret:
+                return web.Response(status=401, text="Unauthorized")
+            await asyncio.to_thread(self.dispatch, [await request.json()])
+            return web.json_response({})
+
+        async def watch(app: web.Application):
+            async def loop():
+                while True:
+                    await asyncio.sleep(WORKER_CHECK_INTERVAL)
+                    self.check()
+            task = asyncio.create_task(loop())
+            yield
+            task.cancel()
+
+        app = web.Application()
+        app.router.add_post(path, handle)
+        app.cleanup_ctx.append(watch)
+        return app
+
+
+async def _feed(bot: Bot, dispatcher: Dispatcher, raw: dict):
+    try:
+        await dispatcher.feed_raw_update(bot, raw)
+    except Exception as e:
+        logger.error(f"Ошибка при обработке апдейта {raw.get('update_id')}: {e}")
+
+
+async def _feed_after(previous: Optional[asyncio.Task], bot: Bot, dispatcher: Dispatcher, raw: dict):
+    if previous is not None:
+        await asyncio.wait([previous])
+    await _feed(bot, dispatcher, raw)
+
+
+async def consume(updates, bot: Bot, dispatcher: Dispatcher, max_pending: int = WORKER_MAX_PENDING) -> int:
+    """Цикл воркера: отдаёт апдейты диспетчеру, апдейты одного чата — по очереди"""
+    loop = asyncio.get_running_loop()
+    last: dict[int, asyncio.Task] = {}
+    slots = asyncio.Semaphore(max_pending)
+    handled = 0
+
+    def done(chat_id: int, task: asyncio.Task):
+        slots.release()
+        if last.get(chat_id) is task:
+            del last[chat_id]
+
+    while True:
+        batch = await loop.run_in_executor(None, updates.get)
+        if batch is None:
+            break
+        for raw in batch:
+            await slots.acquire()
+            chat_id = update_chat_id(raw)
+            task = asyncio.create_task(_feed_after(last.get(chat_id), bot, dispatcher, raw))
+            last[chat_id] = task
+            task.add_done_callback(lambda t, c=chat_id: done(c, t))
+        handled += len(batch)
+    if last:
+        await asyncio.wait(list(last.values()))
+    return handled
@@ -1,5 +1,6 @@
 import re
 import html
+import asyncio
 import logging
 from datetime import timedelta
 from aiogram import types
@@ -7,20 +8,18 @@ from aiogram.enums.chat_member_status import ChatMemberStatus
 from aiogram.types import ChatPermissions
 
 from .config import bot, ADMINS
-from .database import Database
+from .database import db
+from .cache import TTLCache
+from .profiles import profiles
+from .audit import log_action
 
 logger = logging.getLogger(__name__)
 
-def log_action(action: str, performer_id: int, target_id: int = None, details: str = None):
-    db = Database()
-    perf = db.get_user(performer_id).get('full_name', f"ID {performer_id}") if performer_id else "System"
-    tgt = db.get_user(target_id).get('full_name', f"ID {target_id}") if target_id else ""
-    msg = f"Action: {action} | Performer: {perf}"
-    if tgt:
-        msg += f" | Target: {tgt}"
-    if details:
-        msg += f" | Details: {details}"
-    logger.info(msg)
+admin_cache = TTLCache(maxsize=1024, ttl=600)
+_admin_requests: dict[int, asyncio.Task] = {}
+
+chat_info_cache = TTLCache(maxsize=1024, ttl=3600)
+_chat_info_requests: dict[int, asyncio.Task] = {}
 
 def pluralize(n: int, form1: str, form2: str, form5: str) -> str:
     n = abs(n)
@@ -56,31 +55,33 @@ def parse_duration(s: str) -> timedelta | None:
         'd': timedelta(days=num)
     }[unit]
 
-async def restrict_user(chat_id: int, user_id: int, until_ts: float = None):
-    try:
-        member = await bot.get_chat_member(chat_id, user_id)
-        if member.status in (ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR):
-            logger.warning(f"Попытка ограничить администратора {user_id}")
-            return
-    except Exception as e:
-        logger.error(f"Ошибка при получении статуса пользователя {user_id}: {e}")
+MUTE_PERMISSIONS = ChatPermissions(
+    can_send_messages=False,
+    can_send_audios=False,
+    can_send_documents=False,
+    can_send_photos=False,
+    can_send_videos=False,
+    can_send_video_notes=False,
+    can_send_voice_notes=False,
+    can_send_polls=False,
+    can_send_other_messages=False,
+    can_add_web_page_previews=False,
+    can_change_info=False,
+    can_invite_users=False,
+    can_pin_messages=False,
+    can_manage_topics=False
+)
+
+async def restrict_user(chat_id: int, user_id: int, until_ts: float = None, check_admin: bool = True):
+    if check_admin:
+        try:
+            if user_id in await get_chat_admins(chat_id):
+                logger.warning(f"Попытка ограничить администратора {user_id}")
+                return
+        except Exception as e:
+            logger.error(f"Ошибка при получении статуса пользователя {user_id}: {e}")
     
-    permissions = ChatPermissions(
-        can_send_messages=False,
-        can_send_audios=False,
-        can_send_documents=False,
-        can_send_photos=False,
-        can_send_videos=False,
-        can_send_video_notes=False,
-        can_send_voice_notes=False,
-        can_send_polls=False,
-        can_send_other_messages=False,
-        can_add_web_page_previews=False,
-        can_change_info=False,
-        can_invite_users=False,
-        can_pin_messages=False,
-        can_manage_topics=False
-    )
+    permissions = MUTE_PERMISSIONS
     
     try:
         if until_ts:
@@ -108,23 +109,21 @@ async def restrict_user(chat_id: int, user_id: int, until_ts: float = None):
         except:
             pass
 
-async def lift_restrictions(chat_id: int, user_id: int) -> bool:
-    """Снимает ограничения с пользователя"""
+async def lift_restrictions(chat_id: int, user_id: int, until: float = None) -> bool:
+    """until — снять мут с этим сроком; если мут выдан заново, ничего не делает"""
     api_success = False
     
-    db = Database()
-    db.remove_mute(user_id)
+    if not await db.remove_mute(chat_id, user_id, until):
+        return False
     
     try:
-        chat = await bot.get_chat(chat_id)
+        chat_type, default_permissions = await get_chat_info(chat_id)
         
-        if chat.type != "supergroup":
+        if chat_type != "supergroup":
             logger.info(f"Чат {chat_id} не является супергруппой, пропускаем API-снятие ограничений")
-            log_action("Unmute from DB", 0, user_id, "Chat type not supergroup")
+            log_action("Unmute from DB", 0, user_id, "Chat type not supergroup", chat_id=chat_id)
             return True
         
-        default_permissions = chat.permissions
-        
         if default_permissions is None:
             default_permissions = ChatPermissions(
                 can_send_messages=True,
@@ -150,7 +149,7 @@ async def lift_restrictions(chat_id: int, user_id: int) -> bool:
         )
         
         api_success = True
-        log_action("Restrictions lifted", 0, user_id)
+        log_action("Restrictions lifted", 0, user_id, chat_id=chat_id)
         logger.info(f"Ограничения сняты с пользователя {user_id} в чате {chat_id}")
         return True
         
@@ -162,13 +161,75 @@ async def lift_restrictions(chat_id: int, user_id: int) -> bool:
         except:
             pass
         
-        log_action("Unmute from DB only", 0, user_id, f"API failed: {str(e)}")
+        log_action("Unmute from DB only", 0, user_id, f"API failed: {str(e)}", chat_id=chat_id)
         logger.info(f"Пользователь {user_id} удален из БД мутов, но API-снятие ограничений не удалось")
         return True  
 
+async def _fetch_chat_info(chat_id: int) -> tuple[str, ChatPermissions | None]:
+    try:
+        chat = await bot.get_chat(chat_id)
+        info = (chat.type, chat.permissions)
+        chat_info_cache.set(chat_id, info)
+        return info
+    finally:
+        _chat_info_requests.pop(chat_id, None)
+
+async def get_chat_info(chat_id: int) -> tuple[str, ChatPermissions | None]:
+    """Возвращает тип чата и права участников по умолчанию, запрашивая get_chat не чаще раза в TTL"""
+    info = chat_info_cache.get(chat_id)
+    if info is not None:
+        return info
+    task = _chat_info_requests.get(chat_id)
+    if task is None:
+        task = asyncio.create_task(_fetch_chat_info(chat_id))
+        _chat_info_requests[chat_id] = task
+    return await asyncio.shield(task)
+
+def update_chat_type(chat_id: int, chat_type: str):
+    """Сбрасывает кэш чата, если его тип изменился (например, группа стала супергруппой)"""
+    info = chat_info_cache.get(chat_id)
+    if info is not None and info[0] != chat_type:
+        chat_info_cache.pop(chat_id)
+
+def invalidate_chat_info(chat_id: int):
+    chat_info_cache.pop(chat_id)
+
+async def _fetch_chat_admins(chat_id: int) -> frozenset[int]:
+    """Запрашивает админов чата; кэширует, только если запрос не устарел"""
+    task = asyncio.current_task()
+    try:
+        members = await bot.get_chat_administrators(chat_id)
+        admins = frozenset(m.user.id for m in members)
+        if _admin_requests.get(chat_id) is task:
+            admin_cache.set(chat_id, admins)
+        return admins
+    finally:
+        if _admin_requests.get(chat_id) is task:
+            del _admin_requests[chat_id]
+
+async def get_chat_admins(chat_id: int) -> frozenset[int]:
+    """Возвращает ID администраторов чата из кэша, загружая список одним запросом"""
+    admins = admin_cache.get(chat_id)
+    if admins is not None:
+        return admins
+    task = _admin_requests.get(chat_id)
+    if task is None:
+        task = asyncio.create_task(_fetch_chat_admins(chat_id))
+        _admin_requests[chat_id] = task
+    return await asyncio.shield(task)
+
+def invalidate_chat_admins(chat_id: int):
+    """Сбрасывает кэш; запрос, уже начатый до сброса, не запишет в кэш старый список"""
+    admin_cache.pop(chat_id)
+    _admin_requests.pop(chat_id, None)
+
 async def is_moderator(chat_id: int, user_id: int) -> bool:
     if user_id in ADMINS:
         return True
+    try:
+        return user_id in await get_chat_admins(chat_id)
+    except Exception:
+        pass
     try:
         m = await bot.get_chat_member(chat_id, user_id)
         return m.status in (ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR)
@@ -176,20 +237,24 @@ async def is_moderator(chat_id: int, user_id: int) -> bool:
         logger.error(f"Ошибка при проверке модератора: {e}")
         return False
 
+def mention_html(user_id: int, full_name: str) -> str:
+    return f'<a href="tg://user?id={user_id}">{html.escape(full_name)}</a>'
+
 async def get_user_mention(chat_id: int, user_id: int) -> str:
     try:
-        user = await bot.get_chat(user_id)
-        name = html.escape(user.full_name)
-        return f'<a href="tg://user?id={user_id}">{name}</a>'
-    except:
+        name = await profiles.get_name(user_id)
+    except Exception as e:
+        logger.error(f"Ошибка при получении имени пользователя {user_id}: {e}")
+        name = None
+    if not name:
         return f"ID {user_id}"
+    return mention_html(user_id, name)
 
 async def get_user_id(message: types.Message, ref) -> int | None:
     try:
-        db = Database()
         
         if isinstance(ref, types.User):
-            db.update_user(ref)
+            await profiles.learn(ref)
             return ref.id
             
         if isinstance(ref, str):
@@ -198,7 +263,7 @@ async def get_user_id(message: types.Message, ref) -> int | None:
             if ref.isdigit():
                 return int(ref)
                 
-            user_id = db.get_user_by_username(ref)
+            user_id = await db.get_user_by_username(ref)
             if user_id:
                 return user_id
                 
@@ -1,111 +1,175 @@
-import asyncio
 import os
+import time
+import asyncio
 import html
 import logging
 from aiogram import F, types
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, FSInputFile
-from aiogram.enums.chat_member_status import ChatMemberStatus
 
 from .config import bot, dp
-from .database import Database
-from .utils import restrict_user, lift_restrictions, log_action, get_user_mention
+from .database import db
+from .scheduler import StoredDeadlineScheduler
+from .raid import JoinRateTracker, JoinBatcher, RateLimitedPool
+from .utils import restrict_user, lift_restrictions, log_action, get_user_mention, mention_html
 
 logger = logging.getLogger(__name__)
 
-pending_check: dict[int, dict] = {}
-verification_tasks: dict[int, asyncio.Task] = {}
+VERIFICATION_TIMEOUT = 120
 
 check_kb = InlineKeyboardMarkup(
     inline_keyboard=[[InlineKeyboardButton(text="Я не бот ✅", callback_data="verify")]]
 )
 
+join_tracker = JoinRateTracker()
+restriction_pool = RateLimitedPool()
+
 @dp.message(F.new_chat_members)
 async def on_new_chat_members(message: types.Message):
     try:
-        db = Database()
-        for u in message.new_chat_members:
-            if db.get_ban(message.chat.id, u.id):
+        chat_id = message.chat.id
+        joined = message.new_chat_members
+        await db.add_joins(chat_id, [u.id for u in joined if not u.is_bot], time.time())
+        banned = await db.get_banned(chat_id, [u.id for u in joined])
+        raid = join_tracker.register(chat_id, len(joined))
+
+        newcomers = []
+        for u in joined:
+            if u.id in banned:
                 logger.info(f"Забаненный пользователь {u.id} ({u.full_name}) пытается вернуться")
-                try:
-                    member = await bot.get_chat_member(message.chat.id, u.id)
-                    if member.status != ChatMemberStatus.KICKED:
-                        await bot.ban_chat_member(message.chat.id, u.id, until_date=0, revoke_messages=True)
-                        await bot.send_message(
-                            message.chat.id,
-                            f"🚫 {html.escape(u.full_name)} забанен и не может находиться в этом чате."
-                        )
-                        log_action("Re-banned user", 0, u.id, "Attempted to rejoin while banned")
-                except Exception as e:
-                    logger.error(f"Ошибка при повторном бане пользователя {u.id}: {e}")
-                continue
-            
-            await start_verification(u, message.chat.id)
+                if raid:
+                    await restriction_pool.submit(reban_user, chat_id, u)
+                else:
+                    await reban_user(chat_id, u)
+            elif not u.is_bot:
+                newcomers.append(u)
+
+        if raid:
+            join_batcher.add(chat_id, newcomers)
+            return
+        for u in newcomers:
+            await start_verification(u, chat_id)
     except Exception as e:
         logger.error(f"Ошибка в on_new_chat_members: {e}")
 
+async def reban_user(chat_id: int, user: types.User):
+    """Повторно банит вступившего из черного списка"""
+    try:
+        await bot.ban_chat_member(chat_id, user.id, until_date=0, revoke_messages=True)
+        await bot.send_message(
+            chat_id,
+            f"🚫 {html.escape(user.full_name)} забанен и не может находиться в этом чате."
+        )
+        log_action("Re-banned user", 0, user.id, "Attempted to rejoin while banned", chat_id=chat_id)
+    except Exception as e:
+        logger.error(f"Ошибка при повторном бане пользователя {user.id}: {e}")
+
+async def restrict_pending(chat_id: int, user_id: int):
+    """Ограничивает ожидающего проверки, если он её ещё не прошёл"""
+    if not await db.has_verification(chat_id, user_id):
+        return
+    await restrict_user(chat_id, user_id, check_admin=False)
+    if not await db.has_verification(chat_id, user_id) and not await db.get_ban(chat_id, user_id):
+        await lift_restrictions(chat_id, user_id)
+
+async def start_batch_verification(chat_id: int, users: list[types.User]):
+    """Режим рейда: одна капча на пачку вступивших"""
+    await db.update_users(users)
+    mentions = ", ".join(mention_html(u.id, u.full_name) for u in users)
+    msg = await bot.send_message(
+        chat_id,
+        f"Привет, {mentions}! Вы попали в чат OG Community!\n\n"
+        "Каждый из вас должен нажать кнопку ниже в течение 2 минут, чтобы подтвердить, что вы не бот.",
+        reply_markup=check_kb
+    )
+    deadline = time.time() + VERIFICATION_TIMEOUT
+    await db.add_verifications(chat_id, msg.message_id, users, deadline)
+    verification_scheduler.poke(deadline)
+    for u in users:
+        await restriction_pool.submit(restrict_pending, chat_id, u.id)
+    log_action("Start batch verification", 0, details=f"users={len(users)}", chat_id=chat_id)
+
+join_batcher = JoinBatcher(start_batch_verification)
+
 async def start_verification(user: types.User, chat_id: int):
     """Начинает процесс верификации нового пользователя"""
     try:
         if user.is_bot:
             return
             
-        db = Database()
-        db.update_user(user)
-        mention = await get_user_mention(chat_id, user.id)
-        await restrict_user(chat_id, user.id)
+        await db.update_user(user)
+        mention = mention_html(user.id, user.full_name)
+        await restrict_user(chat_id, user.id, check_admin=False)
         msg = await bot.send_message(
             chat_id,
             f"Привет, {mention}! Ты попал в чат OG Community!\n\n"
             "Нажмите кнопку ниже в течение 2 минут, чтобы подтвердить, что вы не бот.",
             reply_markup=check_kb
         )
-        pending_check[user.id] = {
-            "chat_id": chat_id,
-            "message_id": msg.message_id,
-            "username": user.full_name
-        }
-        verification_tasks[user.id] = asyncio.create_task(
-            check_verification_timeout(user.id)
-        )
-        log_action("Start verification", user.id, details=f"chat={chat_id}")
+        deadline = time.time() + VERIFICATION_TIMEOUT
+        await db.add_verification(chat_id, user.id, msg.message_id, user.full_name, deadline)
+        verification_scheduler.poke(deadline)
+        log_action("Start verification", user.id, chat_id=chat_id)
     except Exception as e:
         logger.error(f"Ошибка при старте верификации: {e}")
 
-async def check_verification_timeout(user_id: int):
-    await asyncio.sleep(120)
-    data = pending_check.pop(user_id, None)
-    if data:
+async def fail_verification(data: dict):
+    """Банит пользователя, не прошедшего проверку вовремя"""
+    user_id = data["user_id"]
+    try:
+        await bot.ban_chat_member(data["chat_id"], user_id, until_date=0)
+    except Exception as e:
+        logger.error(f"Ошибка при бане пользователя: {e}")
+    log_action("User banned (failed verification)", 0, user_id, chat_id=data["chat_id"])
+
+async def _on_verification_timeouts(expired: list[dict]):
+    by_chat: dict[int, list[dict]] = {}
+    for data in expired:
+        by_chat.setdefault(data["chat_id"], []).append(data)
+
+    for chat_id, items in by_chat.items():
+        await db.add_bans(chat_id, [d["user_id"] for d in items])
+        if join_tracker.is_raid(chat_id):
+            for data in items:
+                await restriction_pool.submit(fail_verification, data)
+        else:
+            await asyncio.gather(*(fail_verification(data) for data in items))
+
+        names = ", ".join(html.escape(d["full_name"] or str(d["user_id"])) for d in items)
         try:
-            db = Database()
-            await bot.ban_chat_member(data["chat_id"], user_id, until_date=0)
-            db.add_ban(data["chat_id"], user_id)
-            await bot.send_message(
-                data["chat_id"],
-                f"{data['username']} не прошёл проверку и был исключён."
-            )
+            if len(items) == 1:
+                await bot.send_message(chat_id, f"{names} не прошёл проверку и был исключён.")
+            else:
+                await bot.send_message(chat_id, f"Не прошли проверку и были исключены: {names}.")
         except Exception as e:
-            logger.error(f"Ошибка при бане пользователя: {e}")
-        log_action("User banned (failed verification)", 0, user_id)
-        if user_id in verification_tasks:
-            verification_tasks.pop(user_id)
+            logger.error(f"Ошибка при отправке сообщения о непрошедших проверку: {e}")
+
+verification_scheduler = StoredDeadlineScheduler(
+    _on_verification_timeouts,
+    next_deadline=db.get_next_verification_deadline,
+    pop_due=db.pop_expired_verifications,
+    name="verification"
+)
+
+async def verification_timeouts():
+    """Обрабатывает таймауты проверки, хранящиеся в БД"""
+    await verification_scheduler.run()
 
 @dp.callback_query(F.data == "verify")
 async def on_verify(callback: types.CallbackQuery):
     try:
         uid = callback.from_user.id
-        if uid not in pending_check:
+        data = None
+        if callback.message:
+            data = await db.pop_verification(callback.message.chat.id, uid)
+        if data is None:
             await callback.answer("Проверка не требуется.", show_alert=True)
             return
         
-        if uid in verification_tasks:
-            verification_tasks[uid].cancel()
-            verification_tasks.pop(uid)
-        
-        data = pending_check.pop(uid)
         await lift_restrictions(data["chat_id"], uid)
         
         try:
-            await bot.delete_message(data["chat_id"], data["message_id"])
+            if not await db.count_message_verifications(data["chat_id"], data["message_id"]):
+                await bot.delete_message(data["chat_id"], data["message_id"])
         except:
             pass
         
@@ -129,7 +193,7 @@ async def on_verify(callback: types.CallbackQuery):
             await bot.send_message(data["chat_id"], text)
         
         await callback.answer("Проверка пройдена!", show_alert=True)
-        log_action("User passed verification", uid)
+        log_action("User passed verification", uid, chat_id=data["chat_id"])
     except Exception as e:
         logger.error(f"Ошибка в on_verify: {e}")
         await callback.answer("Произошла ошибка. Пожалуйста, попробуйте снова.", show_alert=True)
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from .config import WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT
+
+logger = logging.getLogger(__name__)
+
+
+def build_app(bot: Bot, dispatcher: Dispatcher, path: str = WEBHOOK_PATH,
+              secret: str | None = WEBHOOK_SECRET) -> web.Application:
+    """aiohttp-приложение, принимающее апдейты Telegram на path"""
+    app = web.Application()
+    SimpleRequestHandler(dispatcher, bot, secret_token=secret).register(app, path=path)
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+async def set_webhook(bot: Bot, dispatcher: Dispatcher):
+    if not WEBHOOK_URL:
+        raise RuntimeError("Для BOT_MODE=webhook нужно задать WEBHOOK_URL")
+    url = f"{WEBHOOK_URL}{WEBHOOK_PATH}"
+    await bot.set_webhook(
+        url,
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+        drop_pending_updates=True
+    )
+    logger.info(f"Вебхук установлен: {url}")
+
+
+async def serve(app: web.Application, host: str = WEBHOOK_HOST, port: int = WEBHOOK_PORT):
+    """Запускает aiohttp-приложение и работает до отмены"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"Сервер вебхука слушает {host}:{port}{WEBHOOK_PATH}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def run_webhook(bot: Bot, dispatcher: Dispatcher):
+    await set_webhook(bot, dispatcher)
+    await serve(build_app(bot, dispatcher))
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from src.blocklist import BlocklistMatcher, REGEX_SCAN_LIMIT, check_regex, normalize, KIND_REGEX
+
+
+@pytest.mark.parametrize("pattern", [
+    r".*.*.*.*=",
+    r"(a|a)+$",
+    r"(a|ab)*c",
+    r"(a+)+$",
+    r"(\w+\s?)*x",
+    r"(\d{1,3}\.)+",
+    r"\w+\d+",
+    r"a?a?a?a?aaaa",
+    r"(?:ab|a.)",
+    r"(?:a|a)(?:a|a)",
+])
+def test_rejects_backtracking_patterns(pattern):
+    with pytest.raises(ValueError):
+        normalize(KIND_REGEX, pattern)
+
+
+@pytest.mark.parametrize("pattern", [
+    r"\+7\d{10}",
+    r"t\.me/joinchat/\w+",
+    r"заработ\w+ от \d+",
+    r"\$\d{3,}\s*в\s*день",
+    r"https?://bit\.ly/\w+",
+    r"(?:http|https)://",
+    r"(?:ab|cd)+",
+    r"(\d{3}-)+\d",
+    r"(\w)\1{4}",
+    r"(?i)crypto",
+    r".*=",
+])
+def test_accepts_linear_patterns(pattern):
+    assert normalize(KIND_REGEX, pattern) == pattern
+
+
+def test_check_regex_direct():
+    check_regex(r"(?:ab|cd)+")
+    for pattern in (r"(a|a)+$", r"(a|ab)*c", r".*.*="):
+        with pytest.raises(ValueError):
+            check_regex(pattern)
+
+
+@pytest.mark.parametrize("pattern", ["(", "a{2,1}", ""])
+def test_rejects_invalid_patterns(pattern):
+    with pytest.raises(ValueError):
+        normalize(KIND_REGEX, pattern)
+
+
+@pytest.mark.parametrize("pattern", [r"t\.me/joinchat/\w+", r"\$\d{3,}\s*в\s*день", r".*=", r"(\w)\1{4}"])
+def test_accepted_patterns_stay_fast(pattern):
+    check_regex(pattern)
+    matcher = BlocklistMatcher(regexes=[pattern])
+    for text in ("a" * REGEX_SCAN_LIMIT, "1" * REGEX_SCAN_LIMIT, "a " * (REGEX_SCAN_LIMIT // 2)):
+        started = time.perf_counter()
+        matcher.match(text + "!")
+        assert time.perf_counter() - started < 0.5
+
+
+def test_regexes_keep_their_groups():
+    matcher = BlocklistMatcher(["слово"], ["spam.com"], [r"(\w)\1{4}", r"(?i)crypto"])
+    assert matcher.match("ааааа") == (KIND_REGEX, "ааааа")
+    assert matcher.match("buy CRYPTO") == (KIND_REGEX, "CRYPTO")
+    assert matcher.match("это слово") == ("word", "слово")
+    assert matcher.match("https://www.spam.com/x") == ("domain", "spam.com")
+    assert matcher.match("обычный текст") is None
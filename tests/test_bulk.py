@@ -0,0 +1,69 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from src.handlers import bulk
+from src.handlers.bulk import BULK_MAX_TARGETS, parse_targets, resolve_targets
+
+
+def test_parse_ids_usernames_links():
+    targets = parse_targets(['123', '@Spammer', 'tg://user?id=456', 'реклама', '789'])
+    assert targets.user_ids == [123, 456]
+    assert targets.usernames == ['spammer']
+    assert targets.joined is None
+    assert targets.reason == 'реклама 789'
+
+
+@pytest.mark.parametrize('args, window', [
+    (['joined', '30m'], timedelta(minutes=30)),
+    (['joined', '15'], timedelta(minutes=15)),
+    (['JOINED', '2h', '1'], timedelta(hours=2)),
+])
+def test_parse_joined(args, window):
+    targets = parse_targets(args)
+    assert targets.joined == window
+    assert targets
+
+
+def test_parse_invalid_joined_is_reason():
+    targets = parse_targets(['1', 'joined', 'вчера'])
+    assert targets.user_ids == [1]
+    assert targets.joined is None
+    assert targets.reason == 'joined вчера'
+
+
+@pytest.mark.parametrize('args', [[], ['@'], ['tg://user?id=x'], ['спам', '123'], ['joined']])
+def test_parse_no_targets(args):
+    assert not parse_targets(args)
+
+
+class FakeDb:
+    def __init__(self, joins, users):
+        self.joins, self.users = joins, users
+        self.limits = []
+
+    async def get_recent_joins(self, chat_id, since, limit=-1):
+        self.limits.append(limit)
+        return self.joins[:limit]
+
+    async def find_users(self, user_ids, usernames):
+        return [u for u in self.users if u[0] in user_ids or u[1] in usernames]
+
+
+def test_resolve_targets(monkeypatch):
+    fake = FakeDb([5, 1], [(1, 'one', 'One'), (7, 'seven', None)])
+    monkeypatch.setattr(bulk, 'db', fake)
+    names, missing = asyncio.run(resolve_targets(-100, parse_targets(['1', '@seven', '@ghost', 'joined', '5m'])))
+    assert names == {1: 'One', 5: '5', 7: '7'}
+    assert missing == ['ghost']
+    assert fake.limits == [BULK_MAX_TARGETS + 1]
+
+
+def test_resolve_targets_limit(monkeypatch):
+    monkeypatch.setattr(bulk, 'db', FakeDb(list(range(BULK_MAX_TARGETS)), []))
+    targets = parse_targets(['@extra', 'joined', '1h'])
+    with pytest.raises(ValueError):
+        asyncio.run(resolve_targets(-100, targets))
+    names, _ = asyncio.run(resolve_targets(-100, parse_targets(['joined', '1h'])))
+    assert len(names) == BULK_MAX_TARGETS
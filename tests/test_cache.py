@@ -0,0 +1,34 @@
+from src import cache
+from src.cache import TTLCache
+
+
+def test_get_does_not_extend_ttl_by_default(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    entries = TTLCache(maxsize=10, ttl=60)
+    entries.set("a", 1)
+    now[0] += 50
+    assert entries.get("a") == 1
+    now[0] += 20
+    assert entries.get("a") is None
+
+
+def test_sliding_get_extends_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    entries = TTLCache(maxsize=10, ttl=60, sliding=True)
+    entries.set("a", 1)
+    for _ in range(10):
+        now[0] += 50
+        assert entries.get("a") == 1
+    now[0] += 61
+    assert "a" not in entries
+
+
+def test_evicts_least_recently_used():
+    entries = TTLCache(maxsize=2, ttl=60)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    entries.get("a")
+    entries.set("c", 3)
+    assert "a" in entries and "c" in entries and "b" not in entries
@@ -0,0 +1,44 @@
+import pytest
+
+from src import cache
+from src.flood import FloodDetector, SlidingCounter, REASON_FLOOD, REASON_DUPLICATE, REASON_WAVE
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_sliding_counter_weights_previous_window():
+    counter = SlidingCounter(0.0)
+    for t in range(10):
+        counter.add(float(t), 10.0)
+    assert counter.add(15.0, 10.0) == pytest.approx(10 * 0.5 + 1)
+    assert counter.add(35.0, 10.0) == 1
+
+
+def test_steady_flooder_is_never_forgotten(clock):
+    detector = FloodDetector(window=10, user_limit=8, clock=lambda: clock[0])
+    start = clock[0]
+    reasons = []
+    while clock[0] - start < 600:
+        reasons.append(detector.check(1, 2))
+        clock[0] += 0.5
+    assert all(reason == REASON_FLOOD for reason in reasons[20:])
+
+
+def test_idle_entries_expire(clock):
+    detector = FloodDetector(clock=lambda: clock[0])
+    detector.check(1, 2, "одинаковый текст")
+    clock[0] += 2 * detector.dup_window + 1
+    assert (1, 2) not in detector._users
+    assert 1 not in detector._chats
+
+
+def test_duplicate_and_wave(clock):
+    detector = FloodDetector(clock=lambda: clock[0])
+    text = "купите наши курсы"
+    assert [detector.check(1, 2, text) for _ in range(3)] == [None, None, REASON_DUPLICATE]
+    assert [detector.check(1, uid, text) for uid in range(10, 14)] == [None, None, None, REASON_WAVE]
@@ -0,0 +1,85 @@
+import sqlite3
+
+import pytest
+
+from src.database.database import Database
+from src.database.migrations import SCHEMA_VERSION, migrate
+
+
+def baseline(path, mutes):
+    """База в схеме до версионирования"""
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, full_name TEXT,
+                            first_name TEXT, last_name TEXT);
+        CREATE TABLE warns (user_id INTEGER PRIMARY KEY, count INTEGER DEFAULT 0);
+        CREATE TABLE mutes (user_id INTEGER PRIMARY KEY, chat_id INTEGER, until REAL);
+        CREATE TABLE bans (chat_id INTEGER, user_id INTEGER, PRIMARY KEY (chat_id, user_id));
+    ''')
+    conn.executemany('INSERT INTO users VALUES (?, ?, ?, ?, ?)', [
+        (1, 'Alice', 'Alice A', 'Alice', 'A'),
+        (2, 'bob', 'Bob', 'Bob', None),
+    ])
+    conn.executemany('INSERT INTO warns VALUES (?, ?)', [(1, 2), (2, 0)])
+    conn.executemany('INSERT INTO mutes VALUES (?, ?, ?)', mutes)
+    conn.execute('INSERT INTO bans VALUES (-100, 3)')
+    conn.commit()
+    conn.close()
+
+
+def tables(conn) -> set:
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_baseline_upgrade(tmp_path):
+    path = str(tmp_path / 'bot.db')
+    baseline(path, [(1, -100, 5000.0), (4, None, 6000.0)])
+    db = Database(path)
+    try:
+        assert db.conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+        assert {'audit_log', 'processed_commands', 'blocklist', 'joins',
+                'verifications', 'amnesty_jobs'} <= tables(db.conn)
+        assert db.conn.execute('SELECT id, username, updated_at FROM users ORDER BY id').fetchall() == [
+            (1, 'alice', None), (2, 'bob', None)
+        ]
+        assert db.conn.execute('SELECT chat_id, user_id, count FROM warns').fetchall() == [(-100, 1, 2)]
+        assert db.conn.execute('SELECT chat_id, user_id, until FROM mutes').fetchall() == [(-100, 1, 5000.0)]
+        assert db.get_mute(-100, 1)['until'] == 5000.0
+        assert db.conn.execute('SELECT chat_id, user_id FROM bans').fetchall() == [(-100, 3)]
+    finally:
+        db.close()
+
+
+def test_warns_without_single_chat(tmp_path):
+    path = str(tmp_path / 'bot.db')
+    baseline(path, [(1, -200, 5000.0)])
+    conn = sqlite3.connect(path, isolation_level=None)
+    assert migrate(conn) == SCHEMA_VERSION
+    assert conn.execute('SELECT chat_id, user_id, count FROM warns').fetchall() == [(0, 1, 2)]
+    conn.close()
+
+
+def test_empty_database(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'bot.db'), isolation_level=None)
+    assert migrate(conn) == SCHEMA_VERSION
+    assert {'users', 'warns', 'mutes', 'bans', 'joins'} <= tables(conn)
+    conn.close()
+
+
+def test_migrate_is_idempotent(tmp_path):
+    path = str(tmp_path / 'bot.db')
+    baseline(path, [(1, -100, 5000.0)])
+    conn = sqlite3.connect(path, isolation_level=None)
+    migrate(conn)
+    schema = conn.execute('SELECT sql FROM sqlite_master ORDER BY name').fetchall()
+    assert migrate(conn) == SCHEMA_VERSION
+    assert conn.execute('SELECT sql FROM sqlite_master ORDER BY name').fetchall() == schema
+    conn.close()
+
+
+def test_newer_schema_rejected(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'bot.db'), isolation_level=None)
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION + 1}')
+    with pytest.raises(RuntimeError):
+        migrate(conn)
+    conn.close()
@@ -0,0 +1,80 @@
+import random
+
+from src.database.mute_index import MuteIndex
+
+
+def consistent(index: MuteIndex) -> bool:
+    heap = set(index._heap)
+    return all((until, chat_id, user_id) in heap for (chat_id, user_id), until in index._mutes.items())
+
+
+def test_expiry():
+    index = MuteIndex()
+    index.add(1, 10, 100.0)
+    index.add(1, 11, 200.0)
+    assert index.is_muted(1, 10, now=50.0)
+    assert index.get(1, 10, now=50.0) == {'chat_id': 1, 'user_id': 10, 'until': 100.0}
+    assert not index.is_muted(1, 10, now=100.0)
+    assert index.get(1, 10, now=150.0) is None
+    assert index.is_muted(1, 11, now=150.0)
+    assert len(index) == 1
+
+
+def test_renewed_mute_survives_old_deadline():
+    index = MuteIndex()
+    index.add(1, 10, 100.0)
+    index.add(1, 10, 300.0)
+    assert index.is_muted(1, 10, now=200.0)
+    assert index.until(1, 10) == 300.0
+    assert not index.is_muted(1, 10, now=300.0)
+
+
+def test_until_does_not_evict():
+    index = MuteIndex()
+    index.add(1, 10, 100.0)
+    assert index.until(1, 10) == 100.0
+    assert index.until(1, 11) is None
+    index.get(1, 11, now=150.0)
+    assert index.until(1, 10) is None
+
+
+def test_remove_and_listeners():
+    index, events = MuteIndex(), []
+    index.subscribe(lambda *event: events.append(event))
+    index.add(1, 10, 100.0)
+    index.remove(1, 10)
+    index.remove(1, 11)
+    assert not index.is_muted(1, 10, now=0.0)
+    assert events == [(1, 10, 100.0), (1, 10, None), (1, 11, None)]
+
+
+def test_load_replaces_state():
+    index = MuteIndex()
+    index.add(1, 10, 100.0)
+    index.load([{'chat_id': 2, 'user_id': 20, 'until': 50.0}])
+    assert index.until(1, 10) is None
+    assert index.is_muted(2, 20, now=0.0)
+    assert len(index._heap) == 1
+
+
+def test_heap_stays_bounded_and_consistent():
+    index, model = MuteIndex(), {}
+    rng = random.Random(5)
+    now = 0.0
+    for _ in range(20000):
+        key = (rng.randrange(3), rng.randrange(50))
+        if rng.random() < 0.1:
+            index.remove(*key)
+            model.pop(key, None)
+        else:
+            until = now + rng.uniform(1, 500)
+            index.add(*key, until)
+            model[key] = until
+            assert len(index._heap) <= 2 * len(index._mutes) + 64
+        now += 0.5
+        if rng.random() < 0.05:
+            assert index.is_muted(*key, now=now) == (key in model and model[key] > now)
+            model = {k: v for k, v in model.items() if v > now}
+    assert consistent(index)
+    for key, until in model.items():
+        assert index.until(*key) == until